@@ -0,0 +1,61 @@
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from benchmark_serving import load_states
+from dataset_utils import BASE_FEATURE_DIM, name_bucket_cache_info, state_to_feature_vector, states_to_feature_matrix
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Compare state_to_feature_vector with the batched states_to_feature_matrix.')
+    parser.add_argument('--dataset', default=None, help='JSONL recording with a state per row; synthetic states are used when omitted')
+    parser.add_argument('--max-rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5, help='Timed passes per path; the best pass is reported')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser
+
+
+def best_seconds(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(max(1, int(repeat))):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    rng = random.Random(int(args.seed))
+    states = load_states(args, rng)
+    delta_times = [rng.choice([0.0, rng.uniform(0.0, 2.0)]) for _ in states]
+    out = np.empty((len(states), BASE_FEATURE_DIM), dtype=np.float32)
+
+    def scalar():
+        return np.stack([state_to_feature_vector(state, delta_time=dt) for state, dt in zip(states, delta_times)])
+
+    def batch():
+        return states_to_feature_matrix(states, delta_times, out=out)
+
+    expected = scalar()
+    actual = batch()
+    scalar_seconds = best_seconds(scalar, args.repeat)
+    batch_seconds = best_seconds(batch, args.repeat)
+    print(json.dumps({
+        'rows': len(states),
+        'features': int(BASE_FEATURE_DIM),
+        'bit_identical': expected.tobytes() == actual.tobytes(),
+        'scalar_rows_per_second': round(len(states) / scalar_seconds, 1),
+        'batch_rows_per_second': round(len(states) / batch_seconds, 1),
+        'scalar_us_per_row': round(1e6 * scalar_seconds / len(states), 3),
+        'batch_us_per_row': round(1e6 * batch_seconds / len(states), 3),
+        'speedup': round(scalar_seconds / batch_seconds, 3),
+        'name_cache': name_bucket_cache_info(),
+    }))
+
+
+if __name__ == '__main__':
+    main()
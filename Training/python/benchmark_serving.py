@@ -0,0 +1,372 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dataset_utils import state_to_feature_vector
+from modules.serving.wire_format import encode_predict_frame
+
+
+BASE_DIR = Path(__file__).resolve().parent
+PASSTHROUGH_ENV = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS')
+SYNTHETIC_BLOCKS = ['stone', 'grass_block', 'air', 'water', 'oak_log', 'sand', 'dirt', 'oak_leaves', 'crafting_table']
+SYNTHETIC_ITEMS = ['oak_planks', 'bread', 'stone_pickaxe', 'iron_sword', 'torch', 'cobblestone', 'apple', 'bow']
+SYNTHETIC_ENTITIES = [('mob', 'zombie'), ('mob', 'skeleton'), ('player', 'Steve'), ('object', 'item'), ('mob', 'cow')]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Replay agent states against serve_policy and report throughput, latency and CPU.')
+    parser.add_argument('--dataset', default=None, help='JSONL recording to replay; synthetic states are used when omitted')
+    parser.add_argument('--max-rows', type=int, default=5000)
+    parser.add_argument('--agents', type=int, default=16)
+    parser.add_argument('--tick-hz', type=float, default=5.0, help='Requests per second per agent; 0 sends back-to-back')
+    parser.add_argument('--duration', type=float, default=20.0, help='Measured seconds per configuration')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Seconds of load before measuring')
+    parser.add_argument('--wire', choices=['json', 'packed', 'stream'], default='json')
+    parser.add_argument('--timeout-ms', type=float, default=0.0, help='Send this request budget (X-Policy-Timeout-Ms) so the server sheds late work; 0 sends none')
+    parser.add_argument('--app', default='serve_policy:app', help='ASGI app to launch, e.g. serve_policy_cluster:app for the multi-process server')
+    parser.add_argument('--url', default=None, help='Benchmark an already running server instead of launching one')
+    parser.add_argument('--in-process', action='store_true', help='Run the server inside this process (single configuration)')
+    parser.add_argument(
+        '--config',
+        action='append',
+        default=[],
+        help='name:KEY=VALUE,... serving overrides, e.g. lstm:MODEL_PATH=../models/lstm.pt,LSTM_INFERENCE_MODE=incremental. '
+             'Keys map to POLICY_<KEY>; OMP_NUM_THREADS/MKL_NUM_THREADS pass through. Repeatable.',
+    )
+    parser.add_argument('--startup-timeout', type=float, default=180.0)
+    parser.add_argument('--seed', type=int, default=42)
+    return parser
+
+
+def parse_config(text: str) -> Tuple[str, Dict[str, str]]:
+    name, sep, body = str(text).partition(':')
+    if not sep:
+        name, body = text, ''
+    env: Dict[str, str] = {}
+    for entry in body.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        key, sep, value = entry.partition('=')
+        if not sep:
+            raise ValueError(f'Invalid config entry {entry!r}; expected KEY=VALUE.')
+        key = key.strip().upper()
+        if not key.startswith('POLICY_') and key not in PASSTHROUGH_ENV:
+            key = f'POLICY_{key}'
+        env[key] = value.strip()
+    return name.strip() or 'default', env
+
+
+def synthetic_states(count: int, rng: random.Random) -> List[dict]:
+    states = []
+    for _ in range(count):
+        entities = []
+        for _ in range(rng.randint(0, 5)):
+            entity_type, entity_name = rng.choice(SYNTHETIC_ENTITIES)
+            entities.append({'type': entity_type, 'name': entity_name, 'distance': round(rng.uniform(0.5, 12.0), 3)})
+        on_ground = rng.random() < 0.8
+        states.append({
+            'velocity': {'vx': round(rng.gauss(0, 0.1), 3), 'vy': round(rng.gauss(0, 0.05), 3), 'vz': round(rng.gauss(0, 0.1), 3)},
+            'yaw': round(rng.uniform(-3.14, 3.14), 3),
+            'pitch': round(rng.uniform(-1.5, 1.5), 3),
+            'onGround': on_ground,
+            'inAir': not on_ground,
+            'health': rng.randint(1, 20),
+            'hunger': rng.randint(0, 20),
+            'selectedHotbarSlot': rng.randint(0, 8),
+            'heldItem': {'name': rng.choice(SYNTHETIC_ITEMS + ['none'])},
+            'blockBelow': rng.choice(SYNTHETIC_BLOCKS),
+            'blockFront': rng.choice(SYNTHETIC_BLOCKS),
+            'nearbyEntities': entities,
+            'inventory': [{'name': rng.choice(SYNTHETIC_ITEMS), 'count': rng.randint(1, 64)} for _ in range(rng.randint(0, 12))],
+        })
+    return states
+
+
+def load_states(args, rng: random.Random) -> List[dict]:
+    if not args.dataset:
+        return synthetic_states(max(1, int(args.max_rows)), rng)
+    states = []
+    with Path(args.dataset).open('r', encoding='utf-8') as handle:
+        for line in handle:
+            if line.strip():
+                states.append(json.loads(line).get('state', {}))
+            if len(states) >= int(args.max_rows):
+                break
+    if not states:
+        raise SystemExit(f'No states found in {args.dataset}.')
+    return states
+
+
+def encode_payloads(states: List[dict], agent_id: str, wire: str) -> List[bytes]:
+    if wire == 'json':
+        return [json.dumps({'state': state, 'agent_id': agent_id}).encode('utf-8') for state in states]
+    if wire == 'packed':
+        return [encode_predict_frame(state_to_feature_vector(state), agent_id=agent_id) for state in states]
+    return [json.dumps({'state': state}).encode('utf-8') for state in states]
+
+
+class HttpAgent:
+    def __init__(self, host: str, port: int, path: str, content_type: str, timeout_ms: float = 0.0):
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+        self.path = path
+        self.headers = {'Content-Type': content_type, **({'X-Policy-Timeout-Ms': str(timeout_ms)} if timeout_ms > 0 else {})}
+
+    def send(self, payload: bytes) -> bool:
+        self.connection.request('POST', self.path, body=payload, headers=self.headers)
+        response = self.connection.getresponse()
+        body = response.read()
+        return response.status == 200 and json.loads(body).get('ok', False)
+
+    def close(self):
+        self.connection.close()
+
+
+class StreamAgent:
+    def __init__(self, host: str, port: int, agent_id: str, timeout_ms: float = 0.0):
+        from websockets.sync.client import connect
+
+        budget = f'&timeout_ms={timeout_ms}' if timeout_ms > 0 else ''
+        self.connection = connect(f'ws://{host}:{port}/stream?agent_id={agent_id}{budget}')
+
+    def send(self, payload: bytes) -> bool:
+        self.connection.send(payload.decode('utf-8'))
+        return bool(json.loads(self.connection.recv()).get('ok', False))
+
+    def close(self):
+        self.connection.close()
+
+
+def open_agent(host: str, port: int, agent_id: str, wire: str, timeout_ms: float = 0.0):
+    if wire == 'stream':
+        return StreamAgent(host, port, agent_id, timeout_ms)
+    if wire == 'packed':
+        return HttpAgent(host, port, '/predict_packed', 'application/x-policy-features', timeout_ms)
+    return HttpAgent(host, port, '/predict', 'application/json', timeout_ms)
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return int(sock.getsockname()[1])
+
+
+def fetch_json(host: str, port: int, path: str) -> Optional[dict]:
+    connection = http.client.HTTPConnection(host, port, timeout=5)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        return json.loads(response.read()) if response.status == 200 else None
+    except (OSError, ValueError):
+        return None
+    finally:
+        connection.close()
+
+
+def wait_for_server(host: str, port: int, timeout: float, process: Optional[subprocess.Popen] = None) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f'Server exited with code {process.returncode} during startup.')
+        health = fetch_json(host, port, '/health')
+        if health is not None and health.get('model_loaded') and health.get('ready', True):
+            return health
+        time.sleep(0.25)
+    raise SystemExit(f'Server on port {port} did not report a loaded model within {timeout:.0f}s.')
+
+
+def _child_pids(pid: int) -> List[int]:
+    children: List[int] = []
+    for task in Path(f'/proc/{pid}/task').glob('*'):
+        try:
+            children.extend(int(child) for child in (task / 'children').read_text().split())
+        except OSError:
+            continue
+    return children
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    try:
+        fields = Path(f'/proc/{pid}/stat').read_text().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    # Worker processes of the multi-process server are included.
+    total = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    for child in _child_pids(pid):
+        total += process_cpu_seconds(child) or 0.0
+    return total
+
+
+def run_load(host: str, port: int, states: List[dict], args, cpu_seconds) -> dict:
+    agents = max(1, int(args.agents))
+    period = 1.0 / float(args.tick_hz) if args.tick_hz > 0 else 0.0
+    payloads = [
+        encode_payloads(states[(index * len(states)) // agents:] + states[:(index * len(states)) // agents], f'bench-{index}', args.wire)
+        for index in range(agents)
+    ]
+    latencies: List[List[float]] = [[] for _ in range(agents)]
+    errors = [0] * agents
+    late = [0] * agents
+    ready = threading.Barrier(agents + 1)
+    go = threading.Event()
+    timing = {}
+
+    def agent_loop(index: int):
+        client = open_agent(host, port, f'bench-{index}', args.wire, args.timeout_ms)
+        frames = payloads[index]
+        ready.wait()
+        go.wait()
+        started, measure_from, stop_at = timing['start'], timing['measure_from'], timing['stop_at']
+        offset = period * index / agents
+        tick = 0
+        try:
+            while True:
+                target = started + offset + tick * period
+                now = time.perf_counter()
+                if now >= stop_at:
+                    break
+                if target > now:
+                    time.sleep(target - now)
+                elif period and now - target > period and now >= measure_from:
+                    late[index] += 1
+                sent = time.perf_counter()
+                try:
+                    ok = client.send(frames[tick % len(frames)])
+                except (OSError, ValueError, http.client.HTTPException):
+                    ok = False
+                    client.close()
+                    client = open_agent(host, port, f'bench-{index}', args.wire, args.timeout_ms)
+                if sent >= measure_from:
+                    latencies[index].append(time.perf_counter() - sent)
+                    if not ok:
+                        errors[index] += 1
+                tick += 1
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=agent_loop, args=(index,), daemon=True) for index in range(agents)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    timing['start'] = time.perf_counter()
+    timing['measure_from'] = timing['start'] + float(args.warmup)
+    timing['stop_at'] = timing['measure_from'] + float(args.duration)
+    go.set()
+    time.sleep(max(0.0, timing['measure_from'] - time.perf_counter()))
+    cpu_start = cpu_seconds()
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    cpu_end = cpu_seconds()
+
+    samples = np.asarray([value for per_agent in latencies for value in per_agent], dtype=np.float64) * 1000.0
+    percentiles = np.percentile(samples, [50, 95, 99]) if samples.size else [float('nan')] * 3
+    return {
+        'requests': int(samples.size),
+        'errors': int(sum(errors)),
+        'throughput_rps': float(samples.size / wall) if wall > 0 else 0.0,
+        'latency_ms': {
+            'mean': float(samples.mean()) if samples.size else None,
+            'p50': float(percentiles[0]),
+            'p95': float(percentiles[1]),
+            'p99': float(percentiles[2]),
+            'max': float(samples.max()) if samples.size else None,
+        },
+        'late_ticks': int(sum(late)),
+        'cpu_cores': float((cpu_end - cpu_start) / wall) if cpu_start is not None and cpu_end is not None and wall > 0 else None,
+    }
+
+
+def describe_server(health: dict) -> dict:
+    return {
+        'model_type': health.get('model_type'),
+        'sequence_length': health.get('sequence_length'),
+        'lstm_inference_mode': health.get('lstm_inference_mode'),
+        'micro_batching': health.get('micro_batching') is not None,
+        'workers': (health.get('cluster') or {}).get('workers', 1),
+    }
+
+
+def benchmark_subprocess(name: str, overrides: Dict[str, str], states: List[dict], args) -> dict:
+    port = free_port()
+    env = {**os.environ, **overrides}
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', args.app, '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=str(BASE_DIR),
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        health = wait_for_server('127.0.0.1', port, args.startup_timeout, process)
+        report = run_load('127.0.0.1', port, states, args, lambda: process_cpu_seconds(process.pid))
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {'config': name, 'overrides': overrides, **describe_server(health), **report}
+
+
+def benchmark_in_process(name: str, overrides: Dict[str, str], states: List[dict], args) -> dict:
+    import uvicorn
+
+    os.environ.update(overrides)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(args.app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        health = wait_for_server('127.0.0.1', port, args.startup_timeout)
+        # The load generator shares this process, so cpu_cores includes the client threads.
+        report = run_load('127.0.0.1', port, states, args, time.process_time)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+    return {'config': name, 'overrides': overrides, 'in_process': True, **describe_server(health), **report}
+
+
+def benchmark_url(url: str, states: List[dict], args) -> dict:
+    from urllib.parse import urlparse
+
+    parsed = urlparse(url)
+    host, port = parsed.hostname or '127.0.0.1', int(parsed.port or 80)
+    health = wait_for_server(host, port, args.startup_timeout)
+    return {'config': url, **describe_server(health), **run_load(host, port, states, args, lambda: None)}
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    rng = random.Random(int(args.seed))
+    states = load_states(args, rng)
+    settings = {'wire': args.wire, 'agents': int(args.agents), 'tick_hz': float(args.tick_hz), 'duration': float(args.duration)}
+
+    if args.url:
+        print(json.dumps({**settings, **benchmark_url(args.url, states, args)}))
+        return
+
+    configs = [parse_config(text) for text in args.config] or [('default', {})]
+    if args.in_process:
+        if len(configs) != 1:
+            raise SystemExit('--in-process runs a single configuration; launch one process per --config instead.')
+        print(json.dumps({**settings, **benchmark_in_process(*configs[0], states, args)}))
+        return
+
+    for name, overrides in configs:
+        print(json.dumps({**settings, **benchmark_subprocess(name, overrides, states, args)}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
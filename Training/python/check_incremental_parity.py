@@ -0,0 +1,45 @@
+import argparse
+import json
+from pathlib import Path
+
+from dataset_utils import load_dataset_hybrid
+from modules.policy_bundle import load_model
+from modules.sequence_normalization import apply_feature_normalization, log_scale_signed
+from modules.serving.incremental import measure_incremental_drift
+from serving_config import SERVING_CONFIG
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Compare incremental LSTM serving against the windowed /predict path.')
+    parser.add_argument('--dataset', required=True, help='JSONL recording replayed as a single agent stream')
+    parser.add_argument('--model', default=SERVING_CONFIG['model_path'], help='Path to behavior_model.pt')
+    parser.add_argument('--max-rows', type=int, default=2000)
+    parser.add_argument('--resync-interval', type=int, action='append', default=[], help='Repeatable; 0 disables resync')
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    bundle = load_model(Path(args.model), prefer_compiled=False)
+    if bundle.get('model_type') != 'lstm':
+        raise SystemExit(f'Model at {args.model} is not an LSTM bundle.')
+
+    x, _, _, _ = load_dataset_hybrid(Path(args.dataset))
+    x = x[: max(1, int(args.max_rows))]
+    if bundle.get('normalize_features', True) and bundle['feature_mean'] is not None and bundle['feature_std'] is not None:
+        if bundle.get('normalize_log_scale', False):
+            x = log_scale_signed(x)
+        x = apply_feature_normalization(
+            x,
+            bundle['feature_mean'],
+            bundle['feature_std'],
+            clip_value=float(bundle.get('normalize_clip_value', 10.0)),
+        )
+
+    for interval in args.resync_interval or [0]:
+        report = measure_incremental_drift(bundle['model'], x, bundle['sequence_length'], resync_interval=int(interval))
+        print(json.dumps({'resync_interval': int(interval), 'frames': int(len(x)), **report}))
+
+
+if __name__ == '__main__':
+    main()
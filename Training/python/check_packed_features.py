@@ -0,0 +1,74 @@
+import argparse
+import json
+import subprocess
+import time
+from pathlib import Path
+
+import numpy as np
+
+from dataset_utils import BASE_FEATURE_DIM, state_to_feature_vector
+from modules.serving.wire_format import decode_predict_frame, encode_predict_frame
+
+
+BASE_DIR = Path(__file__).resolve().parent
+NODE_FEATURIZER = BASE_DIR.parent.parent / 'src' / 'services' / 'policyFeatures.js'
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Check the Node policy featurizer against state_to_feature_vector and time packed decoding.')
+    parser.add_argument('--dataset', required=True, help='JSONL recording with a state per row')
+    parser.add_argument('--node', default='node', help='Node.js executable')
+    parser.add_argument('--max-rows', type=int, default=5000)
+    parser.add_argument('--tolerance', type=float, default=1e-5)
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    lines = [line for line in Path(args.dataset).read_text(encoding='utf-8').splitlines() if line.strip()]
+    lines = lines[: max(1, int(args.max_rows))]
+    states = [json.loads(line).get('state', {}) for line in lines]
+    expected = np.stack([state_to_feature_vector(state) for state in states])
+
+    completed = subprocess.run(
+        [args.node, str(NODE_FEATURIZER)],
+        input='\n'.join(lines) + '\n',
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    actual = np.asarray([json.loads(line) for line in completed.stdout.splitlines() if line.strip()], dtype=np.float32)
+    if actual.shape != expected.shape:
+        raise SystemExit(f'Node featurizer returned shape {actual.shape}, expected {expected.shape}.')
+
+    with np.errstate(invalid='ignore'):
+        diff = np.abs(actual.astype(np.float64) - expected.astype(np.float64))
+    diff[(actual == expected) | (np.isnan(actual) & np.isnan(expected))] = 0.0
+    row_diff = diff.max(axis=1)
+    worst_feature = int(np.argmax(diff.max(axis=0)))
+
+    frames = [encode_predict_frame(vector, agent_id='parity') for vector in expected]
+    started = time.perf_counter()
+    for line in lines:
+        state_to_feature_vector(json.loads(line).get('state', {}))
+    json_us = 1e6 * (time.perf_counter() - started) / len(lines)
+    started = time.perf_counter()
+    for frame in frames:
+        decode_predict_frame(frame)
+    packed_us = 1e6 * (time.perf_counter() - started) / len(frames)
+
+    print(json.dumps({
+        'rows': int(len(lines)),
+        'features': BASE_FEATURE_DIM,
+        'mismatched_rows': int(np.sum(row_diff > args.tolerance)),
+        'max_abs_diff': float(row_diff.max()),
+        'worst_feature': worst_feature,
+        'json_bytes_per_row': float(np.mean([len(json.dumps({'state': state, 'agent_id': 'parity'})) for state in states])),
+        'packed_bytes_per_row': float(np.mean([len(frame) for frame in frames])),
+        'json_decode_featurize_us': json_us,
+        'packed_decode_us': packed_us,
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import json
+from pathlib import Path
+
+from dataset_utils import load_dataset_hybrid
+from modules.policy_bundle import load_model
+from modules.quantized_policy import quantization_report, sequence_windows
+from modules.sequence_normalization import apply_feature_normalization, log_scale_signed
+from serving_config import SERVING_CONFIG
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Compare dynamic int8 quantized serving against the float model.')
+    parser.add_argument('--dataset', required=True, help='Validation JSONL replayed as a single agent stream')
+    parser.add_argument('--model', default=SERVING_CONFIG['model_path'], help='Path to behavior_model.pt')
+    parser.add_argument('--max-rows', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=256)
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    bundle = load_model(Path(args.model), quantize=True)
+
+    x, y, _, _ = load_dataset_hybrid(Path(args.dataset))
+    x = x[: max(1, int(args.max_rows))]
+    y = y[: len(x)]
+    if bundle.get('normalize_features', True) and bundle['feature_mean'] is not None and bundle['feature_std'] is not None:
+        if bundle.get('normalize_log_scale', False):
+            x = log_scale_signed(x)
+        x = apply_feature_normalization(
+            x,
+            bundle['feature_mean'],
+            bundle['feature_std'],
+            clip_value=float(bundle.get('normalize_clip_value', 10.0)),
+        )
+    if bundle.get('model_type') == 'lstm':
+        x = sequence_windows(x, bundle['sequence_length'])
+
+    report = quantization_report(bundle['float_model'], bundle['model'], x, labels=y, batch_size=int(args.batch_size))
+    print(json.dumps({'model': str(args.model), 'mode': bundle['quantized'], **report}))
+
+
+if __name__ == '__main__':
+    main()
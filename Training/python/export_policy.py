@@ -0,0 +1,24 @@
+import argparse
+from pathlib import Path
+
+from modules.policy_bundle import export_compiled_model, load_model
+from serving_config import SERVING_CONFIG
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Export a TorchScript policy (normalization + heads) next to a trained bundle.')
+    parser.add_argument('--model', default=SERVING_CONFIG['model_path'], help='Path to behavior_model.pt')
+    parser.add_argument('--out', default='', help='Output path (default: <model>.compiled.pt)')
+    parser.add_argument('--tolerance', type=float, default=1e-4, help='Max abs output delta allowed against the eager model')
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    output_path = export_compiled_model(Path(args.model), Path(args.out) if args.out else None, tolerance=args.tolerance)
+    print(f'saved compiled policy: {output_path}')
+    load_model(Path(args.model))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+COMPILED_FORMAT_VERSION = 1
+COMPILED_META_FILE = 'policy_meta.json'
+
+
+class NormalizedPolicy(nn.Module):
+    def __init__(self, model: nn.Module, bundle: dict):
+        super().__init__()
+        self.model = model
+        self.normalize_enabled = bool(
+            bundle.get('normalize_features', True)
+            and bundle.get('feature_mean') is not None
+            and bundle.get('feature_std') is not None
+        )
+        self.log_scale = bool(bundle.get('normalize_log_scale', False))
+        self.clip_value = float(bundle.get('normalize_clip_value', 10.0))
+        in_features = int(bundle['in_features'])
+        if self.normalize_enabled:
+            mean = np.asarray(bundle['feature_mean'], dtype=np.float32)
+            safe_std = np.maximum(np.asarray(bundle['feature_std'], dtype=np.float32), 1e-8).astype(np.float32)
+        else:
+            mean = np.zeros(in_features, dtype=np.float32)
+            safe_std = np.ones(in_features, dtype=np.float32)
+        self.register_buffer('feature_mean', torch.from_numpy(mean))
+        self.register_buffer('feature_std', torch.from_numpy(safe_std))
+
+    def normalize(self, x: torch.Tensor) -> torch.Tensor:
+        if not self.normalize_enabled:
+            return x
+        x = torch.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
+        if self.log_scale:
+            x = torch.sign(x) * torch.log1p(torch.abs(x))
+        x = (x - self.feature_mean) / self.feature_std
+        if self.clip_value > 0:
+            x = torch.clamp(x, -self.clip_value, self.clip_value)
+        return x
+
+    def forward(self, x: torch.Tensor):
+        return self.model(self.normalize(x))
+
+
+class NormalizedSequencePolicy(NormalizedPolicy):
+    def __init__(self, model: nn.Module, bundle: dict):
+        super().__init__(model, bundle)
+        self.bidirectional = bool(getattr(model, 'bidirectional', False))
+
+    @torch.jit.export
+    def forward_with_state(self, x: torch.Tensor, state: Optional[Tuple[torch.Tensor, torch.Tensor]] = None):
+        return self.model.forward_with_state(self.normalize(x), state)
+
+
+def compiled_policy_path(model_path: Path) -> Path:
+    model_path = Path(model_path)
+    return model_path.with_name(f'{model_path.stem}.compiled.pt')
+
+
+def file_fingerprint(path: Path) -> str:
+    digest = hashlib.sha256()
+    with Path(path).open('rb') as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def example_policy_input(bundle: dict, batch_size: int = 1) -> torch.Tensor:
+    in_features = int(bundle['in_features'])
+    if str(bundle.get('model_type', 'mlp')) == 'lstm':
+        return torch.zeros((batch_size, int(bundle.get('sequence_length', 1)), in_features), dtype=torch.float32)
+    return torch.zeros((batch_size, in_features), dtype=torch.float32)
+
+
+def compile_policy(bundle: dict):
+    model = bundle['model'].eval()
+    if str(bundle.get('model_type', 'mlp')) == 'lstm' and hasattr(model, 'forward_with_state'):
+        wrapper = NormalizedSequencePolicy(model, bundle).eval()
+        preserved = ['forward_with_state', 'bidirectional']
+    else:
+        wrapper = NormalizedPolicy(model, bundle).eval()
+        preserved = []
+    return torch.jit.freeze(torch.jit.script(wrapper), preserved_attrs=preserved)
+
+
+def output_delta(reference, candidate) -> float:
+    if isinstance(reference, torch.Tensor):
+        reference, candidate = (reference,), (candidate,)
+    return max(float(torch.max(torch.abs(a - b)).item()) for a, b in zip(reference, candidate))
+
+
+def save_compiled_policy(compiled, output_path: Path, source_path: Path):
+    meta = {
+        'format_version': COMPILED_FORMAT_VERSION,
+        'source_sha256': file_fingerprint(source_path),
+        'normalization_in_graph': True,
+        'torch_version': torch.__version__,
+    }
+    torch.jit.save(compiled, str(output_path), _extra_files={COMPILED_META_FILE: json.dumps(meta)})
+
+
+def load_compiled_policy(compiled_path: Path, source_path: Path):
+    if not Path(compiled_path).exists():
+        return None
+    extra_files = {COMPILED_META_FILE: ''}
+    compiled = torch.jit.load(str(compiled_path), map_location='cpu', _extra_files=extra_files)
+    meta = json.loads(extra_files[COMPILED_META_FILE] or '{}')
+    if meta.get('format_version') != COMPILED_FORMAT_VERSION or meta.get('source_sha256') != file_fingerprint(source_path):
+        return None
+    return compiled
+
+
+def measure_latency_ms(fn, example: torch.Tensor, iterations: int = 50, warmup: int = 10) -> float:
+    with torch.no_grad():
+        for _ in range(warmup):
+            fn(example)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn(example)
+    return 1000.0 * (time.perf_counter() - started) / max(1, iterations)
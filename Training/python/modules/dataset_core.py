@@ -1,7 +1,10 @@
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import numpy as np
 
@@ -62,6 +65,38 @@ HOSTILE_ENTITY_HINTS = [
     'drowned',
 ]
 
+# Name classification keywords. Buckets are decided by substring match in this order, and the
+# result is cached per lower-cased name: the item, block and entity names seen in recordings
+# come from a small fixed set, so the scans only run once per distinct name.
+NAME_BUCKET_CACHE_SIZE = 8192
+ITEM_TYPE_KEYS = ('NONE', 'TOOL', 'RANGED', 'FOOD', 'BLOCK', 'OTHER')
+INVENTORY_BUCKET_KEYS = ('TOOL', 'FOOD', 'BLOCK', 'WEAPON', 'UTILITY', 'OTHER')
+BLOCK_BUCKET_KEYS = ('UNKNOWN', 'AIR', 'WATER', 'LAVA', 'PLANT', 'UTILITY', 'SOLID')
+FOOD_NAME_HINTS = ('bread', 'beef', 'pork', 'chicken', 'carrot', 'potato', 'apple', 'food')
+BUILDING_NAME_HINTS = ('plank', 'stone', 'dirt', 'cobblestone', 'sand', 'glass', 'brick', 'block')
+ITEM_TYPE_HINTS = (
+    ('TOOL', ('sword', 'axe', 'pickaxe', 'shovel', 'hoe')),
+    ('RANGED', ('bow', 'crossbow', 'trident')),
+    ('FOOD', FOOD_NAME_HINTS),
+    ('BLOCK', BUILDING_NAME_HINTS),
+)
+INVENTORY_BUCKET_HINTS = (
+    ('WEAPON', ('sword', 'axe', 'trident', 'bow', 'crossbow')),
+    ('TOOL', ('pickaxe', 'shovel', 'hoe', 'shears', 'fishing_rod')),
+    ('FOOD', FOOD_NAME_HINTS),
+    ('BLOCK', BUILDING_NAME_HINTS),
+    ('UTILITY', ('torch', 'table', 'furnace', 'bed', 'chest', 'anvil')),
+)
+BLOCK_BUCKET_HINTS = (
+    ('AIR', ('air',)),
+    ('WATER', ('water', 'bubble_column')),
+    ('LAVA', ('lava',)),
+    ('PLANT', ('grass', 'flower', 'leaves', 'vine', 'sapling')),
+    ('UTILITY', ('crafting_table', 'furnace', 'chest', 'anvil', 'enchanting_table', 'bed')),
+)
+LAYER_KEYS = ('-1', '0', '1')
+TOP_K_ENTITIES = 3
+
 ACTION_INTENT_MAP = {
     'IDLE': ['DEFENSE'],
     'DEFEND': ['DEFENSE'],
@@ -112,6 +147,25 @@ OBSERVER_LIKELY_ACTION_WEIGHTS = {
 
 TEMPORAL_DELTA_CLIP = 5.0
 
+# Bump FEATURE_LAYOUT_VERSION whenever state_to_feature_vector changes, and port the change to
+# src/services/policyFeatures.js, which computes the same vector on the bot side.
+FEATURE_LAYOUT_VERSION = 1
+BASE_FEATURE_DIM = 95
+DELTA_TIME_FEATURE_INDEX = 4
+TEMPORAL_FEATURE_DIM = 2 * BASE_FEATURE_DIM + len(ACTION_VOCAB)
+CONTROL_TARGET_DIM = 8
+
+# Dataset loaders parse, featurize and store this many rows at a time, so memory is bounded by
+# the output arrays rather than by the parsed JSON.
+FEATURIZE_CHUNK_ROWS = 2048
+# Parallel loading splits the file at line boundaries into byte ranges of at least this size;
+# smaller files are loaded serially.
+PARALLEL_MIN_CHUNK_BYTES = 8 * 1024 * 1024
+PARALLEL_CHUNKS_PER_WORKER = 4
+# states_to_feature_matrix stacks per-state vectors below this many rows, where the fixed cost of
+# its column-wise reductions outweighs the per-row savings.
+BATCH_FEATURIZE_MIN_ROWS = 8
+
 
 def _safe_float(value, default=0.0):
     try:
@@ -181,42 +235,75 @@ def action_to_intent_vector(action_label: str) -> np.ndarray:
     return vec
 
 
-def _categorize_item_name(name: str) -> str:
-    n = _safe_str(name, '').lower()
+def _match_bucket(name: str, hints, default: str) -> str:
+    for bucket, keywords in hints:
+        if any(k in name for k in keywords):
+            return bucket
+    return default
+
+
+def _one_hot_table(keys) -> Dict[str, Tuple[float, ...]]:
+    return {bucket: tuple(1.0 if bucket == key else 0.0 for key in keys) for bucket in keys}
+
+
+ITEM_TYPE_ONE_HOT = _one_hot_table(ITEM_TYPE_KEYS)
+BLOCK_ONE_HOT = _one_hot_table(BLOCK_BUCKET_KEYS)
+
+# Column codes for states_to_feature_matrix, which writes one-hots and bucket sums by index.
+ITEM_TYPE_INDEX = {key: idx for idx, key in enumerate(ITEM_TYPE_KEYS)}
+INVENTORY_BUCKET_INDEX = {key: idx for idx, key in enumerate(INVENTORY_BUCKET_KEYS)}
+BLOCK_BUCKET_INDEX = {key: idx for idx, key in enumerate(BLOCK_BUCKET_KEYS)}
+AIR_BUCKET_INDEX = BLOCK_BUCKET_INDEX['AIR']
+ENTITY_TYPE_INDEX = {'player': 0, 'mob': 1, 'object': 2, 'other': 3}
+THREAT_TYPE_INDEX = {'mob': 0, 'player': 1}
+ITEM_TYPE_EYE = np.eye(len(ITEM_TYPE_KEYS))
+BLOCK_EYE = np.eye(len(BLOCK_BUCKET_KEYS))
+STATS_SLOTS = len(BLOCK_BUCKET_KEYS) + 2 * len(LAYER_KEYS) + 2
+
+
+@lru_cache(maxsize=NAME_BUCKET_CACHE_SIZE)
+def _item_type_of(n: str) -> str:
     if not n or n == 'none':
         return 'NONE'
-    if any(k in n for k in ['sword', 'axe', 'pickaxe', 'shovel', 'hoe']):
-        return 'TOOL'
-    if any(k in n for k in ['bow', 'crossbow', 'trident']):
-        return 'RANGED'
-    if any(k in n for k in ['bread', 'beef', 'pork', 'chicken', 'carrot', 'potato', 'apple', 'food']):
-        return 'FOOD'
-    if any(k in n for k in ['plank', 'stone', 'dirt', 'cobblestone', 'sand', 'glass', 'brick', 'block']):
-        return 'BLOCK'
-    return 'OTHER'
+    return _match_bucket(n, ITEM_TYPE_HINTS, 'OTHER')
 
 
-def _item_type_one_hot(name: str) -> List[float]:
-    bucket = _categorize_item_name(name)
-    keys = ['NONE', 'TOOL', 'RANGED', 'FOOD', 'BLOCK', 'OTHER']
-    return [1.0 if bucket == key else 0.0 for key in keys]
+@lru_cache(maxsize=NAME_BUCKET_CACHE_SIZE)
+def _inventory_bucket_of(n: str) -> str:
+    if not n or n == 'none':
+        return 'OTHER'
+    return _match_bucket(n, INVENTORY_BUCKET_HINTS, 'OTHER')
+
+
+@lru_cache(maxsize=NAME_BUCKET_CACHE_SIZE)
+def _block_bucket_of(n: str) -> str:
+    if not n or n == 'unknown':
+        return 'UNKNOWN'
+    return _match_bucket(n, BLOCK_BUCKET_HINTS, 'SOLID')
+
+
+@lru_cache(maxsize=NAME_BUCKET_CACHE_SIZE)
+def _is_hostile_name(n: str) -> bool:
+    return any(hint in n for hint in HOSTILE_ENTITY_HINTS)
+
+
+def name_bucket_cache_info() -> Dict[str, dict]:
+    return {
+        fn.__name__.strip('_'): fn.cache_info()._asdict()
+        for fn in (_item_type_of, _inventory_bucket_of, _block_bucket_of, _is_hostile_name)
+    }
+
+
+def _categorize_item_name(name: str) -> str:
+    return _item_type_of(_safe_str(name, '').lower())
+
+
+def _item_type_one_hot(name: str) -> Tuple[float, ...]:
+    return ITEM_TYPE_ONE_HOT[_categorize_item_name(name)]
 
 
 def _inventory_bucket(name: str) -> str:
-    n = _safe_str(name, '').lower()
-    if not n or n == 'none':
-        return 'OTHER'
-    if any(k in n for k in ['sword', 'axe', 'trident', 'bow', 'crossbow']):
-        return 'WEAPON'
-    if any(k in n for k in ['pickaxe', 'shovel', 'hoe', 'shears', 'fishing_rod']):
-        return 'TOOL'
-    if any(k in n for k in ['bread', 'beef', 'pork', 'chicken', 'carrot', 'potato', 'apple', 'food']):
-        return 'FOOD'
-    if any(k in n for k in ['plank', 'stone', 'dirt', 'cobblestone', 'sand', 'glass', 'brick', 'block']):
-        return 'BLOCK'
-    if any(k in n for k in ['torch', 'table', 'furnace', 'bed', 'chest', 'anvil']):
-        return 'UTILITY'
-    return 'OTHER'
+    return _inventory_bucket_of(_safe_str(name, '').lower())
 
 
 def _inventory_features(inventory: List[Dict]) -> List[float]:
@@ -224,14 +311,7 @@ def _inventory_features(inventory: List[Dict]) -> List[float]:
     total_count = 0.0
     max_stack = 0.0
     unique_items = set()
-    bucket_counts = {
-        'TOOL': 0.0,
-        'FOOD': 0.0,
-        'BLOCK': 0.0,
-        'WEAPON': 0.0,
-        'UTILITY': 0.0,
-        'OTHER': 0.0,
-    }
+    bucket_counts = {key: 0.0 for key in INVENTORY_BUCKET_KEYS}
 
     for item in inventory:
         if not isinstance(item, dict):
@@ -307,24 +387,30 @@ def _player_position(state: Dict):
     return None
 
 
-def _entity_relative_direction(entity: Dict, state: Dict) -> List[float]:
+def _entity_offset(entity: Dict, state: Dict) -> Tuple[float, float, float]:
     ex = _safe_float(entity.get('dx'))
     ey = _safe_float(entity.get('dy'))
     ez = _safe_float(entity.get('dz'))
     if ex or ey or ez:
-        norm = max(1e-6, float(np.sqrt(ex * ex + ey * ey + ez * ez)))
-        return [float(ex / norm), float(ey / norm), float(ez / norm)]
+        return ex, ey, ez
 
     player_pos = _player_position(state)
     entity_pos = (entity.get('position') or {}) if isinstance(entity.get('position'), dict) else {}
     if player_pos and entity_pos:
-        ex = _safe_float(entity_pos.get('x')) - player_pos[0]
-        ey = _safe_float(entity_pos.get('y')) - player_pos[1]
-        ez = _safe_float(entity_pos.get('z')) - player_pos[2]
-        norm = max(1e-6, float(np.sqrt(ex * ex + ey * ey + ez * ez)))
-        return [float(ex / norm), float(ey / norm), float(ez / norm)]
+        return (
+            _safe_float(entity_pos.get('x')) - player_pos[0],
+            _safe_float(entity_pos.get('y')) - player_pos[1],
+            _safe_float(entity_pos.get('z')) - player_pos[2],
+        )
 
-    return [0.0, 0.0, 0.0]
+    return 0.0, 0.0, 0.0
+
+
+def _entity_relative_direction(entity: Dict, state: Dict) -> List[float]:
+    # A zero offset normalizes to zeros, so entities without a direction need no special case.
+    ex, ey, ez = _entity_offset(entity, state)
+    norm = max(1e-6, float(np.sqrt(ex * ex + ey * ey + ez * ez)))
+    return [float(ex / norm), float(ey / norm), float(ez / norm)]
 
 
 def _top_k_entity_features(entities: List[Dict], state: Dict, k: int = 3) -> List[float]:
@@ -357,30 +443,15 @@ def _top_k_entity_features(entities: List[Dict], state: Dict, k: int = 3) -> Lis
 
 
 def _block_bucket(name: str) -> str:
-    n = _safe_str(name, 'unknown').lower()
-    if not n or n == 'unknown':
-        return 'UNKNOWN'
-    if n == 'air' or 'air' in n:
-        return 'AIR'
-    if 'water' in n or 'bubble_column' in n:
-        return 'WATER'
-    if 'lava' in n:
-        return 'LAVA'
-    if any(k in n for k in ['grass', 'flower', 'leaves', 'vine', 'sapling']):
-        return 'PLANT'
-    if any(k in n for k in ['crafting_table', 'furnace', 'chest', 'anvil', 'enchanting_table', 'bed']):
-        return 'UTILITY'
-    return 'SOLID'
+    return _block_bucket_of(_safe_str(name, 'unknown').lower())
 
 
-def _block_one_hot(name: str) -> List[float]:
-    bucket = _block_bucket(name)
-    keys = ['UNKNOWN', 'AIR', 'WATER', 'LAVA', 'PLANT', 'UTILITY', 'SOLID']
-    return [1.0 if bucket == key else 0.0 for key in keys]
+def _block_one_hot(name: str) -> Tuple[float, ...]:
+    return BLOCK_ONE_HOT[_block_bucket(name)]
 
 
 def _nearby_blocks_features(nearby_blocks: List[Dict], nearby_blocks_stats: Dict = None) -> List[float]:
-    keys = ['UNKNOWN', 'AIR', 'WATER', 'LAVA', 'PLANT', 'UTILITY', 'SOLID']
+    keys = BLOCK_BUCKET_KEYS
     bucket_counts = {k: 0.0 for k in keys}
     layer_non_air = {-1: 0.0, 0: 0.0, 1: 0.0}
     layer_total = {-1: 0.0, 0: 0.0, 1: 0.0}
@@ -455,7 +526,7 @@ def _threat_features(entities: List[Dict]) -> List[float]:
         if entity_type == 'player':
             player_count += 1.0
 
-        is_hostile = entity_type == 'mob' or any(hint in entity_name for hint in HOSTILE_ENTITY_HINTS)
+        is_hostile = entity_type == 'mob' or _is_hostile_name(entity_name)
         if is_hostile:
             hostile_count += 1.0
             nearest_hostile_dist = min(nearest_hostile_dist, dist)
@@ -470,65 +541,309 @@ def _threat_features(entities: List[Dict]) -> List[float]:
     ]
 
 
-def state_to_feature_vector(state: Dict, delta_time: float = 0.0) -> np.ndarray:
+def delta_time_feature(delta_time) -> float:
+    return float(max(0.0, min(5.0, _safe_float(delta_time, 0.0))))
+
+
+def _kinematic_inputs(state: Dict) -> Tuple[float, float, float, float, float]:
     velocity = state.get('velocity', {})
-    entities = state.get('nearbyEntities', [])
-    inventory = state.get('inventory', [])
-    nearby_blocks = state.get('nearbyBlocks', [])
-    nearby_blocks_stats = state.get('nearbyBlocksStats', {})
-    held_item = state.get('heldItem', {})
     observer = state.get('observer') or {}
     if not isinstance(observer, dict):
         observer = {}
+    return (
+        _safe_float(velocity.get('vx')),
+        _safe_float(velocity.get('vy')),
+        _safe_float(velocity.get('vz')),
+        _safe_float(state.get('yaw'), _safe_float(observer.get('yaw'))),
+        _safe_float(state.get('pitch'), _safe_float(observer.get('pitch'))),
+    )
 
-    entity_features = _top_k_entity_features(entities, state, k=3)
-    inventory_features = _inventory_features(inventory)
-    nearby_blocks_features = _nearby_blocks_features(nearby_blocks, nearby_blocks_stats)
-    threat_features = _threat_features(entities)
-    held_item_features = _item_type_one_hot(_safe_str(held_item.get('name', 'none'), 'none'))
-    block_below_features = _block_one_hot(_safe_str(state.get('blockBelow', 'unknown'), 'unknown'))
-    block_front_features = _block_one_hot(_safe_str(state.get('blockFront', 'unknown'), 'unknown'))
-
-    vx = _safe_float(velocity.get('vx'))
-    vy = _safe_float(velocity.get('vy'))
-    vz = _safe_float(velocity.get('vz'))
-    horizontal_speed = float(np.sqrt(vx * vx + vz * vz))
-    yaw = _safe_float(state.get('yaw'), _safe_float(observer.get('yaw')))
-    pitch = _safe_float(state.get('pitch'), _safe_float(observer.get('pitch')))
-    yaw_sin = float(np.sin(yaw))
-    yaw_cos = float(np.cos(yaw))
-    pitch_sin = float(np.sin(pitch))
-    pitch_cos = float(np.cos(pitch))
 
-    feature = [
-        vx,
-        vy,
-        vz,
-        horizontal_speed,
-        float(max(0.0, min(5.0, _safe_float(delta_time, 0.0)))),
-        yaw_sin,
-        yaw_cos,
-        pitch_sin,
-        pitch_cos,
+def _scalar_tail_features(state: Dict) -> List[float]:
+    # Everything after the kinematic block (index 9 onwards); states_to_feature_matrix builds the
+    # same columns block by block.
+    entities = state.get('nearbyEntities', [])
+    held_item = state.get('heldItem', {})
+    return [
         _safe_bool(state.get('onGround')),
         _safe_bool(state.get('inAir')),
         _safe_float(state.get('health'), 20.0),
         _safe_float(state.get('hunger'), 20.0),
         _safe_float(state.get('selectedHotbarSlot'), -1.0),
         float(len(entities)),
+        *_inventory_features(state.get('inventory', [])),
+        *_item_type_one_hot(_safe_str(held_item.get('name', 'none'), 'none')),
+        *_top_k_entity_features(entities, state, k=TOP_K_ENTITIES),
+        *_block_one_hot(_safe_str(state.get('blockBelow', 'unknown'), 'unknown')),
+        *_block_one_hot(_safe_str(state.get('blockFront', 'unknown'), 'unknown')),
+        *_nearby_blocks_features(state.get('nearbyBlocks', []), state.get('nearbyBlocksStats', {})),
+        *_threat_features(entities),
     ]
 
-    feature.extend(inventory_features)
-    feature.extend(held_item_features)
-    feature.extend(entity_features)
-    feature.extend(block_below_features)
-    feature.extend(block_front_features)
-    feature.extend(nearby_blocks_features)
-    feature.extend(threat_features)
 
+def state_to_feature_vector(state: Dict, delta_time: float = 0.0) -> np.ndarray:
+    vx, vy, vz, yaw, pitch = _kinematic_inputs(state)
+    feature = [
+        vx,
+        vy,
+        vz,
+        float(np.sqrt(vx * vx + vz * vz)),
+        delta_time_feature(delta_time),
+        float(np.sin(yaw)),
+        float(np.cos(yaw)),
+        float(np.sin(pitch)),
+        float(np.cos(pitch)),
+    ]
+    feature.extend(_scalar_tail_features(state))
     return np.array(feature, dtype=np.float32)
 
 
+def _at_least(values: np.ndarray, floor: float) -> np.ndarray:
+    # Elementwise max(floor, value) with Python's semantics: NaN and ties resolve to the floor.
+    return np.where(values > floor, values, floor)
+
+
+def _bin_sums(index: List[int], weights: List[float], size: int) -> np.ndarray:
+    # bincount adds each bin's weights in input order, the same float64 sums the scalar loops make.
+    return np.bincount(np.asarray(index, dtype=np.int64), weights=np.asarray(weights, dtype=np.float64), minlength=size)
+
+
+def _parsed_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _stats_overrides(row: int, stats: Dict, index: List[int], values: List[float]) -> Tuple[bool, bool, bool]:
+    # Collects the parseable nearbyBlocksStats entries of a row into STATS_SLOTS columns and reports
+    # which of the bucket/layer tables are dicts; the rest fall back to the counted values.
+    base = row * STATS_SLOTS
+    tables = []
+    for offset, key, names in (
+        (0, 'bucketCounts', BLOCK_BUCKET_KEYS),
+        (len(BLOCK_BUCKET_KEYS), 'layerTotals', LAYER_KEYS),
+        (len(BLOCK_BUCKET_KEYS) + len(LAYER_KEYS), 'layerNonAir', LAYER_KEYS),
+    ):
+        table = stats.get(key, {})
+        is_dict = isinstance(table, dict)
+        tables.append(is_dict)
+        if is_dict and table:
+            for slot, name in enumerate(names):
+                value = _parsed_float(table.get(name))
+                if value is not None:
+                    index.append(base + offset + slot)
+                    values.append(value)
+    for slot, key in ((STATS_SLOTS - 2, 'nonAirCount'), (STATS_SLOTS - 1, 'meanNonAirDy')):
+        value = _parsed_float(stats.get(key))
+        if value is not None:
+            index.append(base + slot)
+            values.append(value)
+    return tables[0], tables[1], tables[2]
+
+
+def states_to_feature_matrix(
+    states: Sequence[Dict],
+    delta_times: Optional[Sequence[float]] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    count = len(states)
+    if out is None:
+        out = np.empty((count, BASE_FEATURE_DIM), dtype=np.float32)
+    elif out.shape != (count, BASE_FEATURE_DIM) or out.dtype != np.float32:
+        raise ValueError(f'out must be a float32 array of shape {(count, BASE_FEATURE_DIM)}, got {out.dtype} {out.shape}.')
+    if count == 0:
+        return out
+    if delta_times is not None and len(delta_times) != count:
+        raise ValueError(f'Expected {count} delta_times, got {len(delta_times)}.')
+    if count < BATCH_FEATURIZE_MIN_ROWS:
+        for row, state in enumerate(states):
+            out[row] = state_to_feature_vector(state, delta_times[row] if delta_times is not None else 0.0)
+        return out
+
+    # One pass over the dicts collects raw values into flat per-block lists; every block is then
+    # reduced and written column-wise. Reductions keep the scalar path's operation order, so the
+    # matrix is bit-identical to stacking state_to_feature_vector rows.
+    buckets = len(BLOCK_BUCKET_KEYS)
+    layers = len(LAYER_KEYS)
+    inv_buckets = len(INVENTORY_BUCKET_KEYS)
+    heads = []
+    codes = []
+    inv_stats = []
+    inv_index, inv_rows, inv_weights = [], [], []
+    ent_slots, ent_dists, ent_types, ent_offsets = [], [], [], []
+    threat_rows, threat_codes, hostile_rows, hostile_dists = [], [], [], []
+    block_index, block_weights = [], []
+    layer_index, layer_weights, non_air_layer_index, non_air_layer_weights = [], [], [], []
+    non_air_rows, non_air_weights, non_air_dy = [], [], []
+    stats_rows, stats_tables, stats_index, stats_values = [], [], [], []
+
+    for row, state in enumerate(states):
+        entities = state.get('nearbyEntities', [])
+        held_item = state.get('heldItem', {})
+        heads.append((
+            *_kinematic_inputs(state),
+            delta_time_feature(delta_times[row] if delta_times is not None else 0.0),
+            _safe_bool(state.get('onGround')),
+            _safe_bool(state.get('inAir')),
+            _safe_float(state.get('health'), 20.0),
+            _safe_float(state.get('hunger'), 20.0),
+            _safe_float(state.get('selectedHotbarSlot'), -1.0),
+            float(len(entities)),
+        ))
+        codes.append((
+            ITEM_TYPE_INDEX[_categorize_item_name(_safe_str(held_item.get('name', 'none'), 'none'))],
+            BLOCK_BUCKET_INDEX[_block_bucket(_safe_str(state.get('blockBelow', 'unknown'), 'unknown'))],
+            BLOCK_BUCKET_INDEX[_block_bucket(_safe_str(state.get('blockFront', 'unknown'), 'unknown'))],
+        ))
+
+        slots_used = 0
+        unique_items = set()
+        for item in state.get('inventory', []):
+            if not isinstance(item, dict):
+                continue
+            name = _safe_str(item.get('name'), 'none').lower()
+            if name and name != 'none':
+                slots_used += 1
+                unique_items.add(name)
+            inv_rows.append(row)
+            inv_index.append(row * inv_buckets + INVENTORY_BUCKET_INDEX[_inventory_bucket(name)])
+            inv_weights.append(max(0.0, _safe_float(item.get('count'), 0.0)))
+        inv_stats.append((slots_used, len(unique_items)))
+
+        if entities:
+            nearest = sorted(entities, key=lambda e: _safe_float(e.get('distance'), 99.0))[:TOP_K_ENTITIES]
+            for slot, entity in enumerate(nearest):
+                ent_slots.append(row * TOP_K_ENTITIES + slot)
+                ent_dists.append(max(0.0, _safe_float(entity.get('distance'), 99.0)))
+                ent_types.append(ENTITY_TYPE_INDEX.get(_safe_str(entity.get('type'), 'other').lower(), len(ENTITY_TYPE_INDEX)))
+                ent_offsets.append(_entity_offset(entity, state))
+        for entity in entities:
+            if not isinstance(entity, dict):
+                continue
+            entity_type = _safe_str(entity.get('type'), 'other').lower()
+            threat_rows.append(row)
+            threat_codes.append(THREAT_TYPE_INDEX.get(entity_type, 2))
+            if entity_type == 'mob' or _is_hostile_name(_safe_str(entity.get('name'), '').lower()):
+                hostile_rows.append(row)
+                hostile_dists.append(max(0.0, _safe_float(entity.get('distance'), 99.0)))
+
+        for entry in state.get('nearbyBlocks', []):
+            if not isinstance(entry, dict):
+                continue
+            weight = max(1.0, _safe_float(entry.get('count'), 1.0))
+            bucket = BLOCK_BUCKET_INDEX[_block_bucket(_safe_str(entry.get('block'), 'unknown'))]
+            dy = int(_safe_float(entry.get('dy'), 0.0))
+            block_index.append(row * buckets + bucket)
+            block_weights.append(weight)
+            non_air = bucket != AIR_BUCKET_INDEX
+            if 'dy' in entry and -1 <= dy <= 1:
+                layer_index.append(row * layers + dy + 1)
+                layer_weights.append(weight)
+                if non_air:
+                    non_air_layer_index.append(row * layers + dy + 1)
+                    non_air_layer_weights.append(weight)
+            if non_air:
+                non_air_rows.append(row)
+                non_air_weights.append(weight)
+                non_air_dy.append(float(dy) * weight)
+
+        stats = state.get('nearbyBlocksStats', {})
+        if isinstance(stats, dict):
+            stats_rows.append(row)
+            stats_tables.append(_stats_overrides(row, stats, stats_index, stats_values))
+
+    head = np.array(heads, dtype=np.float64)
+    vx = head[:, 0]
+    vz = head[:, 2]
+    out[:, 0:3] = head[:, 0:3]
+    out[:, 3] = np.sqrt(vx * vx + vz * vz)
+    out[:, 4] = head[:, 5]
+    out[:, 5] = np.sin(head[:, 3])
+    out[:, 6] = np.cos(head[:, 3])
+    out[:, 7] = np.sin(head[:, 4])
+    out[:, 8] = np.cos(head[:, 4])
+    out[:, 9:15] = head[:, 6:12]
+    entity_count = head[:, 11]
+
+    inv = np.array(inv_stats, dtype=np.float64)
+    max_stack = np.zeros(count, dtype=np.float64)
+    np.maximum.at(max_stack, np.asarray(inv_rows, dtype=np.int64), np.asarray(inv_weights, dtype=np.float64))
+    out[:, 15] = inv[:, 0]
+    out[:, 16] = _bin_sums(inv_rows, inv_weights, count)
+    out[:, 17] = inv[:, 1]
+    out[:, 18] = max_stack
+    out[:, 19:25] = _bin_sums(inv_index, inv_weights, count * inv_buckets).reshape(count, inv_buckets)
+
+    code = np.array(codes, dtype=np.int64)
+    out[:, 25:31] = ITEM_TYPE_EYE[code[:, 0]]
+
+    # Top-k entity slots: [present, distance, 1 / (1 + distance), type one-hot(5), direction(3)].
+    top = np.zeros((count * TOP_K_ENTITIES, 11), dtype=np.float64)
+    top[:, 1] = 99.0
+    if ent_slots:
+        slots = np.asarray(ent_slots, dtype=np.int64)
+        dist = np.asarray(ent_dists, dtype=np.float64)
+        offset = np.asarray(ent_offsets, dtype=np.float64)
+        ex, ey, ez = offset[:, 0], offset[:, 1], offset[:, 2]
+        norm = _at_least(np.sqrt(ex * ex + ey * ey + ez * ez), 1e-6)
+        top[slots, 0] = 1.0
+        top[slots, 1] = dist
+        top[slots, 2] = 1.0 / (1.0 + dist)
+        top[slots, 3 + np.asarray(ent_types, dtype=np.int64)] = 1.0
+        top[slots, 8:11] = offset / norm[:, None]
+    out[:, 31:64] = top.reshape(count, TOP_K_ENTITIES * 11)
+
+    out[:, 64:71] = BLOCK_EYE[code[:, 1]]
+    out[:, 71:78] = BLOCK_EYE[code[:, 2]]
+
+    bucket_counts = _bin_sums(block_index, block_weights, count * buckets).reshape(count, buckets)
+    layer_total = _bin_sums(layer_index, layer_weights, count * layers).reshape(count, layers)
+    layer_non_air = _bin_sums(non_air_layer_index, non_air_layer_weights, count * layers).reshape(count, layers)
+    non_air_count = _bin_sums(non_air_rows, non_air_weights, count)
+    weighted_dy = _bin_sums(non_air_rows, non_air_dy, count)
+    if stats_rows:
+        rows = np.asarray(stats_rows, dtype=np.int64)
+        tables = np.array(stats_tables, dtype=bool).reshape(len(stats_rows), 3)
+        given = np.zeros(count * STATS_SLOTS, dtype=bool)
+        given[np.asarray(stats_index, dtype=np.int64)] = True
+        given = given.reshape(count, STATS_SLOTS)[rows]
+        values = np.zeros(count * STATS_SLOTS, dtype=np.float64)
+        values[np.asarray(stats_index, dtype=np.int64)] = stats_values
+        values = values.reshape(count, STATS_SLOTS)[rows]
+        for table, start, target in ((0, 0, bucket_counts), (1, buckets, layer_total), (2, buckets + layers, layer_non_air)):
+            sel = rows[tables[:, table]]
+            width = target.shape[1]
+            part = slice(start, start + width)
+            target[sel] = _at_least(np.where(given[tables[:, table], part], values[tables[:, table], part], target[sel]), 0.0)
+        counted = _at_least(np.where(given[:, -2], values[:, -2], non_air_count[rows]), 0.0)
+        non_air_count[rows] = counted
+        positive = counted > 0
+        sel = rows[positive]
+        fallback = weighted_dy[sel] / _at_least(counted[positive], 1.0)
+        weighted_dy[sel] = np.where(given[positive, -1], values[positive, -1], fallback) * counted[positive]
+
+    total = bucket_counts[:, 0]
+    for col in range(1, buckets):
+        total = total + bucket_counts[:, col]
+    total = _at_least(total, 1.0)
+    out[:, 78:85] = bucket_counts / total[:, None]
+    out[:, 85:88] = layer_non_air / _at_least(layer_total, 1.0)
+    out[:, 88] = non_air_count / total
+    out[:, 89] = weighted_dy / _at_least(non_air_count, 1.0)
+
+    threat = _bin_sums(np.asarray(threat_rows, dtype=np.int64) * 3 + np.asarray(threat_codes, dtype=np.int64), np.ones(len(threat_rows)), count * 3).reshape(count, 3)
+    hostile = _bin_sums(hostile_rows, np.ones(len(hostile_rows)), count)
+    nearest_hostile = np.full(count, 99.0, dtype=np.float64)
+    np.minimum.at(nearest_hostile, np.asarray(hostile_rows, dtype=np.int64), np.asarray(hostile_dists, dtype=np.float64))
+    out[:, 90] = threat[:, 0]
+    out[:, 91] = hostile
+    out[:, 92] = threat[:, 1]
+    out[:, 93] = nearest_hostile
+    out[:, 94] = hostile / _at_least(entity_count, 1.0)
+    return out
+
+
 def normalize_action_label(action: Dict) -> str:
     label = str(action.get('label', 'IDLE') or 'IDLE').strip().upper()
     if label in ACTION_TO_ID:
@@ -600,68 +915,275 @@ def augment_feature_with_temporal_context(
     return np.concatenate([current, delta, prev_action], axis=0).astype(np.float32)
 
 
-def _augment_temporal_stream(features: List[np.ndarray], labels: List[int]) -> np.ndarray:
-    augmented: List[np.ndarray] = []
-    prev_feature: Optional[np.ndarray] = None
-    prev_action_id: Optional[int] = None
-    for idx, feature in enumerate(features):
-        augmented.append(augment_feature_with_temporal_context(feature, prev_feature, prev_action_id))
-        prev_feature = feature
-        prev_action_id = int(labels[idx]) if idx < len(labels) else None
-    return np.stack(augmented).astype(np.float32)
-
-
-def _read_jsonl_rows(jsonl_path: Path) -> List[Dict]:
-    rows: List[Dict] = []
+def _augment_temporal_block(
+    base: np.ndarray,
+    labels: np.ndarray,
+    prev_feature: Optional[np.ndarray],
+    prev_action_id: Optional[int],
+    out: np.ndarray,
+) -> np.ndarray:
+    # Row-wise equivalent of augment_feature_with_temporal_context over a block of consecutive
+    # frames; prev_feature/prev_action_id carry the frame before the block (None at the start).
+    dim = base.shape[1]
+    previous = np.empty_like(base)
+    previous[0] = base[0] if prev_feature is None else prev_feature
+    previous[1:] = base[:-1]
+    out[:, :dim] = base
+    out[:, dim:2 * dim] = np.clip(base - previous, -float(TEMPORAL_DELTA_CLIP), float(TEMPORAL_DELTA_CLIP))
+    out[:, 2 * dim:] = 0.0
+    rows = np.arange(len(base))
+    prev_ids = np.empty(len(base), dtype=np.int64)
+    prev_ids[0] = -1 if prev_action_id is None else int(prev_action_id)
+    prev_ids[1:] = labels[:-1]
+    valid = (prev_ids >= 0) & (prev_ids < len(ACTION_VOCAB))
+    out[rows[valid], 2 * dim + prev_ids[valid]] = 1.0
+    return out
+
+
+class _GrowingArray:
+    # Rows are written into a preallocated buffer that doubles when full; finish() trims it in place.
+    def __init__(self, row_shape: Tuple[int, ...], dtype, capacity: int = FEATURIZE_CHUNK_ROWS):
+        self._data = np.empty((max(1, int(capacity)),) + tuple(row_shape), dtype=dtype)
+        self.size = 0
+
+    def reserve(self, count: int) -> np.ndarray:
+        needed = self.size + int(count)
+        if needed > len(self._data):
+            grown = np.empty((max(needed, 2 * len(self._data)),) + self._data.shape[1:], dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        view = self._data[self.size:needed]
+        self.size = needed
+        return view
+
+    def finish(self) -> np.ndarray:
+        self._data.resize((self.size,) + self._data.shape[1:], refcheck=False)
+        return self._data
+
+
+INTENT_BY_ACTION_ID = np.stack([action_to_intent_vector(name) for name in ACTION_VOCAB])
+
+
+def _iter_jsonl_rows(jsonl_path: Path) -> Iterator[Dict]:
     with jsonl_path.open('r', encoding='utf-8') as f:
         for line in f:
             line = line.strip()
             if line:
-                rows.append(json.loads(line))
-    return rows
+                yield json.loads(line)
 
 
-def _rows_to_features_and_labels(rows: List[Dict]) -> Tuple[List[np.ndarray], List[int]]:
-    features: List[np.ndarray] = []
-    labels: List[int] = []
-    prev_ts = 0.0
+def _row_timestamp(row: Dict) -> float:
+    return safe_timestamp_seconds(row.get('timestamp', row.get('state', {}).get('timestamp')))
+
+
+def _iter_labeled_rows(rows: Iterable[Dict], with_next_state: bool, prev_ts: float = 0.0) -> Iterator[Tuple[Dict, float, int, Optional[Dict]]]:
+    # Yields (state, delta_time, action_id, next_state). With with_next_state the last row only
+    # serves as the next state of the row before it, which is what the control target needs, so
+    # its label is never resolved.
+    pending = None
     for row in rows:
         state = row.get('state', {})
-        action = row.get('action', {})
-        ts = safe_timestamp_seconds(row.get('timestamp', state.get('timestamp')))
+        ts = _row_timestamp(row)
         delta_time = max(0.0, ts - prev_ts) if prev_ts > 0.0 and ts > 0.0 else 0.0
         if ts > 0.0:
             prev_ts = ts
-        label_name = normalize_action_label(action)
-        labels.append(ACTION_TO_ID[label_name])
-        features.append(state_to_feature_vector(state, delta_time=delta_time))
-    return features, labels
+        if not with_next_state:
+            yield state, delta_time, ACTION_TO_ID[normalize_action_label(row.get('action', {}))], None
+            continue
+        if pending is not None:
+            pending_state, pending_delta, pending_row = pending
+            yield pending_state, pending_delta, ACTION_TO_ID[normalize_action_label(pending_row.get('action', {}))], state
+        pending = (state, delta_time, row)
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _featurize_labeled_rows(labeled: Iterable[Tuple[Dict, float, int, Optional[Dict]]], hybrid: bool) -> Tuple[np.ndarray, ...]:
+    x_out = _GrowingArray((TEMPORAL_FEATURE_DIM,), np.float32)
+    y_out = _GrowingArray((), np.int64)
+    intent_out = _GrowingArray((len(INTENT_VOCAB),), np.float32) if hybrid else None
+    control_out = _GrowingArray((CONTROL_TARGET_DIM,), np.float32) if hybrid else None
+    base = np.empty((FEATURIZE_CHUNK_ROWS, BASE_FEATURE_DIM), dtype=np.float32)
+    prev_feature: Optional[np.ndarray] = None
+    prev_action_id: Optional[int] = None
+
+    for chunk in _chunks(labeled, FEATURIZE_CHUNK_ROWS):
+        count = len(chunk)
+        chunk_base = states_to_feature_matrix([item[0] for item in chunk], [item[1] for item in chunk], out=base[:count])
+        labels = y_out.reserve(count)
+        labels[:] = [item[2] for item in chunk]
+        _augment_temporal_block(chunk_base, labels, prev_feature, prev_action_id, x_out.reserve(count))
+        prev_feature = chunk_base[-1].copy()
+        prev_action_id = int(labels[-1])
+        if hybrid:
+            intent_out.reserve(count)[:] = INTENT_BY_ACTION_ID[labels]
+            controls = control_out.reserve(count)
+            for row, item in enumerate(chunk):
+                controls[row] = _control_target_from_states(item[0], item[3])
+
+    arrays = (x_out.finish(), y_out.finish())
+    if hybrid:
+        arrays += (intent_out.finish(), control_out.finish())
+    return arrays
+
+
+def sequence_windows(frames: np.ndarray, sequence_length: int) -> np.ndarray:
+    # [N, ...] frames -> [N - sequence_length + 1, sequence_length, ...] read-only strided view.
+    # Window i covers frames i .. i + sequence_length - 1 and shares memory with frames.
+    windows = np.lib.stride_tricks.sliding_window_view(frames, int(sequence_length), axis=0)
+    return np.moveaxis(windows, -1, 1)
+
+
+def hybrid_sequence_windows(
+    x: np.ndarray,
+    y: np.ndarray,
+    intent: np.ndarray,
+    control: np.ndarray,
+    sequence_length: int,
+    dense: bool = False,
+    jsonl_path: Optional[Path] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    seq_len = max(2, int(sequence_length))
+    if len(x) < seq_len:
+        raise ValueError(f'Not enough records for hybrid sequence_length={seq_len}. Found {len(x)} in dataset: {jsonl_path}')
+    if dense:
+        return tuple(sequence_windows(array, seq_len) for array in (x, y, intent, control))
+    last = slice(seq_len - 1, None)
+    return sequence_windows(x, seq_len), y[last], intent[last], control[last]
 
 
 def _build_sequences(x: np.ndarray, y: np.ndarray, sequence_length: int, name: str, jsonl_path: Path):
     seq_len = max(2, int(sequence_length))
     if len(x) < seq_len:
         raise ValueError(f'Not enough records for {name}={seq_len}. Found {len(x)} in dataset: {jsonl_path}')
-    x_sequences: List[np.ndarray] = []
-    y_targets: List[int] = []
-    for end_idx in range(seq_len - 1, len(x)):
-        start_idx = end_idx - seq_len + 1
-        x_sequences.append(np.stack(x[start_idx:end_idx + 1]))
-        y_targets.append(int(y[end_idx]))
-    return np.stack(x_sequences).astype(np.float32), np.array(y_targets, dtype=np.int64)
-
-
-def load_dataset(jsonl_path: Path) -> Tuple[np.ndarray, np.ndarray]:
-    rows = _read_jsonl_rows(jsonl_path)
-    features, labels = _rows_to_features_and_labels(rows)
-    if not features:
+    return sequence_windows(x, seq_len), y[seq_len - 1:]
+
+
+def _available_cpus() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+
+
+def _byte_ranges(jsonl_path: Path, count: int) -> List[Tuple[int, int]]:
+    size = jsonl_path.stat().st_size
+    bounds = [0]
+    with jsonl_path.open('rb') as f:
+        for part in range(1, max(1, int(count))):
+            f.seek(max(bounds[-1], size * part // count))
+            f.readline()
+            offset = f.tell()
+            if offset >= size:
+                break
+            if offset > bounds[-1]:
+                bounds.append(offset)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _featurize_byte_range(task: Tuple[Path, int, int, bool]):
+    # Featurizes the rows that start in [start, end) as if they began the file. The first
+    # non-blank line after the range is read as the next state of the last row. The timestamps
+    # returned let the caller repair the one delta time that depends on earlier ranges.
+    jsonl_path, start, end, hybrid = task
+    timestamps = {'first_index': -1, 'first': 0.0, 'last': 0.0}
+
+    def rows():
+        index = 0
+        with jsonl_path.open('rb') as f:
+            f.seek(start)
+            while f.tell() < end:
+                line = f.readline().decode('utf-8').strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                ts = _row_timestamp(row)
+                if ts > 0.0:
+                    if timestamps['first_index'] < 0:
+                        timestamps['first_index'], timestamps['first'] = index, ts
+                    timestamps['last'] = ts
+                index += 1
+                yield row
+            while hybrid:
+                line = f.readline()
+                if not line:
+                    break
+                line = line.decode('utf-8').strip()
+                if line:
+                    yield json.loads(line)
+                    break
+
+    arrays = _featurize_labeled_rows(_iter_labeled_rows(rows(), with_next_state=hybrid), hybrid=hybrid)
+    return arrays, timestamps
+
+
+def _refresh_temporal_row(x: np.ndarray, y: np.ndarray, row: int, prev_feature: Optional[np.ndarray], prev_action_id: Optional[int]):
+    dim = BASE_FEATURE_DIM
+    if row > 0:
+        prev_feature, prev_action_id = x[row - 1, :dim], int(y[row - 1])
+    _augment_temporal_block(x[row:row + 1, :dim], y[row:row + 1], prev_feature, prev_action_id, x[row:row + 1])
+
+
+def _load_parallel(jsonl_path: Path, hybrid: bool, workers: int, ranges: List[Tuple[int, int]]) -> Tuple[np.ndarray, ...]:
+    outputs = [_GrowingArray((TEMPORAL_FEATURE_DIM,), np.float32), _GrowingArray((), np.int64)]
+    if hybrid:
+        outputs += [_GrowingArray((len(INTENT_VOCAB),), np.float32), _GrowingArray((CONTROL_TARGET_DIM,), np.float32)]
+    prev_ts = 0.0
+    prev_feature: Optional[np.ndarray] = None
+    prev_action_id: Optional[int] = None
+    tasks = [(jsonl_path, start, end, hybrid) for start, end in ranges]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields in range order, so stitching is deterministic whatever finishes first.
+        for arrays, timestamps in pool.map(_featurize_byte_range, tasks):
+            x, y = arrays[0], arrays[1]
+            count = len(x)
+            first = timestamps['first_index']
+            if 0 <= first < count and prev_ts > 0.0:
+                # Only the first timestamped row of a range saw a different previous timestamp.
+                x[first, DELTA_TIME_FEATURE_INDEX] = delta_time_feature(max(0.0, timestamps['first'] - prev_ts))
+                for row in (first, first + 1):
+                    if row < count:
+                        _refresh_temporal_row(x, y, row, prev_feature, prev_action_id)
+            if count and prev_feature is not None:
+                _refresh_temporal_row(x, y, 0, prev_feature, prev_action_id)
+            for output, array in zip(outputs, arrays):
+                output.reserve(count)[:] = array
+            if count:
+                prev_feature = x[-1, :BASE_FEATURE_DIM].copy()
+                prev_action_id = int(y[-1])
+            if timestamps['last'] > 0.0:
+                prev_ts = timestamps['last']
+
+    return tuple(output.finish() for output in outputs)
+
+
+def _load_rows(jsonl_path: Path, hybrid: bool, workers: int = 1) -> Tuple[np.ndarray, ...]:
+    # workers <= 0 uses every available core. Either way the output is identical to the serial path.
+    workers = _available_cpus() if int(workers) <= 0 else int(workers)
+    chunks = min(workers * PARALLEL_CHUNKS_PER_WORKER, jsonl_path.stat().st_size // max(1, PARALLEL_MIN_CHUNK_BYTES))
+    ranges = _byte_ranges(jsonl_path, chunks) if workers > 1 and chunks > 1 else []
+    if len(ranges) > 1:
+        return _load_parallel(jsonl_path, hybrid, min(workers, len(ranges)), ranges)
+    return _featurize_labeled_rows(_iter_labeled_rows(_iter_jsonl_rows(jsonl_path), with_next_state=hybrid), hybrid=hybrid)
+
+
+def load_dataset(jsonl_path: Path, workers: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    x, y = _load_rows(jsonl_path, hybrid=False, workers=workers)
+    if len(x) == 0:
         raise ValueError(f'No records found in dataset: {jsonl_path}')
-    x = _augment_temporal_stream(features, labels)
-    return x, np.array(labels, dtype=np.int64)
+    return x, y
 
 
-def load_dataset_sequences(jsonl_path: Path, sequence_length: int = 8) -> Tuple[np.ndarray, np.ndarray]:
-    x, y = load_dataset(jsonl_path)
+def load_dataset_sequences(jsonl_path: Path, sequence_length: int = 8, workers: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    x, y = load_dataset(jsonl_path, workers=workers)
     return _build_sequences(x, y, sequence_length, 'sequence_length', jsonl_path)
 
 
@@ -706,88 +1228,24 @@ def _control_target_from_states(current_state: Dict, next_state: Dict) -> np.nda
     return target
 
 
-def load_dataset_hybrid(jsonl_path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
-    rows = _read_jsonl_rows(jsonl_path)
-
-    if len(rows) < 2:
+def load_dataset_hybrid(jsonl_path: Path, workers: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    x, y, intent, control = _load_rows(jsonl_path, hybrid=True, workers=workers)
+    if len(x) == 0:
         raise ValueError(f'Not enough records for hybrid dataset. Need at least 2 rows in {jsonl_path}')
-
-    features: List[np.ndarray] = []
-    labels: List[int] = []
-    intents: List[np.ndarray] = []
-    controls: List[np.ndarray] = []
-    prev_ts = 0.0
-
-    for idx in range(len(rows) - 1):
-        row = rows[idx]
-        next_row = rows[idx + 1]
-        state = row.get('state', {})
-        action = row.get('action', {})
-        next_state = next_row.get('state', {})
-
-        ts = safe_timestamp_seconds(row.get('timestamp', state.get('timestamp')))
-        delta_time = max(0.0, ts - prev_ts) if prev_ts > 0.0 and ts > 0.0 else 0.0
-        if ts > 0.0:
-            prev_ts = ts
-
-        label_name = normalize_action_label(action)
-        features.append(state_to_feature_vector(state, delta_time=delta_time))
-        labels.append(ACTION_TO_ID[label_name])
-        intents.append(action_to_intent_vector(label_name))
-        controls.append(_control_target_from_states(state, next_state))
-
-    x = _augment_temporal_stream(features, labels)
-    return x, np.array(labels, dtype=np.int64), np.stack(intents).astype(np.float32), np.stack(controls).astype(np.float32)
+    return x, y, intent, control
 
 
 def load_dataset_sequences_hybrid(
     jsonl_path: Path,
     sequence_length: int = 8,
+    workers: int = 1,
 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
-    x, y, intent, control = load_dataset_hybrid(jsonl_path)
-    seq_len = max(2, int(sequence_length))
-    if len(x) < seq_len:
-        raise ValueError(f'Not enough records for hybrid sequence_length={seq_len}. Found {len(x)} in dataset: {jsonl_path}')
-
-    x_sequences: List[np.ndarray] = []
-    y_targets: List[int] = []
-    intent_targets: List[np.ndarray] = []
-    control_targets: List[np.ndarray] = []
-
-    for end_idx in range(seq_len - 1, len(x)):
-        start_idx = end_idx - seq_len + 1
-        x_sequences.append(np.stack(x[start_idx:end_idx + 1]))
-        y_targets.append(int(y[end_idx]))
-        intent_targets.append(intent[end_idx])
-        control_targets.append(control[end_idx])
-
-    return np.stack(x_sequences).astype(np.float32), np.array(y_targets, dtype=np.int64), np.stack(intent_targets).astype(np.float32), np.stack(control_targets).astype(np.float32)
+    return hybrid_sequence_windows(*load_dataset_hybrid(jsonl_path, workers=workers), sequence_length, jsonl_path=jsonl_path)
 
 
 def load_dataset_sequences_hybrid_dense(
     jsonl_path: Path,
     sequence_length: int = 8,
+    workers: int = 1,
 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
-    seq_len = max(2, int(sequence_length))
-    x, y, intent, control = load_dataset_hybrid(jsonl_path)
-    if len(x) < seq_len:
-        raise ValueError(f'Not enough records for hybrid sequence_length={seq_len}. Found {len(x)} in dataset: {jsonl_path}')
-
-    x_sequences: List[np.ndarray] = []
-    y_sequences: List[np.ndarray] = []
-    intent_sequences: List[np.ndarray] = []
-    control_sequences: List[np.ndarray] = []
-
-    for end_idx in range(seq_len - 1, len(x)):
-        start_idx = end_idx - seq_len + 1
-        x_sequences.append(np.stack(x[start_idx:end_idx + 1]))
-        y_sequences.append(np.array(y[start_idx:end_idx + 1], dtype=np.int64))
-        intent_sequences.append(np.stack(intent[start_idx:end_idx + 1]).astype(np.float32))
-        control_sequences.append(np.stack(control[start_idx:end_idx + 1]).astype(np.float32))
-
-    return (
-        np.stack(x_sequences).astype(np.float32),
-        np.stack(y_sequences).astype(np.int64),
-        np.stack(intent_sequences).astype(np.float32),
-        np.stack(control_sequences).astype(np.float32),
-    )
+    return hybrid_sequence_windows(*load_dataset_hybrid(jsonl_path, workers=workers), sequence_length, dense=True, jsonl_path=jsonl_path)
@@ -0,0 +1,98 @@
+import copy
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+FUSION_MODE = 'folded_input_projection'
+
+
+def fusable_normalization(bundle: dict) -> bool:
+    return bool(
+        bundle.get('normalize_features', True)
+        and bundle.get('feature_mean') is not None
+        and bundle.get('feature_std') is not None
+    )
+
+
+def _normalization_stats(bundle: dict) -> Tuple[np.ndarray, np.ndarray]:
+    mean = np.asarray(bundle['feature_mean'], dtype=np.float32).astype(np.float64)
+    safe_std = np.maximum(np.asarray(bundle['feature_std'], dtype=np.float32), 1e-8).astype(np.float64)
+    return mean, safe_std
+
+
+def _input_projections(model: nn.Module) -> List[Tuple[nn.Module, str, str]]:
+    lstm = getattr(model, 'lstm', None)
+    if isinstance(lstm, nn.LSTM):
+        suffixes = ['_l0'] + (['_l0_reverse'] if lstm.bidirectional else [])
+        return [(lstm, f'weight_ih{suffix}', f'bias_ih{suffix}') for suffix in suffixes]
+    for container in ('backbone', 'net'):
+        layers = getattr(model, container, None)
+        if isinstance(layers, nn.Sequential) and isinstance(layers[0], nn.Linear):
+            return [(layers[0], 'weight', 'bias')]
+    raise ValueError(f'No input projection to fold normalization into for {type(model).__name__}.')
+
+
+def fold_normalization(model: nn.Module, bundle: dict) -> nn.Module:
+    # W @ ((x - mean) / std) + b == (W / std) @ x + (b - W @ (mean / std)); folded in float64.
+    folded = copy.deepcopy(model).eval()
+    mean, safe_std = _normalization_stats(bundle)
+    mean_t = torch.from_numpy(mean)
+    std_t = torch.from_numpy(safe_std)
+    with torch.no_grad():
+        for module, weight_name, bias_name in _input_projections(folded):
+            weight = getattr(module, weight_name)
+            bias = getattr(module, bias_name)
+            scaled = weight.double() / std_t
+            bias.copy_((bias.double() - scaled @ mean_t).float())
+            weight.copy_(scaled.float())
+    return folded
+
+
+class FusedNormalizedPolicy(nn.Module):
+    def __init__(self, model: nn.Module, bundle: dict):
+        super().__init__()
+        self.model = fold_normalization(model, bundle)
+        self.log_scale = bool(bundle.get('normalize_log_scale', False))
+        clip_value = float(bundle.get('normalize_clip_value', 10.0))
+        self.clip_enabled = clip_value > 0
+        mean, safe_std = _normalization_stats(bundle)
+        # Clipping the normalized value to [-c, c] is clipping the raw value to mean -/+ c * std.
+        span = clip_value * safe_std if self.clip_enabled else np.full_like(safe_std, np.inf)
+        self.register_buffer('lower', torch.from_numpy((mean - span).astype(np.float32)))
+        self.register_buffer('upper', torch.from_numpy((mean + span).astype(np.float32)))
+
+    def prepare(self, x: torch.Tensor) -> torch.Tensor:
+        x = torch.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
+        if self.log_scale:
+            x = torch.sign(x) * torch.log1p(torch.abs(x))
+        if self.clip_enabled:
+            x = torch.clamp(x, self.lower, self.upper)
+        return x
+
+    def forward(self, x: torch.Tensor):
+        return self.model(self.prepare(x))
+
+
+class FusedNormalizedSequencePolicy(FusedNormalizedPolicy):
+    def __init__(self, model: nn.Module, bundle: dict):
+        super().__init__(model, bundle)
+        self.bidirectional = bool(getattr(model, 'bidirectional', False))
+
+    @torch.jit.export
+    def forward_with_state(self, x: torch.Tensor, state: Optional[Tuple[torch.Tensor, torch.Tensor]] = None):
+        return self.model.forward_with_state(self.prepare(x), state)
+
+
+def fuse_policy_model(bundle: dict) -> nn.Module:
+    model = bundle['model'].eval()
+    if str(bundle.get('model_type', 'mlp')) == 'lstm' and hasattr(model, 'forward_with_state'):
+        return FusedNormalizedSequencePolicy(model, bundle).eval()
+    return FusedNormalizedPolicy(model, bundle).eval()
+
+
+def compile_fused_policy(fused: nn.Module):
+    preserved = ['forward_with_state', 'bidirectional'] if hasattr(fused, 'forward_with_state') else []
+    return torch.jit.freeze(torch.jit.script(fused), preserved_attrs=preserved)
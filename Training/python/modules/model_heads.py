@@ -1,3 +1,6 @@
+from typing import Optional, Tuple
+
+import torch
 import torch.nn as nn
 
 
@@ -80,6 +83,12 @@ class BehaviorLSTM(nn.Module):
         shared = self.shared_head(last_step)
         return self.action_head(shared), self.intent_head(shared), self.control_head(shared)
 
+    def forward_with_state(self, x, state: Optional[Tuple[torch.Tensor, torch.Tensor]] = None):
+        output, next_state = self.lstm(x, state)
+        last_step = self.norm(output[:, -1, :])
+        shared = self.shared_head(last_step)
+        return (self.action_head(shared), self.intent_head(shared), self.control_head(shared)), next_state
+
 
 class LegacyBehaviorMLP(nn.Module):
     def __init__(self, in_features: int, num_actions: int, dropout: float = 0.2):
@@ -120,3 +129,7 @@ class LegacyBehaviorLSTM(nn.Module):
     def forward(self, x):
         output, _ = self.lstm(x)
         return self.head(output[:, -1, :])
+
+    def forward_with_state(self, x, state: Optional[Tuple[torch.Tensor, torch.Tensor]] = None):
+        output, next_state = self.lstm(x, state)
+        return self.head(output[:, -1, :]), next_state
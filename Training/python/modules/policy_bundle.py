@@ -11,9 +11,21 @@ from modules.model_heads import (
     LegacyBehaviorLSTM,
     LegacyBehaviorMLP,
 )
+from modules.compiled_policy import (
+    NormalizedPolicy,
+    compile_policy,
+    compiled_policy_path,
+    example_policy_input,
+    load_compiled_policy,
+    measure_latency_ms,
+    output_delta,
+    save_compiled_policy,
+)
+from modules.fused_policy import FUSION_MODE, compile_fused_policy, fusable_normalization, fuse_policy_model
+from modules.quantized_policy import QUANTIZATION_MODE, quantize_policy_model
 
 
-def load_model(model_path: Path):
+def load_model(model_path: Path, prefer_compiled: bool = True, quantize: bool = False, fuse_normalization: bool = False):
     payload = torch.load(model_path, map_location='cpu')
     in_features = int(payload['in_features'])
     dropout = float(payload.get('dropout', 0.2))
@@ -68,7 +80,7 @@ def load_model(model_path: Path):
         mean_arr = None
         std_arr = None
 
-    return {
+    bundle = {
         'model': model,
         'in_features': in_features,
         'feature_mean': mean_arr,
@@ -86,3 +98,90 @@ def load_model(model_path: Path):
         'sequence_supervision': bool(payload.get('sequence_supervision', False)),
         'temporal_context_features': bool(payload.get('temporal_context_features', False)),
     }
+    if quantize:
+        _attach_quantized_model(bundle)
+    elif fuse_normalization and fusable_normalization(bundle):
+        _attach_fused_model(bundle, compile_graph=prefer_compiled)
+    elif prefer_compiled:
+        _attach_compiled_model(bundle, Path(model_path))
+    return bundle
+
+
+def _eager_reference(bundle: dict):
+    eager = bundle['model']
+    normalize = NormalizedPolicy(eager, bundle).normalize
+    return lambda x: eager(normalize(x))
+
+
+def _attach_compiled_model(bundle: dict, model_path: Path):
+    compiled_path = compiled_policy_path(model_path)
+    try:
+        compiled = load_compiled_policy(compiled_path, model_path)
+    except Exception as exc:
+        print(f'compiled policy ignored ({compiled_path}): {type(exc).__name__}: {exc}')
+        return
+    if compiled is None:
+        return
+
+    example = example_policy_input(bundle)
+    eager_ms = measure_latency_ms(_eager_reference(bundle), example)
+    compiled_ms = measure_latency_ms(compiled, example)
+    print(f'compiled policy: {compiled_path} eager {eager_ms:.3f} ms -> compiled {compiled_ms:.3f} ms per batch-1 call')
+    bundle['eager_model'] = bundle['model']
+    bundle['model'] = compiled
+    bundle['compiled_path'] = str(compiled_path)
+    bundle['normalization_in_graph'] = True
+    bundle['latency_ms'] = {'eager': float(eager_ms), 'compiled': float(compiled_ms)}
+
+
+def _attach_fused_model(bundle: dict, compile_graph: bool = True):
+    fused = fuse_policy_model(bundle)
+    if compile_graph:
+        fused = compile_fused_policy(fused)
+
+    generator = torch.Generator().manual_seed(0)
+    example = example_policy_input(bundle, batch_size=4)
+    example = torch.randn(example.shape, generator=generator) + torch.from_numpy(bundle['feature_mean'])
+    reference = _eager_reference(bundle)
+    with torch.no_grad():
+        delta = output_delta(reference(example), fused(example))
+    example = example_policy_input(bundle)
+    eager_ms = measure_latency_ms(reference, example)
+    fused_ms = measure_latency_ms(fused, example)
+    print(f'fused policy: {FUSION_MODE} eager {eager_ms:.3f} ms -> fused {fused_ms:.3f} ms per batch-1 call (max abs delta {delta:.3g})')
+    bundle['unfused_model'] = bundle['model']
+    bundle['model'] = fused
+    bundle['fused_normalization'] = FUSION_MODE
+    bundle['fusion_delta'] = float(delta)
+    bundle['normalization_in_graph'] = True
+    bundle['latency_ms'] = {'eager': float(eager_ms), 'fused': float(fused_ms)}
+
+
+def _attach_quantized_model(bundle: dict):
+    quantized = quantize_policy_model(bundle['model'])
+    example = NormalizedPolicy(bundle['model'], bundle).normalize(example_policy_input(bundle))
+    float_ms = measure_latency_ms(bundle['model'], example)
+    quantized_ms = measure_latency_ms(quantized, example)
+    print(f'quantized policy: {QUANTIZATION_MODE} float {float_ms:.3f} ms -> int8 {quantized_ms:.3f} ms per batch-1 call')
+    bundle['float_model'] = bundle['model']
+    bundle['model'] = quantized
+    bundle['quantized'] = QUANTIZATION_MODE
+    bundle['latency_ms'] = {'float': float(float_ms), 'quantized': float(quantized_ms)}
+
+
+def export_compiled_model(model_path: Path, output_path: Path = None, tolerance: float = 1e-4) -> Path:
+    model_path = Path(model_path)
+    output_path = Path(output_path) if output_path is not None else compiled_policy_path(model_path)
+    bundle = load_model(model_path, prefer_compiled=False)
+    compiled = compile_policy(bundle)
+
+    generator = torch.Generator().manual_seed(0)
+    example = example_policy_input(bundle, batch_size=4)
+    example = torch.randn(example.shape, generator=generator) * 3.0
+    with torch.no_grad():
+        delta = output_delta(_eager_reference(bundle)(example), compiled(example))
+    if delta > tolerance:
+        raise RuntimeError(f'Compiled policy diverges from eager model (max abs delta {delta:.3g} > {tolerance:.3g}).')
+
+    save_compiled_policy(compiled, output_path, model_path)
+    return output_path
@@ -0,0 +1,92 @@
+import io
+from typing import Dict, Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from modules.compiled_policy import measure_latency_ms
+from modules.serving.incremental import split_model_output
+
+
+QUANTIZATION_MODE = 'dynamic_int8'
+
+
+def quantize_policy_model(model: nn.Module) -> nn.Module:
+    return torch.ao.quantization.quantize_dynamic(model.eval(), {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+
+def serialized_size_mb(model: nn.Module) -> float:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 ** 2)
+
+
+def sequence_windows(frames: np.ndarray, sequence_length: int) -> np.ndarray:
+    frames = np.asarray(frames, dtype=np.float32)
+    seq_len = max(1, int(sequence_length))
+    # Windows start padded with the first frame, the same way a fresh serving session does.
+    index = np.arange(len(frames))[:, None] + np.arange(-seq_len + 1, 1)[None, :]
+    return frames[np.clip(index, 0, None)]
+
+
+def _batched_outputs(model: nn.Module, x: np.ndarray, batch_size: int):
+    actions, controls = [], []
+    with torch.no_grad():
+        for start in range(0, len(x), batch_size):
+            action_logits, _, control_pred = split_model_output(model(torch.from_numpy(x[start:start + batch_size])))
+            actions.append(torch.softmax(action_logits, dim=-1))
+            if control_pred is not None:
+                controls.append(control_pred)
+    return torch.cat(actions), (torch.cat(controls) if controls else None)
+
+
+def quantization_report(
+    float_model: nn.Module,
+    quantized_model: nn.Module,
+    x: np.ndarray,
+    labels: Optional[np.ndarray] = None,
+    batch_size: int = 256,
+) -> Dict[str, Optional[float]]:
+    float_probs, float_control = _batched_outputs(float_model, x, batch_size)
+    quant_probs, quant_control = _batched_outputs(quantized_model, x, batch_size)
+    float_pred = torch.argmax(float_probs, dim=-1)
+    quant_pred = torch.argmax(quant_probs, dim=-1)
+    prob_drift = torch.max(torch.abs(float_probs - quant_probs), dim=-1).values
+
+    report: Dict[str, Optional[float]] = {
+        'rows': int(len(x)),
+        'action_agreement': float((float_pred == quant_pred).float().mean().item()),
+        'prob_drift_mean': float(prob_drift.mean().item()),
+        'prob_drift_max': float(prob_drift.max().item()),
+        'control_mae': float(torch.mean(torch.abs(float_control - quant_control)).item()) if float_control is not None else None,
+        'float_accuracy': None,
+        'quantized_accuracy': None,
+        'accuracy_delta': None,
+    }
+    if labels is not None:
+        target = torch.as_tensor(np.asarray(labels, dtype=np.int64))
+        float_accuracy = float((float_pred == target).float().mean().item())
+        quant_accuracy = float((quant_pred == target).float().mean().item())
+        report.update(
+            float_accuracy=float_accuracy,
+            quantized_accuracy=quant_accuracy,
+            accuracy_delta=quant_accuracy - float_accuracy,
+        )
+
+    example = torch.from_numpy(np.ascontiguousarray(x[:1]))
+    report.update(
+        float_ms=measure_latency_ms(float_model, example),
+        quantized_ms=measure_latency_ms(quantized_model, example),
+        float_step_ms=None,
+        quantized_step_ms=None,
+        float_size_mb=serialized_size_mb(float_model),
+        quantized_size_mb=serialized_size_mb(quantized_model),
+    )
+    if example.dim() == 3 and hasattr(float_model, 'forward_with_state'):
+        step = example[:, -1:, :]
+        report.update(
+            float_step_ms=measure_latency_ms(float_model.forward_with_state, step),
+            quantized_step_ms=measure_latency_ms(quantized_model.forward_with_state, step),
+        )
+    return report
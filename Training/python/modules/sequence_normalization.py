@@ -33,11 +33,21 @@ def compute_feature_stats(
     model_type: str,
     min_feature_std: float,
     preserve_binary_features: bool = True,
+    weights: Optional[np.ndarray] = None,
 ) -> Tuple[np.ndarray, np.ndarray]:
+    # weights (one per row after flattening) count repeated rows without materializing them,
+    # e.g. how many training windows contain each frame.
     base = _flatten_features_for_stats(x, model_type=model_type)
 
-    mean = base.mean(axis=0).astype(np.float32)
-    std = base.std(axis=0).astype(np.float32)
+    if weights is None:
+        mean = base.mean(axis=0).astype(np.float32)
+        std = base.std(axis=0).astype(np.float32)
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+        mean64 = np.average(base, axis=0, weights=weights)
+        std = np.sqrt(np.average(np.square(base - mean64), axis=0, weights=weights)).astype(np.float32)
+        mean = mean64.astype(np.float32)
+        base = base[weights > 0]
     safe_std = np.maximum(std, float(min_feature_std)).astype(np.float32)
 
     if bool(preserve_binary_features):
@@ -97,6 +107,36 @@ def preprocess_and_normalize_sequences(
     return train_norm, val_norm, feature_mean.astype(np.float32), feature_std.astype(np.float32)
 
 
+def preprocess_and_normalize_frames(
+    frames: np.ndarray,
+    train_weights: np.ndarray,
+    normalize: bool,
+    min_feature_std: float,
+    clip_value: Optional[float] = 10.0,
+    preserve_binary_features: bool = True,
+    log_scale: bool = False,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Per-frame counterpart of preprocess_and_normalize_sequences for window datasets: stats are
+    # weighted by how many training windows contain each frame, and every transform is
+    # elementwise, so windows cut from the result match windows normalized one by one.
+    arr = sanitize_features(frames)
+    if bool(log_scale):
+        arr = log_scale_signed(arr)
+
+    feature_mean, feature_std = compute_feature_stats(
+        arr,
+        model_type='mlp',
+        min_feature_std=min_feature_std,
+        preserve_binary_features=preserve_binary_features,
+        weights=train_weights,
+    )
+    if not bool(normalize):
+        return arr, np.zeros_like(feature_mean, dtype=np.float32), np.ones_like(feature_std, dtype=np.float32)
+
+    normalized = apply_feature_normalization(arr, feature_mean, feature_std, clip_value=clip_value)
+    return normalized, feature_mean.astype(np.float32), feature_std.astype(np.float32)
+
+
 def save_feature_stats(stats_path: Path, feature_mean: np.ndarray, feature_std: np.ndarray) -> None:
     path = Path(stats_path)
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1 @@
+"""Runtime helpers for the policy inference server."""
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+@dataclass
+class ModelTrack:
+    model_generation: int = 0
+    layout_generation: int = 0
+    lstm_state: Optional[tuple] = None
+    incremental_steps: int = 0
+    sequence: int = 0
+
+
+@dataclass
+class AgentSession:
+    agent_key: str
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    slot: Optional[int] = None
+    tracks: Dict[str, ModelTrack] = field(default_factory=dict)
+    shadow_sequence: int = 0
+    last_action: Optional[str] = None
+    last_ts: float = 0.0
+    last_base_feature: Optional[np.ndarray] = None
+    last_seen: float = 0.0
+    evicted: bool = False
+
+    def track(self, model_name: str) -> ModelTrack:
+        track = self.tracks.get(model_name)
+        if track is None:
+            track = ModelTrack()
+            self.tracks[model_name] = track
+        return track
+
+
+class AgentSessionStore:
+    def __init__(
+        self,
+        capacity: int = 4096,
+        ttl_seconds: float = 1800.0,
+        on_evict: Optional[Callable[[AgentSession], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = max(1, int(capacity))
+        self.ttl_seconds = float(ttl_seconds)
+        self.on_evict = on_evict
+        self.clock = clock
+        self._sessions: 'OrderedDict[str, AgentSession]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, agent_key: str) -> bool:
+        return agent_key in self._sessions
+
+    def touch(self, agent_key: str) -> AgentSession:
+        now = self.clock()
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(agent_key)
+            if session is None:
+                session = AgentSession(agent_key=agent_key)
+                self._sessions[agent_key] = session
+            else:
+                self._sessions.move_to_end(agent_key)
+            session.last_seen = now
+
+            if self.ttl_seconds > 0:
+                cutoff = now - self.ttl_seconds
+                while self._sessions:
+                    oldest = next(iter(self._sessions.values()))
+                    if oldest.last_seen >= cutoff:
+                        break
+                    evicted.append(self._sessions.popitem(last=False)[1])
+                    self.expirations += 1
+            while len(self._sessions) > self.capacity:
+                evicted.append(self._sessions.popitem(last=False)[1])
+                self.evictions += 1
+
+        self._notify_evicted(evicted)
+        return session
+
+    @contextmanager
+    def locked(self, agent_key: str):
+        session = self.touch(agent_key)
+        with session.lock:
+            try:
+                yield session
+            finally:
+                if session.evicted and self.on_evict is not None:
+                    self.on_evict(session)
+
+    @contextmanager
+    def held(self, session: AgentSession):
+        # Locks an existing session without touching it; like locked(), the holder releases the
+        # slot of a session evicted meanwhile, since eviction skips sessions that are in use.
+        with session.lock:
+            try:
+                yield session
+            finally:
+                if session.evicted and self.on_evict is not None:
+                    self.on_evict(session)
+
+    def get(self, agent_key: str) -> Optional[AgentSession]:
+        return self._sessions.get(agent_key)
+
+    def drop(self, agent_key: str) -> Optional[AgentSession]:
+        with self._lock:
+            session = self._sessions.pop(agent_key, None)
+        if session is not None:
+            self._notify_evicted([session])
+        return session
+
+    def clear(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        self._notify_evicted(sessions)
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'active_agents': len(self._sessions),
+            'capacity': int(self.capacity),
+            'evictions': int(self.evictions),
+            'expirations': int(self.expirations),
+        }
+
+    def _notify_evicted(self, sessions):
+        for session in sessions:
+            session.evicted = True
+            if self.on_evict is None or not session.lock.acquire(blocking=False):
+                continue
+            try:
+                self.on_evict(session)
+            finally:
+                session.lock.release()
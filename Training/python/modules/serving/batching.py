@@ -0,0 +1,96 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+
+class MicroBatcher:
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_seconds = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: queue.Queue = queue.Queue()
+        self._backlog: List[tuple] = []
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item, key: Optional[str] = None):
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((key, item, future))
+        return future.result()
+
+    def queue_depth(self) -> int:
+        return int(self._queue.qsize() + len(self._backlog))
+
+    def stats(self):
+        return {
+            'batches': int(self.batches),
+            'items': int(self.items),
+            'mean_batch_size': float(self.items / self.batches) if self.batches else None,
+            'queue_depth': self.queue_depth(),
+            'max_batch_size': int(self.max_batch_size),
+            'max_wait_ms': float(self.max_wait_seconds * 1000.0),
+        }
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._worker_loop, name='policy-micro-batcher', daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[tuple]:
+        batch: List[tuple] = []
+        seen_keys = set()
+        deferred: List[tuple] = []
+
+        def accept(entry) -> bool:
+            key = entry[0]
+            if len(batch) >= self.max_batch_size:
+                deferred.append(entry)
+                return False
+            if key is not None and key in seen_keys:
+                deferred.append(entry)
+                return False
+            if key is not None:
+                seen_keys.add(key)
+            batch.append(entry)
+            return True
+
+        backlog, self._backlog = self._backlog, []
+        for entry in backlog:
+            accept(entry)
+        if not batch:
+            accept(self._queue.get())
+
+        deadline = time.perf_counter() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            accept(entry)
+
+        self._backlog = deferred
+        return batch
+
+    def _worker_loop(self):
+        while True:
+            batch = self._collect()
+            items = [entry[1] for entry in batch]
+            try:
+                results = self.run_batch(items)
+            except Exception as exc:
+                for _, _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,382 @@
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+
+DEFAULT_VIRTUAL_NODES = 64
+WORKER_APP = 'serve_policy:app'
+
+
+def _ring_hash(text: str) -> int:
+    return int.from_bytes(hashlib.md5(str(text).encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    def __init__(self, nodes: Sequence[int], virtual_nodes: int = DEFAULT_VIRTUAL_NODES):
+        points = sorted(
+            (_ring_hash(f'worker-{node}#{replica}'), int(node))
+            for node in nodes
+            for replica in range(max(1, int(virtual_nodes)))
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str, available: Optional[Set[int]] = None) -> Optional[int]:
+        if not self._nodes:
+            return None
+        start = bisect_right(self._hashes, _ring_hash(key)) % len(self._nodes)
+        # An unavailable node hands its agents to the next node clockwise; everyone else stays put.
+        for offset in range(len(self._nodes)):
+            node = self._nodes[(start + offset) % len(self._nodes)]
+            if available is None or node in available:
+                return node
+        return None
+
+
+def free_port(host: str = '127.0.0.1') -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return int(sock.getsockname()[1])
+
+
+def worker_cpus(index: int, threads: int) -> List[int]:
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    threads = max(1, int(threads))
+    return [cpus[(index * threads + offset) % len(cpus)] for offset in range(min(threads, len(cpus)))]
+
+
+def default_worker_count(threads: int) -> int:
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    return max(1, cpus // max(1, int(threads)))
+
+
+class WorkerProcess:
+    def __init__(self, index: int, host: str, port: int, threads: int, pin_cpus: bool = False, cwd: Optional[Path] = None):
+        self.index = int(index)
+        self.host = host
+        self.port = int(port)
+        self.threads = max(1, int(threads))
+        self.cpus = worker_cpus(self.index, self.threads) if pin_cpus else None
+        self.cwd = Path(cwd) if cwd is not None else Path(__file__).resolve().parents[2]
+        self.process: Optional[subprocess.Popen] = None
+        self.ready = False
+        self.starts = 0
+        self.started_at = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def start(self):
+        threads = str(self.threads)
+        env = {
+            **os.environ,
+            'POLICY_TORCH_THREADS': threads,
+            'POLICY_CLUSTER_WORKER_INDEX': str(self.index),
+            'OMP_NUM_THREADS': threads,
+            'MKL_NUM_THREADS': threads,
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', WORKER_APP, '--host', self.host, '--port', str(self.port), '--log-level', 'warning'],
+            cwd=str(self.cwd),
+            env=env,
+        )
+        if self.cpus is not None and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(self.process.pid, self.cpus)
+            except OSError as exc:
+                self.last_error = f'sched_setaffinity failed: {exc}'
+        self.ready = False
+        self.starts += 1
+        self.started_at = time.time()
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def fetch_health(self, timeout: float = 2.0) -> Optional[dict]:
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        try:
+            connection.request('GET', '/health')
+            response = connection.getresponse()
+            return json.loads(response.read()) if response.status == 200 else None
+        except (OSError, ValueError):
+            return None
+        finally:
+            connection.close()
+
+    def stop(self, timeout: float = 10.0):
+        self.ready = False
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def describe(self):
+        return {
+            'index': self.index,
+            'url': self.url,
+            'pid': self.process.pid if self.process is not None else None,
+            'alive': self.alive(),
+            'ready': bool(self.ready),
+            'torch_threads': self.threads,
+            'cpus': self.cpus,
+            'starts': int(self.starts),
+            'started_at': float(self.started_at),
+            'last_error': self.last_error,
+        }
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class WorkerClient:
+    # Minimal keep-alive HTTP/1.1 client: a generic async client costs several times the
+    # dispatcher CPU per proxied request, and the dispatcher is the one process that cannot scale out.
+    def __init__(self, host: str, port: int, timeout: float = 5.0, max_idle: int = 256):
+        self.host = host
+        self.port = int(port)
+        self.timeout = float(timeout)
+        self.max_idle = int(max_idle)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes = b'',
+        content_type: str = 'application/json',
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, str, bytes]:
+        extra = ''.join(f'{key}: {value}\r\n' for key, value in (headers or {}).items())
+        head = (
+            f'{method} {path} HTTP/1.1\r\nhost: {self.host}:{self.port}\r\n'
+            f'content-type: {content_type}\r\ncontent-length: {len(body)}\r\n{extra}\r\n'
+        ).encode('latin-1')
+        while self._idle:
+            # Idle connections may have been closed by the worker's keep-alive timeout or a restart.
+            connection = self._idle.pop()
+            try:
+                return await self._exchange(connection, head + body, reused=True)
+            except _StaleConnection:
+                continue
+        try:
+            connection = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError) as exc:
+            raise UpstreamError(f'connect failed: {type(exc).__name__}: {exc}') from exc
+        return await self._exchange(connection, head + body, reused=False)
+
+    async def _exchange(self, connection, payload: bytes, reused: bool) -> Tuple[int, str, bytes]:
+        reader, writer = connection
+        try:
+            writer.write(payload)
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+            if not status_line:
+                raise asyncio.IncompleteReadError(b'', None)
+            status, content_type, body, keep_alive = await asyncio.wait_for(self._read_response(reader, status_line), self.timeout)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as exc:
+            writer.close()
+            if reused and isinstance(exc, (ConnectionError, asyncio.IncompleteReadError)):
+                raise _StaleConnection() from exc
+            raise UpstreamError(f'{type(exc).__name__}: {exc}') from exc
+        if keep_alive and len(self._idle) < self.max_idle:
+            self._idle.append(connection)
+        else:
+            writer.close()
+        return status, content_type, body
+
+    async def _read_response(self, reader: asyncio.StreamReader, status_line: bytes):
+        status = int(status_line.split(b' ', 2)[1])
+        headers: Dict[bytes, bytes] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.partition(b':')
+            headers[key.strip().lower()] = value.strip()
+        if headers.get(b'transfer-encoding', b'').lower() == b'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';', 1)[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            body = b''.join(chunks)
+        else:
+            body = await reader.readexactly(int(headers.get(b'content-length', b'0')))
+        keep_alive = headers.get(b'connection', b'').lower() != b'close'
+        return status, headers.get(b'content-type', b'application/json').decode('latin-1'), body, keep_alive
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class _StaleConnection(Exception):
+    pass
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        count: int,
+        threads: int = 1,
+        host: str = '127.0.0.1',
+        base_port: int = 0,
+        pin_cpus: bool = False,
+        virtual_nodes: int = DEFAULT_VIRTUAL_NODES,
+        check_interval: float = 1.0,
+        startup_timeout: float = 180.0,
+    ):
+        count = max(1, int(count))
+        self.workers: List[WorkerProcess] = [
+            WorkerProcess(
+                index,
+                host,
+                int(base_port) + index if int(base_port) > 0 else free_port(host),
+                threads,
+                pin_cpus=pin_cpus,
+            )
+            for index in range(count)
+        ]
+        self.virtual_nodes = max(1, int(virtual_nodes))
+        self.ring = HashRing([worker.index for worker in self.workers], virtual_nodes=self.virtual_nodes)
+        self.check_interval = max(0.05, float(check_interval))
+        self.startup_timeout = float(startup_timeout)
+        self.started = threading.Event()
+        self.restarts = 0
+        self._available: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._supervise, name='policy-worker-supervisor', daemon=True)
+        self._thread.start()
+
+    def ready(self) -> bool:
+        # Ready once every worker has come up; afterwards any live worker keeps the pool serving.
+        return self.started.is_set() and bool(self._available)
+
+    def _supervise(self):
+        while not self._stop.is_set():
+            for worker in self.workers:
+                if self._stop.is_set():
+                    break
+                if not worker.alive():
+                    if worker.process is not None:
+                        worker.last_error = f'exited with code {worker.process.returncode}'
+                        self.restarts += 1
+                    self._set_ready(worker, False)
+                    worker.start()
+                elif not worker.ready:
+                    health = worker.fetch_health(timeout=1.0)
+                    # Workers load and warm up in the background; they only take traffic once ready.
+                    self._set_ready(worker, health is not None and bool(health.get('ready', True)))
+                    if not worker.ready and self.startup_timeout > 0 and time.time() - worker.started_at > self.startup_timeout:
+                        worker.stop()
+                        worker.last_error = f'not ready after {self.startup_timeout:.0f}s'
+            if len(self._available) == len(self.workers):
+                self.started.set()
+            self._stop.wait(self.check_interval)
+
+    def _set_ready(self, worker: WorkerProcess, ready: bool):
+        with self._lock:
+            worker.ready = bool(ready)
+            available = set(self._available)
+            if ready:
+                available.add(worker.index)
+            else:
+                available.discard(worker.index)
+            # Readers take the set without locking, so it is replaced rather than mutated.
+            self._available = available
+
+    def mark_failed(self, index: int, error: str):
+        worker = self.workers[index]
+        worker.last_error = error
+        # The supervisor restarts a dead worker or re-admits a live one once /health answers again.
+        self._set_ready(worker, False)
+
+    def worker_for(self, agent_key: str) -> Optional[WorkerProcess]:
+        index = self.ring.node_for(agent_key, self._available)
+        return self.workers[index] if index is not None else None
+
+    def available(self) -> List[WorkerProcess]:
+        return [worker for worker in self.workers if worker.index in self._available]
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        for worker in self.workers:
+            worker.stop()
+
+    def stats(self):
+        return {
+            'workers': len(self.workers),
+            'ready': self.ready(),
+            'ready_workers': len(self._available),
+            'restarts': int(self.restarts),
+            'virtual_nodes': self.virtual_nodes,
+            'worker_status': [worker.describe() for worker in self.workers],
+        }
+
+
+def merge_prometheus(texts: Sequence[Tuple[str, str]]) -> str:
+    families: 'OrderedDict[str, Dict[str, List[str]]]' = OrderedDict()
+    for worker, text in texts:
+        types: Dict[str, str] = {}
+        for line in text.splitlines():
+            if line.startswith('# '):
+                parts = line.split(' ', 3)
+                if len(parts) < 3:
+                    continue
+                family = families.setdefault(parts[2], {'meta': [], 'samples': []})
+                if parts[1] == 'TYPE':
+                    types[parts[2]] = parts[3] if len(parts) > 3 else 'untyped'
+                if line not in family['meta']:
+                    family['meta'].append(line)
+                continue
+            if not line.strip():
+                continue
+            name_end = min((pos for pos in (line.find('{'), line.find(' ')) if pos >= 0), default=len(line))
+            name = line[:name_end]
+            family_name = name
+            for suffix in ('_bucket', '_sum', '_count'):
+                if name.endswith(suffix) and types.get(name[:-len(suffix)]) == 'histogram':
+                    family_name = name[:-len(suffix)]
+                    break
+            label = f'worker="{worker}"'
+            if line[name_end:name_end + 1] == '{':
+                closing = line[name_end + 1:name_end + 2] == '}'
+                line = f'{name}{{{label}{"" if closing else ","}{line[name_end + 1:]}'
+            else:
+                line = f'{name}{{{label}}}{line[name_end:]}'
+            families.setdefault(family_name, {'meta': [], 'samples': []})['samples'].append(line)
+    lines: List[str] = []
+    for family in families.values():
+        lines.extend(family['meta'])
+        lines.extend(family['samples'])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from modules.serving.registry import agent_bucket
+
+
+class DegradationController:
+    def __init__(
+        self,
+        model: str,
+        high_pending: float = 32.0,
+        low_pending: float = 8.0,
+        step_percent: float = 25.0,
+        max_percent: float = 100.0,
+        interval_seconds: float = 1.0,
+        hold_seconds: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.model = str(model)
+        self.high_pending = float(high_pending)
+        self.low_pending = float(low_pending)
+        self.step_percent = max(0.01, float(step_percent))
+        self.max_percent = min(100.0, max(0.0, float(max_percent)))
+        self.max_level = max(1, int(-(-self.max_percent // self.step_percent)))
+        self.interval_seconds = max(0.01, float(interval_seconds))
+        self.hold_seconds = max(0.0, float(hold_seconds))
+        self.clock = clock
+        self.level = 0
+        self.switches = {'up': 0, 'down': 0}
+        self.last_pressure: Optional[float] = None
+        self.last_switch_at: Optional[float] = None
+        self._window_started = clock()
+        self._window_sum = 0.0
+        self._window_count = 0
+        self._changed_at = self._window_started
+        self._lock = threading.Lock()
+
+    @property
+    def degraded_percent(self) -> float:
+        return min(self.max_percent, self.level * self.step_percent)
+
+    def observe(self, pending: float) -> int:
+        # Pressure is the mean pending count over one interval. Stepping up needs one busy
+        # interval; stepping down needs hold_seconds since the last switch, so tiers do not flap.
+        now = self.clock()
+        with self._lock:
+            self._window_sum += float(pending)
+            self._window_count += 1
+            if now - self._window_started < self.interval_seconds:
+                return 0
+            pressure = self._window_sum / self._window_count
+            self.last_pressure = pressure
+            self._window_started = now
+            self._window_sum = 0.0
+            self._window_count = 0
+            if pressure >= self.high_pending and self.level < self.max_level:
+                step = 1
+            elif pressure <= self.low_pending and self.level > 0 and now - self._changed_at >= self.hold_seconds:
+                step = -1
+            else:
+                return 0
+            self.level += step
+            self._changed_at = now
+            self.last_switch_at = time.time()
+            self.switches['up' if step > 0 else 'down'] += 1
+            return step
+
+    def eligible(self, agent_key: str, bucket: Optional[float] = None) -> bool:
+        return (agent_bucket(agent_key) if bucket is None else bucket) < self.max_percent
+
+    def degraded(self, agent_key: str, bucket: Optional[float] = None) -> bool:
+        if self.level <= 0:
+            return False
+        return (agent_bucket(agent_key) if bucket is None else bucket) < self.degraded_percent
+
+    def stats(self):
+        return {
+            'model': self.model,
+            'level': int(self.level),
+            'max_level': int(self.max_level),
+            'degraded_agent_percent': float(self.degraded_percent),
+            'pressure': self.last_pressure,
+            'high_pending': self.high_pending,
+            'low_pending': self.low_pending,
+            'hold_seconds': self.hold_seconds,
+            'switches': dict(self.switches),
+            'last_switch_at': self.last_switch_at,
+        }
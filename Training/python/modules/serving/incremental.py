@@ -0,0 +1,83 @@
+from typing import Dict, Optional
+
+import numpy as np
+import torch
+
+
+def supports_incremental(model) -> bool:
+    if not hasattr(model, 'forward_with_state'):
+        return False
+    return not bool(getattr(model, 'bidirectional', False))
+
+
+def split_model_output(model_out):
+    if isinstance(model_out, tuple) and len(model_out) == 3:
+        return model_out[0], model_out[1], model_out[2]
+    return model_out, None, None
+
+
+def action_probs(action_logits: torch.Tensor) -> torch.Tensor:
+    return torch.softmax(action_logits, dim=-1)
+
+
+class DriftTracker:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.checks = 0
+        self.action_agreement = 0
+        self.prob_drift_sum = 0.0
+        self.prob_drift_max = 0.0
+
+    def update(self, incremental_probs: torch.Tensor, window_probs: torch.Tensor):
+        drift = float(torch.max(torch.abs(incremental_probs - window_probs)).item())
+        self.checks += 1
+        self.prob_drift_sum += drift
+        self.prob_drift_max = max(self.prob_drift_max, drift)
+        if int(torch.argmax(incremental_probs).item()) == int(torch.argmax(window_probs).item()):
+            self.action_agreement += 1
+        return drift
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        if self.checks <= 0:
+            return {'checks': 0, 'action_agreement': None, 'prob_drift_mean': None, 'prob_drift_max': None}
+        return {
+            'checks': int(self.checks),
+            'action_agreement': float(self.action_agreement / self.checks),
+            'prob_drift_mean': float(self.prob_drift_sum / self.checks),
+            'prob_drift_max': float(self.prob_drift_max),
+        }
+
+
+def measure_incremental_drift(model, features: np.ndarray, sequence_length: int, resync_interval: int = 0) -> Dict[str, Optional[float]]:
+    if not supports_incremental(model):
+        raise ValueError('Model does not support incremental LSTM inference.')
+
+    frames = np.asarray(features, dtype=np.float32)
+    seq_len = max(1, int(sequence_length))
+    tracker = DriftTracker()
+    state = None
+    window = None
+    steps_since_sync = 0
+
+    with torch.no_grad():
+        for frame in frames:
+            if window is None:
+                window = np.repeat(frame[None, :], seq_len, axis=0)
+            else:
+                window = np.concatenate([window[1:], frame[None, :]], axis=0)
+            window_t = torch.from_numpy(window).unsqueeze(0)
+            window_logits, _, _ = split_model_output(model(window_t))
+
+            resync_due = int(resync_interval) > 0 and steps_since_sync >= int(resync_interval)
+            if state is None or resync_due:
+                model_out, state = model.forward_with_state(window_t)
+                steps_since_sync = 0
+            else:
+                model_out, state = model.forward_with_state(torch.from_numpy(frame).view(1, 1, -1), state)
+                steps_since_sync += 1
+            step_logits, _, _ = split_model_output(model_out)
+            tracker.update(action_probs(step_logits).squeeze(0), action_probs(window_logits).squeeze(0))
+
+    return tracker.summary()
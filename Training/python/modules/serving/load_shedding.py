@@ -0,0 +1,103 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+TIMEOUT_HEADER = 'x-policy-timeout-ms'
+ARRIVAL_SCOPE_KEY = 'policy.received_at'
+
+
+def parse_timeout_ms(raw) -> Optional[float]:
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def resolve_deadline(
+    received: float,
+    deadline_ms: Optional[float] = None,
+    timeout_ms: Optional[float] = None,
+    default_timeout_ms: float = 0.0,
+) -> Optional[float]:
+    # Deadlines are kept on the perf_counter clock. An absolute deadline_ms (Unix epoch ms, the
+    # caller's clock) is converted once at arrival; a relative timeout is measured from arrival.
+    candidates = []
+    if deadline_ms is not None:
+        try:
+            candidates.append(received + (float(deadline_ms) / 1000.0 - time.time()))
+        except (TypeError, ValueError):
+            pass
+    if timeout_ms is not None:
+        candidates.append(received + float(timeout_ms) / 1000.0)
+    if not candidates and default_timeout_ms > 0:
+        candidates.append(received + float(default_timeout_ms) / 1000.0)
+    return min(candidates) if candidates else None
+
+
+def expired(deadline: Optional[float], now: Optional[float] = None) -> bool:
+    if deadline is None:
+        return False
+    return (time.perf_counter() if now is None else now) >= deadline
+
+
+class ArrivalStamp:
+    # Pure ASGI middleware: budgets start when the request reaches the server, before the body
+    # is read and validated, which is where a backed-up event loop spends its time.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        scope[ARRIVAL_SCOPE_KEY] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+
+def arrival_time(scope) -> float:
+    return float(scope.get(ARRIVAL_SCOPE_KEY) or time.perf_counter())
+
+
+class LoadShedder:
+    def __init__(self, max_pending: int = 0, default_timeout_ms: float = 0.0):
+        self.max_pending = max(0, int(max_pending))
+        self.default_timeout_ms = max(0.0, float(default_timeout_ms))
+        self.pending = 0
+        self.peak_pending = 0
+        self.admitted = 0
+        self.shed: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def enter(self, weight: int = 1, bounded: bool = True) -> bool:
+        weight = max(1, int(weight))
+        with self._lock:
+            # An idle server always admits, so one batch larger than the bound is not starved.
+            if bounded and self.max_pending > 0 and self.pending > 0 and self.pending + weight > self.max_pending:
+                return False
+            self.pending += weight
+            self.admitted += weight
+            self.peak_pending = max(self.peak_pending, self.pending)
+        return True
+
+    def leave(self, weight: int = 1):
+        with self._lock:
+            self.pending -= max(1, int(weight))
+
+    def record(self, reason: str, stage: str, count: int = 1):
+        with self._lock:
+            self.shed[(reason, stage)] = self.shed.get((reason, stage), 0) + int(count)
+
+    def deadline(self, received: float, deadline_ms: Optional[float] = None, timeout_ms: Optional[float] = None) -> Optional[float]:
+        return resolve_deadline(received, deadline_ms, timeout_ms, self.default_timeout_ms)
+
+    def stats(self):
+        with self._lock:
+            shed = dict(self.shed)
+        return {
+            'max_pending': int(self.max_pending),
+            'default_timeout_ms': float(self.default_timeout_ms),
+            'pending': int(self.pending),
+            'peak_pending': int(self.peak_pending),
+            'admitted': int(self.admitted),
+            'shed_total': int(sum(shed.values())),
+            'shed': {f'{reason}:{stage}': int(count) for (reason, stage), count in sorted(shed.items())},
+        }
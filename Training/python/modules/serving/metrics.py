@@ -0,0 +1,113 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+STAGE_BUCKETS_SECONDS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0,
+)
+REQUEST_BUCKETS_SECONDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra is not None else [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = 'policy', enabled: bool = True):
+        self.prefix = prefix
+        self.enabled = bool(enabled)
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Tuple[str, Sequence[float], Dict[Labels, Histogram]]] = {}
+        self._counters: Dict[str, Tuple[str, Dict[Labels, float]]] = {}
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float]):
+        self._histograms[name] = (help_text, buckets, {})
+
+    def counter(self, name: str, help_text: str):
+        self._counters[name] = (help_text, {})
+
+    def observe(self, name: str, value: float, labels: Labels = ()):
+        if not self.enabled:
+            return
+        _, buckets, series = self._histograms[name]
+        histogram = series.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = series.setdefault(labels, Histogram(buckets))
+        histogram.observe(value)
+
+    def lap(self, name: str, started: float, labels: Labels = ()) -> float:
+        now = time.perf_counter()
+        self.observe(name, now - started, labels)
+        return now
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1.0):
+        if not self.enabled:
+            return
+        series = self._counters[name][1]
+        with self._lock:
+            series[labels] = series.get(labels, 0.0) + amount
+
+    def render(self, gauges: Iterable[Tuple[str, str, str, List[Tuple[Labels, float]]]] = ()) -> str:
+        lines: List[str] = []
+        for name, (help_text, _, series) in self._histograms.items():
+            full_name = f'{self.prefix}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} histogram')
+            for labels, histogram in list(series.items()):
+                counts, total = histogram.snapshot()
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    lines.append(f'{full_name}_bucket{_format_labels(labels, ("le", _format_value(bound)))} {cumulative}')
+                lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{full_name}_count{_format_labels(labels)} {cumulative}')
+        for name, (help_text, series) in self._counters.items():
+            full_name = f'{self.prefix}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} counter')
+            with self._lock:
+                samples = list(series.items())
+            for labels, value in samples:
+                lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+        for name, metric_type, help_text, samples in gauges:
+            full_name = f'{self.prefix}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {metric_type}')
+            for labels, value in samples:
+                lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,311 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import torch
+
+from modules.policy_bundle import load_model
+from modules.serving.incremental import DriftTracker
+from modules.serving.sequence_arena import SequenceArena, SlotPool
+
+
+class InputNormalizer:
+    def __init__(self, bundle: dict):
+        self.enabled = bool(
+            not bundle.get('normalization_in_graph', False)
+            and bundle.get('normalize_features', True)
+            and bundle.get('feature_mean') is not None
+            and bundle.get('feature_std') is not None
+        )
+        self.log_scale = bool(bundle.get('normalize_log_scale', False))
+        self.clip_value = float(bundle.get('normalize_clip_value', 10.0))
+        if self.enabled:
+            self.mean = torch.from_numpy(np.asarray(bundle['feature_mean'], dtype=np.float32))
+            self.safe_std = torch.from_numpy(np.maximum(np.asarray(bundle['feature_std'], dtype=np.float32), 1e-8).astype(np.float32))
+        else:
+            self.mean = None
+            self.safe_std = None
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        if not self.enabled:
+            return x
+        x = torch.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
+        if self.log_scale:
+            x = torch.sign(x) * torch.log1p(torch.abs(x))
+        x = (x - self.mean) / self.safe_std
+        if self.clip_value > 0:
+            x = torch.clamp(x, -self.clip_value, self.clip_value)
+        return x
+
+
+@dataclass
+class ServingModel:
+    bundle: dict
+    path: Path
+    generation: int
+    layout_generation: int
+    arena: Optional[SequenceArena]
+    normalize: InputNormalizer
+    name: str = 'default'
+    mtime: float = 0.0
+    loaded_at: float = field(default_factory=time.time)
+    drift: DriftTracker = field(default_factory=DriftTracker, repr=False)
+    forward_batches: int = 0
+    forward_rows: int = 0
+    forward_seconds: float = 0.0
+    load_seconds: float = 0.0
+    warm_up_seconds: float = 0.0
+
+    @property
+    def model(self):
+        return self.bundle['model']
+
+    @property
+    def model_type(self) -> str:
+        return str(self.bundle.get('model_type', 'mlp'))
+
+    @property
+    def sequence_length(self) -> int:
+        return int(self.bundle.get('sequence_length', 1))
+
+    @property
+    def in_features(self) -> int:
+        return int(self.bundle['in_features'])
+
+    def record_forward(self, rows: int, seconds: float):
+        self.forward_batches += 1
+        self.forward_rows += int(rows)
+        self.forward_seconds += float(seconds)
+
+    def reset_stats(self):
+        self.forward_batches = 0
+        self.forward_rows = 0
+        self.forward_seconds = 0.0
+        self.drift.reset()
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'path': str(self.path),
+            'generation': int(self.generation),
+            'layout_generation': int(self.layout_generation),
+            'model_type': self.model_type,
+            'sequence_length': self.sequence_length,
+            'in_features': self.in_features,
+            'compiled': bool(self.bundle.get('compiled_path')),
+            'quantized': self.bundle.get('quantized'),
+            'fused_normalization': self.bundle.get('fused_normalization'),
+            'loaded_at': float(self.loaded_at),
+            'load_seconds': float(self.load_seconds),
+            'warm_up_seconds': float(self.warm_up_seconds),
+            'forward_batches': int(self.forward_batches),
+            'forward_rows': int(self.forward_rows),
+            'forward_ms_per_batch': float(1000.0 * self.forward_seconds / self.forward_batches) if self.forward_batches else None,
+            'forward_ms_per_row': float(1000.0 * self.forward_seconds / self.forward_rows) if self.forward_rows else None,
+        }
+
+
+def _model_mtime(path: Path) -> float:
+    try:
+        return float(Path(path).stat().st_mtime)
+    except OSError:
+        return 0.0
+
+
+def build_serving_model(
+    bundle: dict,
+    path: Path,
+    slot_pool: SlotPool,
+    previous: Optional[ServingModel] = None,
+    name: str = 'default',
+) -> ServingModel:
+    generation = previous.generation + 1 if previous is not None else 1
+    layout_generation = generation
+    arena = None
+    if str(bundle.get('model_type', 'mlp')) == 'lstm':
+        seq_len = int(bundle.get('sequence_length', 1))
+        in_features = int(bundle['in_features'])
+        previous_arena = previous.arena if previous is not None else None
+        if previous_arena is not None and previous_arena.compatible_with(seq_len, in_features):
+            arena = previous_arena
+            layout_generation = previous.layout_generation
+        else:
+            arena = SequenceArena(slot_pool.capacity, seq_len, in_features, slot_pool=slot_pool)
+
+    return ServingModel(
+        bundle=bundle,
+        path=Path(path),
+        generation=generation,
+        layout_generation=layout_generation,
+        arena=arena,
+        normalize=InputNormalizer(bundle),
+        name=name,
+        mtime=_model_mtime(path),
+    )
+
+
+def warm_up(serving: ServingModel, batch_sizes: Sequence[int] = (1,), iterations: int = 1):
+    model = serving.model
+    # Scripted graphs specialize over their first calls, so each shape is run more than once.
+    with torch.no_grad():
+        for batch_size in [size for size in batch_sizes for _ in range(max(1, int(iterations)))]:
+            batch_size = max(1, int(batch_size))
+            if serving.model_type == 'lstm':
+                xt = torch.zeros((batch_size, serving.sequence_length, serving.in_features), dtype=torch.float32)
+                if hasattr(model, 'forward_with_state'):
+                    _, state = model.forward_with_state(serving.normalize(xt))
+                    model.forward_with_state(serving.normalize(xt[:, -1:, :]), state)
+                else:
+                    model(serving.normalize(xt))
+            else:
+                model(serving.normalize(torch.zeros((batch_size, serving.in_features), dtype=torch.float32)))
+
+
+def load_serving_model(
+    path: Path,
+    slot_pool: SlotPool,
+    previous: Optional[ServingModel] = None,
+    warm_batch_sizes: Sequence[int] = (1,),
+    name: str = 'default',
+    quantize: bool = False,
+    fuse_normalization: bool = False,
+    warm_iterations: int = 1,
+) -> ServingModel:
+    started = time.perf_counter()
+    bundle = load_model(Path(path), quantize=quantize, fuse_normalization=fuse_normalization)
+    serving = build_serving_model(bundle, path, slot_pool, previous=previous, name=name)
+    loaded = time.perf_counter()
+    warm_up(serving, warm_batch_sizes, iterations=warm_iterations)
+    serving.load_seconds = loaded - started
+    serving.warm_up_seconds = time.perf_counter() - loaded
+    return serving
+
+
+class ModelReloader:
+    def __init__(
+        self,
+        path: Path,
+        slot_pool: SlotPool,
+        warm_batch_sizes: Sequence[int] = (1,),
+        on_swap: Optional[Callable[[Optional[ServingModel], ServingModel], None]] = None,
+        name: str = 'default',
+        quantize: bool = False,
+        fuse_normalization: bool = False,
+        warm_iterations: int = 1,
+    ):
+        self.name = str(name)
+        self.warm_iterations = max(1, int(warm_iterations))
+        self.quantize = bool(quantize)
+        self.fuse_normalization = bool(fuse_normalization)
+        self.path = Path(path)
+        self.slot_pool = slot_pool
+        self.warm_batch_sizes = tuple(warm_batch_sizes)
+        self.on_swap = on_swap
+        self.active: Optional[ServingModel] = None
+        self.state = 'idle'
+        self.last_error: Optional[str] = None
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+        self._attempted_mtime = 0.0
+
+    def load_initial(self) -> Optional[ServingModel]:
+        if self.path.exists():
+            self._swap_in(load_serving_model(
+                self.path,
+                self.slot_pool,
+                warm_batch_sizes=self.warm_batch_sizes,
+                name=self.name,
+                quantize=self.quantize,
+                fuse_normalization=self.fuse_normalization,
+                warm_iterations=self.warm_iterations,
+            ))
+        return self.active
+
+    def _swap_in(self, serving: ServingModel):
+        with self._lock:
+            previous = self.active
+            self.active = serving
+            if previous is not None:
+                self.reloads += 1
+        if self.on_swap is not None:
+            self.on_swap(previous, serving)
+
+    def _reload(self):
+        try:
+            self._attempted_mtime = _model_mtime(self.path)
+            serving = load_serving_model(
+                self.path,
+                self.slot_pool,
+                previous=self.active,
+                warm_batch_sizes=self.warm_batch_sizes,
+                name=self.name,
+                quantize=self.quantize,
+                fuse_normalization=self.fuse_normalization,
+                warm_iterations=self.warm_iterations,
+            )
+            self._swap_in(serving)
+            self.state = 'idle'
+            self.last_error = None
+        except Exception as exc:
+            self.state = 'failed'
+            self.last_error = f'{type(exc).__name__}: {exc}'
+
+    def request_reload(self) -> bool:
+        with self._lock:
+            if self.state == 'loading':
+                return False
+            self.state = 'loading'
+            self._reload_thread = threading.Thread(target=self._reload, name=f'policy-model-reload-{self.name}', daemon=True)
+            self._reload_thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None):
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _watch(self, interval: float):
+        pending_mtime = 0.0
+        while not self._watch_stop.wait(interval):
+            mtime = _model_mtime(self.path)
+            active = self.active
+            if mtime <= 0.0 or (active is not None and mtime == active.mtime) or mtime == self._attempted_mtime:
+                pending_mtime = 0.0
+                continue
+            # Only reload once the file has stopped changing for a full poll interval.
+            if mtime != pending_mtime:
+                pending_mtime = mtime
+                continue
+            pending_mtime = 0.0
+            self.request_reload()
+
+    def start_watching(self, interval_seconds: float):
+        if interval_seconds <= 0 or self._watch_thread is not None:
+            return
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(target=self._watch, args=(float(interval_seconds),), name=f'policy-model-watch-{self.name}', daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=1.0)
+        self._watch_thread = None
+
+    def status(self):
+        active = self.active
+        return {
+            'name': self.name,
+            'path': str(self.path),
+            'state': self.state,
+            'last_error': self.last_error,
+            'reloads': int(self.reloads),
+            'watching': self._watch_thread is not None,
+            'active': active.describe() if active is not None else None,
+        }
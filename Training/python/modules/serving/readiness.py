@@ -0,0 +1,52 @@
+import threading
+import time
+from typing import Dict, Optional
+
+
+class Readiness:
+    def __init__(self):
+        self.state = 'starting'
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self.phase_seconds: Dict[str, float] = {}
+        self._phase_started = time.perf_counter()
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def _close_phase(self):
+        now = time.perf_counter()
+        self.phase_seconds[self.state] = self.phase_seconds.get(self.state, 0.0) + (now - self._phase_started)
+        self._phase_started = now
+
+    def advance(self, state: str):
+        with self._lock:
+            self._close_phase()
+            self.state = str(state)
+            if self.state == 'ready':
+                self.ready_at = time.time()
+                self._ready.set()
+
+    def fail(self, error: str):
+        with self._lock:
+            self._close_phase()
+            self.state = 'failed'
+            self.error = str(error)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def describe(self):
+        return {
+            'state': self.state,
+            'ready': self.ready,
+            'error': self.error,
+            'started_at': float(self.started_at),
+            'ready_at': self.ready_at,
+            'seconds_to_ready': (self.ready_at - self.started_at) if self.ready_at is not None else None,
+            'phase_seconds': dict(self.phase_seconds),
+        }
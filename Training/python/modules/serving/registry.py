@@ -0,0 +1,119 @@
+import hashlib
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from modules.serving.model_runtime import ModelReloader, ServingModel
+from modules.serving.sequence_arena import SlotPool
+
+
+def agent_bucket(agent_key: str) -> float:
+    digest = hashlib.md5(str(agent_key).encode('utf-8')).digest()
+    return (int.from_bytes(digest[:8], 'big') % 10000) / 100.0
+
+
+def parse_model_specs(text: str, default_path: Path) -> Dict[str, Path]:
+    specs: Dict[str, Path] = {}
+    for entry in str(text or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, path = entry.partition('=')
+        if not sep or not name.strip() or not path.strip():
+            raise ValueError(f'Invalid model spec {entry!r}; expected name=path.')
+        specs[name.strip()] = Path(path.strip()).expanduser()
+    if not specs:
+        specs['default'] = Path(default_path)
+    return specs
+
+
+def parse_route_rules(text: str) -> List[Tuple[str, str]]:
+    rules: List[Tuple[str, str]] = []
+    for entry in str(text or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        pattern, sep, model_name = entry.rpartition('=')
+        if not sep or not pattern.strip() or not model_name.strip():
+            raise ValueError(f'Invalid route rule {entry!r}; expected agent_pattern=model or N%=model.')
+        pattern = pattern.strip()
+        if pattern.endswith('%'):
+            float(pattern[:-1])
+        rules.append((pattern, model_name.strip()))
+    return rules
+
+
+class ModelRouter:
+    def __init__(self, default_model: str, rules: Sequence[Tuple[str, str]] = ()):
+        self.default_model = str(default_model)
+        self.rules = list(rules)
+
+    def route(self, agent_key: str) -> str:
+        bucket = None
+        percent_floor = 0.0
+        for pattern, model_name in self.rules:
+            if pattern.endswith('%'):
+                share = float(pattern[:-1])
+                if bucket is None:
+                    bucket = agent_bucket(agent_key)
+                if percent_floor <= bucket < percent_floor + share:
+                    return model_name
+                percent_floor += share
+            elif fnmatchcase(agent_key, pattern):
+                return model_name
+        return self.default_model
+
+    def describe(self):
+        return {
+            'default_model': self.default_model,
+            'rules': [{'match': pattern, 'model': model_name} for pattern, model_name in self.rules],
+        }
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        model_paths: Dict[str, Path],
+        slot_pool: SlotPool,
+        warm_batch_sizes: Sequence[int] = (1,),
+        quantize: bool = False,
+        fuse_normalization: bool = False,
+        warm_iterations: int = 1,
+    ):
+        self.reloaders: Dict[str, ModelReloader] = {
+            name: ModelReloader(
+                path,
+                slot_pool,
+                warm_batch_sizes=warm_batch_sizes,
+                name=name,
+                quantize=quantize,
+                fuse_normalization=fuse_normalization,
+                warm_iterations=warm_iterations,
+            )
+            for name, path in model_paths.items()
+        }
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.reloaders
+
+    def names(self) -> List[str]:
+        return list(self.reloaders.keys())
+
+    def get(self, name: Optional[str]) -> Optional[ServingModel]:
+        reloader = self.reloaders.get(name) if name else None
+        return reloader.active if reloader is not None else None
+
+    def load_initial(self):
+        for reloader in self.reloaders.values():
+            reloader.load_initial()
+
+    def start_watching(self, interval_seconds: float):
+        for reloader in self.reloaders.values():
+            reloader.start_watching(interval_seconds)
+
+    def stop_watching(self):
+        for reloader in self.reloaders.values():
+            reloader.stop_watching()
+
+    def status(self):
+        return {name: reloader.status() for name, reloader in self.reloaders.items()}
@@ -0,0 +1,86 @@
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+import torch
+
+
+class SlotPool:
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._free: List[int] = list(range(self.capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    def allocate(self) -> Optional[int]:
+        with self._lock:
+            return self._free.pop() if self._free else None
+
+    def release(self, slot: Optional[int]):
+        if slot is None:
+            return
+        with self._lock:
+            self._free.append(int(slot))
+
+    def in_use(self) -> int:
+        return self.capacity - len(self._free)
+
+
+class SequenceArena:
+    def __init__(self, capacity: int, sequence_length: int, in_features: int, slot_pool: Optional[SlotPool] = None):
+        self.slots = slot_pool if slot_pool is not None and slot_pool.capacity == max(1, int(capacity)) else SlotPool(capacity)
+        self.capacity = self.slots.capacity
+        self.sequence_length = max(1, int(sequence_length))
+        self.in_features = int(in_features)
+        # Each slot stores its ring twice back to back, so the latest window is
+        # always the contiguous range [head, head + sequence_length).
+        self.frames = np.zeros((self.capacity, 2 * self.sequence_length, self.in_features), dtype=np.float32)
+        self.heads = np.zeros(self.capacity, dtype=np.int64)
+        self.tensor = torch.from_numpy(self.frames)
+        self._offsets = torch.arange(self.sequence_length, dtype=torch.long)
+
+    def compatible_with(self, sequence_length: int, in_features: int) -> bool:
+        return self.sequence_length == max(1, int(sequence_length)) and self.in_features == int(in_features)
+
+    def allocate(self) -> Optional[int]:
+        return self.slots.allocate()
+
+    def release(self, slot: Optional[int]):
+        self.slots.release(slot)
+
+    def slots_in_use(self) -> int:
+        return self.slots.in_use()
+
+    def append(self, slot: int, x: np.ndarray, fresh: bool = False):
+        if fresh:
+            self.frames[slot, :, :] = x
+            self.heads[slot] = 0
+            return
+        head = int(self.heads[slot])
+        self.frames[slot, head, :] = x
+        self.frames[slot, head + self.sequence_length, :] = x
+        self.heads[slot] = (head + 1) % self.sequence_length
+
+    def load_window(self, slot: int, window: np.ndarray):
+        self.frames[slot, :self.sequence_length, :] = window
+        self.frames[slot, self.sequence_length:, :] = window
+        self.heads[slot] = 0
+
+    def window(self, slot: int) -> torch.Tensor:
+        head = int(self.heads[slot])
+        return self.tensor[slot, head:head + self.sequence_length]
+
+    def gather(self, slots: Sequence[int]) -> torch.Tensor:
+        if len(slots) == 1:
+            return self.window(int(slots[0])).unsqueeze(0)
+        slot_idx = torch.as_tensor(np.asarray(slots, dtype=np.int64))
+        starts = torch.from_numpy(self.heads[np.asarray(slots, dtype=np.int64)])
+        return self.tensor[slot_idx[:, None], starts[:, None] + self._offsets[None, :]]
+
+    def stats(self):
+        return {
+            'capacity': int(self.capacity),
+            'slots_in_use': int(self.slots_in_use()),
+            'sequence_length': int(self.sequence_length),
+            'in_features': int(self.in_features),
+            'reserved_mb': float(self.frames.nbytes / (1024 ** 2)),
+        }
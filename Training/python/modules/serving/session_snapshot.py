@@ -0,0 +1,262 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from modules.dataset_core import BASE_FEATURE_DIM, FEATURE_LAYOUT_VERSION
+from modules.serving.agent_store import AgentSessionStore
+from modules.serving.model_runtime import ServingModel
+from modules.serving.sequence_arena import SlotPool
+
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_INDEX_FILE = 'index.json'
+
+
+def _file_stem(name: str) -> str:
+    return ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in str(name))
+
+
+def save_session_snapshot(
+    path: Path,
+    store: AgentSessionStore,
+    models: Dict[str, Optional[ServingModel]],
+) -> Dict[str, float]:
+    started = time.perf_counter()
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    generation = time.time_ns()
+    sessions = store.sessions()
+    windowed = {name: serving for name, serving in models.items() if serving is not None and serving.arena is not None}
+    rows = max(1, len(sessions))
+
+    # Arrays are written through memory maps and read back the same way, so neither side
+    # holds a second copy of every window; index.json is replaced last and names the files.
+    base_file = f'base_features-{generation}.npy'
+    base = np.lib.format.open_memmap(path / base_file, mode='w+', dtype=np.float32, shape=(rows, BASE_FEATURE_DIM))
+    windows = {}
+    model_meta = {}
+    for name, serving in windowed.items():
+        file_name = f'windows-{_file_stem(name)}-{generation}.npy'
+        windows[name] = np.lib.format.open_memmap(
+            path / file_name,
+            mode='w+',
+            dtype=np.float32,
+            shape=(rows, serving.arena.sequence_length, serving.arena.in_features),
+        )
+        model_meta[name] = {
+            'file': file_name,
+            'in_features': int(serving.arena.in_features),
+            'sequence_length': int(serving.arena.sequence_length),
+            'rows': 0,
+        }
+
+    agents = []
+    now = store.clock()
+    for session in sessions:
+        with session.lock:
+            if session.evicted:
+                continue
+            entry = {
+                'agent_id': session.agent_key,
+                'last_action': session.last_action,
+                'last_ts': float(session.last_ts),
+                'idle_seconds': max(0.0, float(now - session.last_seen)),
+                'base_row': -1,
+                'windows': {},
+            }
+            base_feature = session.last_base_feature
+            if base_feature is not None and len(base_feature) == BASE_FEATURE_DIM:
+                base[len(agents)] = base_feature
+                entry['base_row'] = len(agents)
+            if session.slot is not None:
+                for name, serving in windowed.items():
+                    track = session.tracks.get(name)
+                    if track is None or track.layout_generation != serving.layout_generation:
+                        continue
+                    row = model_meta[name]['rows']
+                    windows[name][row] = serving.arena.window(session.slot).numpy()
+                    entry['windows'][name] = row
+                    model_meta[name]['rows'] = row + 1
+            agents.append(entry)
+
+    for array in [base, *windows.values()]:
+        array.flush()
+    del base, windows
+
+    index = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'feature_layout_version': FEATURE_LAYOUT_VERSION,
+        'base_feature_dim': BASE_FEATURE_DIM,
+        'saved_at': time.time(),
+        'base_features': base_file,
+        'models': model_meta,
+        'agents': agents,
+    }
+    index_tmp = path / f'{SNAPSHOT_INDEX_FILE}.tmp'
+    index_tmp.write_text(json.dumps(index), encoding='utf-8')
+    os.replace(index_tmp, path / SNAPSHOT_INDEX_FILE)
+
+    live_files = {base_file, *(meta['file'] for meta in model_meta.values())}
+    size = 0
+    for stale in path.glob('*.npy'):
+        if stale.name in live_files:
+            size += stale.stat().st_size
+        else:
+            stale.unlink(missing_ok=True)
+    return {
+        'agents': len(agents),
+        'windows': sum(meta['rows'] for meta in model_meta.values()),
+        'bytes': int(size),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def restore_session_snapshot(
+    path: Path,
+    store: AgentSessionStore,
+    models: Dict[str, Optional[ServingModel]],
+    slot_pool: SlotPool,
+    ttl_seconds: float = 0.0,
+) -> Dict[str, object]:
+    started = time.perf_counter()
+    index_path = Path(path) / SNAPSHOT_INDEX_FILE
+    if not index_path.exists():
+        return {'status': 'missing', 'restored_agents': 0}
+    index = json.loads(index_path.read_text(encoding='utf-8'))
+    if index.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        return {'status': 'incompatible_format', 'restored_agents': 0}
+
+    layout_matches = (
+        index.get('feature_layout_version') == FEATURE_LAYOUT_VERSION
+        and index.get('base_feature_dim') == BASE_FEATURE_DIM
+    )
+    base = np.load(Path(path) / index['base_features'], mmap_mode='r') if layout_matches else None
+    windows = {}
+    skipped_models = []
+    for name, meta in index.get('models', {}).items():
+        serving = models.get(name)
+        # Windows are only reused by a model that reads the same frame layout.
+        if (
+            not layout_matches
+            or serving is None
+            or serving.arena is None
+            or not serving.arena.compatible_with(meta['sequence_length'], meta['in_features'])
+        ):
+            skipped_models.append(name)
+            continue
+        windows[name] = (serving, np.load(Path(path) / meta['file'], mmap_mode='r'))
+
+    age = max(0.0, time.time() - float(index.get('saved_at', 0.0)))
+    restored = 0
+    expired = 0
+    restored_windows = 0
+    for entry in index.get('agents', []):
+        idle = age + float(entry.get('idle_seconds', 0.0))
+        if ttl_seconds > 0 and idle > ttl_seconds:
+            expired += 1
+            continue
+        with store.locked(str(entry['agent_id'])) as session:
+            session.last_action = entry.get('last_action')
+            session.last_ts = float(entry.get('last_ts', 0.0))
+            if base is not None and int(entry.get('base_row', -1)) >= 0:
+                session.last_base_feature = np.array(base[int(entry['base_row'])], dtype=np.float32)
+            for name, row in entry.get('windows', {}).items():
+                if name not in windows:
+                    continue
+                if session.slot is None:
+                    session.slot = slot_pool.allocate()
+                    if session.slot is None:
+                        break
+                serving, frames = windows[name]
+                serving.arena.load_window(session.slot, frames[int(row)])
+                track = session.track(name)
+                track.model_generation = serving.generation
+                track.layout_generation = serving.layout_generation
+                restored_windows += 1
+            # Agents are restored oldest first, so the TTL order of the store is preserved.
+            session.last_seen = store.clock() - idle
+        restored += 1
+    del base, windows
+    return {
+        'status': 'restored',
+        'restored_agents': restored,
+        'restored_windows': restored_windows,
+        'expired_agents': expired,
+        'skipped_models': skipped_models,
+        'snapshot_age_seconds': age,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+class SessionSnapshotter:
+    def __init__(
+        self,
+        path: Path,
+        store: AgentSessionStore,
+        models: Callable[[], Dict[str, Optional[ServingModel]]],
+        interval_seconds: float = 60.0,
+    ):
+        self.path = Path(path)
+        self.store = store
+        self.models = models
+        self.interval_seconds = float(interval_seconds)
+        self.snapshots = 0
+        self.last_snapshot: Optional[Dict[str, float]] = None
+        self.last_restore: Optional[Dict[str, object]] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def restore(self, slot_pool: SlotPool, ttl_seconds: float = 0.0):
+        try:
+            self.last_restore = restore_session_snapshot(self.path, self.store, self.models(), slot_pool, ttl_seconds)
+        except Exception as exc:
+            self.last_error = f'restore failed: {type(exc).__name__}: {exc}'
+            self.last_restore = {'status': 'failed', 'restored_agents': 0}
+        return self.last_restore
+
+    def snapshot(self) -> Optional[Dict[str, float]]:
+        with self._lock:
+            try:
+                self.last_snapshot = {**save_session_snapshot(self.path, self.store, self.models()), 'saved_at': time.time()}
+                self.snapshots += 1
+                self.last_error = None
+            except Exception as exc:
+                self.last_error = f'snapshot failed: {type(exc).__name__}: {exc}'
+                return None
+        return self.last_snapshot
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.snapshot()
+
+    def start(self):
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='policy-session-snapshot', daemon=True)
+        self._thread.start()
+
+    def stop(self, final_snapshot: bool = True):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self._thread = None
+        if final_snapshot:
+            self.snapshot()
+
+    def stats(self):
+        return {
+            'path': str(self.path),
+            'interval_seconds': self.interval_seconds,
+            'snapshots': int(self.snapshots),
+            'last_snapshot': self.last_snapshot,
+            'last_restore': self.last_restore,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,142 @@
+import json
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+import torch
+
+from modules.serving.incremental import DriftTracker
+
+
+@dataclass
+class ShadowJob:
+    session: Any
+    slot: Optional[int]
+    sequence: int
+    frame: np.ndarray
+    primary_model: str
+    primary_action: str
+    primary_probs: torch.Tensor
+    shadow_model: str
+
+
+class ShadowEvaluator:
+    def __init__(
+        self,
+        run_shadow: Callable[[List[ShadowJob]], List[Optional[torch.Tensor]]],
+        action_names: Callable[[int], str],
+        queue_size: int = 1024,
+        max_batch_size: int = 64,
+        log_path: Optional[str] = None,
+    ):
+        self.run_shadow = run_shadow
+        self.action_names = action_names
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.log_path = Path(log_path) if log_path else None
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self.comparison = DriftTracker()
+        self.submitted = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.served_agreement = 0
+
+    def submit(self, job: ShadowJob) -> bool:
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def stats(self):
+        summary = self.comparison.summary()
+        return {
+            'submitted': int(self.submitted),
+            'dropped': int(self.dropped),
+            'skipped': int(self.skipped),
+            'errors': int(self.errors),
+            'last_error': self.last_error,
+            'queue_depth': int(self._queue.qsize()),
+            'compared': summary['checks'],
+            'action_agreement': summary['action_agreement'],
+            'served_action_agreement': float(self.served_agreement / summary['checks']) if summary['checks'] else None,
+            'prob_drift_mean': summary['prob_drift_mean'],
+            'prob_drift_max': summary['prob_drift_max'],
+        }
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._worker_loop, name='policy-shadow', daemon=True)
+                self._worker.start()
+
+    def _drain(self) -> List[ShadowJob]:
+        jobs = [self._queue.get()]
+        while len(jobs) < self.max_batch_size:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return jobs
+
+    def _worker_loop(self):
+        while True:
+            pending = [job for job in self._drain() if not job.session.evicted]
+            # Jobs of one agent must run in order, so each round holds at most one job per agent.
+            while pending:
+                round_jobs: List[ShadowJob] = []
+                deferred: List[ShadowJob] = []
+                round_agents = set()
+                for job in pending:
+                    if job.session.agent_key in round_agents:
+                        deferred.append(job)
+                    else:
+                        round_agents.add(job.session.agent_key)
+                        round_jobs.append(job)
+                self._run_round(round_jobs)
+                pending = deferred
+
+    def _run_round(self, jobs: List[ShadowJob]):
+        try:
+            shadow_probs = self.run_shadow(jobs)
+        except Exception as exc:
+            self.errors += 1
+            self.last_error = f'{type(exc).__name__}: {exc}'
+            return
+        disagreements = []
+        for job, probs in zip(jobs, shadow_probs):
+            if probs is None:
+                self.skipped += 1
+                continue
+            drift = self.comparison.update(probs, job.primary_probs)
+            shadow_action = self.action_names(int(torch.argmax(probs).item()))
+            primary_greedy = self.action_names(int(torch.argmax(job.primary_probs).item()))
+            if shadow_action == job.primary_action:
+                self.served_agreement += 1
+            if shadow_action != primary_greedy:
+                disagreements.append({
+                    'ts': time.time(),
+                    'agent_id': job.session.agent_key,
+                    'primary_model': job.primary_model,
+                    'shadow_model': job.shadow_model,
+                    'primary_action': primary_greedy,
+                    'served_action': job.primary_action,
+                    'shadow_action': shadow_action,
+                    'prob_drift': drift,
+                })
+        if disagreements and self.log_path is not None:
+            with self.log_path.open('a', encoding='utf-8') as handle:
+                for record in disagreements:
+                    handle.write(json.dumps(record) + '\n')
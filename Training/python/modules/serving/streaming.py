@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Any, Callable, Dict
+
+import anyio
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+
+class StreamStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.opened = 0
+        self.frames = 0
+        self.errors = 0
+        self.backpressure_stalls = 0
+
+    def add(self, field: str, amount: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def snapshot(self):
+        return {
+            'active_connections': int(self.active),
+            'opened_connections': int(self.opened),
+            'frames': int(self.frames),
+            'errors': int(self.errors),
+            'backpressure_stalls': int(self.backpressure_stalls),
+        }
+
+
+async def _respond(websocket: WebSocket, frames, handle: Callable[[int, Dict[str, Any], float], dict], stats: StreamStats, cancel_scope):
+    try:
+        async with frames:
+            async for seq, message, received in frames:
+                try:
+                    result = await anyio.to_thread.run_sync(handle, seq, message, received)
+                except Exception as exc:
+                    stats.add('errors')
+                    result = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+                stats.add('frames')
+                await websocket.send_json({'seq': seq, **result})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    # The reader stops once responses can no longer be delivered.
+    cancel_scope.cancel()
+
+
+async def serve_stream(
+    websocket: WebSocket,
+    handle: Callable[[int, Dict[str, Any], float], dict],
+    stats: StreamStats,
+    max_inflight: int = 8,
+):
+    await websocket.accept()
+    stats.add('opened')
+    stats.add('active')
+    max_inflight = max(1, int(max_inflight))
+    # Frames are answered in arrival order; once max_inflight are queued the reader stops
+    # pulling from the socket, so a fast sender is slowed down by TCP flow control.
+    send_frames, receive_frames = anyio.create_memory_object_stream(max_inflight)
+    try:
+        async with anyio.create_task_group() as tasks:
+            tasks.start_soon(_respond, websocket, receive_frames, handle, stats, tasks.cancel_scope)
+            async with send_frames:
+                seq = 0
+                while True:
+                    message = await websocket.receive()
+                    if message['type'] == 'websocket.disconnect':
+                        break
+                    if send_frames.statistics().current_buffer_used >= max_inflight:
+                        stats.add('backpressure_stalls')
+                    # Frames carry their arrival time so deadlines include the wait in this queue.
+                    await send_frames.send((seq, message, time.perf_counter()))
+                    seq += 1
+    finally:
+        stats.add('active', -1)
@@ -0,0 +1,126 @@
+import math
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from modules.dataset_core import BASE_FEATURE_DIM, FEATURE_LAYOUT_VERSION
+
+
+PACKED_CONTENT_TYPE = 'application/x-policy-features'
+FRAME_MAGIC = b'MFPF'
+BATCH_MAGIC = b'MFPB'
+WIRE_VERSION = 1
+
+# Frame: magic, wire version, feature layout version, feature count, agent id byte length,
+# timestamp (f64, NaN = absent), temperature (f64, NaN = absent), agent id (utf-8),
+# then the base feature vector as little-endian float32.
+_FRAME_HEADER = struct.Struct('<4sHHHHdd')
+# Batch: magic, wire version, frame count, then each frame prefixed by its u32 byte length.
+_BATCH_HEADER = struct.Struct('<4sHI')
+_U32 = struct.Struct('<I')
+_FEATURE_DTYPE = np.dtype('<f4')
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def _decode_frame(buffer, offset: int, end: int) -> Dict[str, Any]:
+    if end - offset < _FRAME_HEADER.size:
+        raise ValueError('Packed frame is truncated.')
+    magic, version, layout_version, n_features, agent_len, timestamp, temperature = _FRAME_HEADER.unpack_from(buffer, offset)
+    if magic != FRAME_MAGIC:
+        raise ValueError('Not a packed policy feature frame.')
+    if version != WIRE_VERSION:
+        raise ValueError(f'Unsupported packed wire version {version}; server expects {WIRE_VERSION}.')
+    if layout_version != FEATURE_LAYOUT_VERSION or n_features != BASE_FEATURE_DIM:
+        raise ValueError(
+            f'Feature layout {layout_version} with {n_features} features does not match the server '
+            f'(layout {FEATURE_LAYOUT_VERSION}, {BASE_FEATURE_DIM} features).'
+        )
+    agent_start = offset + _FRAME_HEADER.size
+    features_start = agent_start + agent_len
+    if features_start + n_features * _FEATURE_DTYPE.itemsize != end:
+        raise ValueError('Packed frame length does not match its header.')
+    agent_id = bytes(buffer[agent_start:features_start]).decode('utf-8') or 'default'
+    features = np.frombuffer(buffer, dtype=_FEATURE_DTYPE, count=n_features, offset=features_start).astype(np.float32)
+    return {
+        'agent_id': agent_id,
+        'timestamp': _optional(timestamp),
+        'temperature': _optional(temperature),
+        'features': features,
+    }
+
+
+def decode_predict_frame(buffer: bytes) -> Dict[str, Any]:
+    return _decode_frame(buffer, 0, len(buffer))
+
+
+def _batch_frame_spans(buffer) -> List[Tuple[int, int]]:
+    if len(buffer) < _BATCH_HEADER.size:
+        raise ValueError('Packed batch is truncated.')
+    magic, version, count = _BATCH_HEADER.unpack_from(buffer, 0)
+    if magic != BATCH_MAGIC:
+        raise ValueError('Not a packed policy batch.')
+    if version != WIRE_VERSION:
+        raise ValueError(f'Unsupported packed wire version {version}; server expects {WIRE_VERSION}.')
+    spans = []
+    offset = _BATCH_HEADER.size
+    for _ in range(count):
+        if offset + _U32.size > len(buffer):
+            raise ValueError('Packed batch is truncated.')
+        (length,) = _U32.unpack_from(buffer, offset)
+        offset += _U32.size
+        if offset + length > len(buffer):
+            raise ValueError('Packed batch is truncated.')
+        spans.append((offset, offset + length))
+        offset += length
+    if offset != len(buffer):
+        raise ValueError('Packed batch has trailing bytes.')
+    return spans
+
+
+def decode_predict_batch(buffer: bytes) -> List[Dict[str, Any]]:
+    return [_decode_frame(buffer, start, end) for start, end in _batch_frame_spans(buffer)]
+
+
+def split_predict_batch(buffer: bytes) -> List[bytes]:
+    return [bytes(buffer[start:end]) for start, end in _batch_frame_spans(buffer)]
+
+
+def frame_agent_id(buffer: bytes) -> str:
+    if len(buffer) < _FRAME_HEADER.size:
+        raise ValueError('Packed frame is truncated.')
+    magic, _, _, _, agent_len, _, _ = _FRAME_HEADER.unpack_from(buffer, 0)
+    if magic != FRAME_MAGIC or _FRAME_HEADER.size + agent_len > len(buffer):
+        raise ValueError('Not a packed policy feature frame.')
+    return bytes(buffer[_FRAME_HEADER.size:_FRAME_HEADER.size + agent_len]).decode('utf-8') or 'default'
+
+
+def encode_predict_frame(
+    features: Sequence[float],
+    agent_id: str = 'default',
+    timestamp: Optional[float] = None,
+    temperature: Optional[float] = None,
+) -> bytes:
+    vector = np.asarray(features, dtype=_FEATURE_DTYPE)
+    agent = str(agent_id or '').encode('utf-8')
+    header = _FRAME_HEADER.pack(
+        FRAME_MAGIC,
+        WIRE_VERSION,
+        FEATURE_LAYOUT_VERSION,
+        int(vector.shape[0]),
+        len(agent),
+        math.nan if timestamp is None else float(timestamp),
+        math.nan if temperature is None else float(temperature),
+    )
+    return header + agent + vector.tobytes()
+
+
+def encode_predict_batch(frames: Sequence[bytes]) -> bytes:
+    parts = [_BATCH_HEADER.pack(BATCH_MAGIC, WIRE_VERSION, len(frames))]
+    for frame in frames:
+        parts.append(_U32.pack(len(frame)))
+        parts.append(frame)
+    return b''.join(parts)
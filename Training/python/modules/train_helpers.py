@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Optional
 
 import numpy as np
 
@@ -15,8 +15,9 @@ def compute_stable_class_weights(
     min_weight: float = 0.25,
     max_weight: float = 8.0,
     power: float = 0.5,
+    sample_weights: Optional[np.ndarray] = None,
 ) -> np.ndarray:
-    counts_raw = np.bincount(labels, minlength=num_classes).astype(np.float32)
+    counts_raw = np.bincount(labels, weights=sample_weights, minlength=num_classes).astype(np.float32)
     total = float(np.maximum(1.0, counts_raw.sum()))
     frequencies = counts_raw / total
     observed = counts_raw > 0
@@ -5,6 +5,7 @@ import torch
 
 from dataset_utils import ACTION_VOCAB, INTENT_VOCAB
 from modules.model_heads import CONTROL_DIM
+from modules.policy_bundle import export_compiled_model
 from modules.sequence_normalization import save_feature_stats
 
 
@@ -86,3 +87,9 @@ def save_artifacts(args, model, dataset_path, n, in_features, model_type, class_
     print(f'saved model: {model_path}')
     print(f'saved metadata: {meta_path}')
     print(f'saved feature stats: {stats_path}')
+
+    if bool(getattr(args, 'export_compiled', False)):
+        try:
+            print(f'saved compiled policy: {export_compiled_model(model_path)}')
+        except Exception as exc:
+            print(f'compiled policy export skipped: {type(exc).__name__}: {exc}')
@@ -13,6 +13,7 @@ def build_parser(config=None):
     parser.add_argument('--device', choices=['auto', 'cpu', 'cuda'], default=str(config.get('device', 'auto')))
 
     int_args = [
+        ('--dataset-workers', 'dataset_workers'),
         ('--sequence-length', 'sequence_length'),
         ('--sequence-length-min', 'sequence_length_min'),
         ('--sequence-length-max', 'sequence_length_max'),
@@ -66,6 +67,7 @@ def build_parser(config=None):
         ('--use-lr-scheduler', 'use_lr_scheduler'),
         ('--non-blocking-transfer', 'non_blocking_transfer'),
         ('--dataset-cache-enabled', 'dataset_cache_enabled'),
+        ('--export-compiled', 'export_compiled'),
     ]:
         parser.add_argument(flag, action=argparse.BooleanOptionalAction, default=bool(config[key]))
 
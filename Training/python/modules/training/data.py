@@ -6,11 +6,11 @@ import torch
 
 from dataset_utils import (
     ACTION_VOCAB,
+    FEATURE_LAYOUT_VERSION,
     load_dataset_hybrid,
-    load_dataset_sequences_hybrid,
-    load_dataset_sequences_hybrid_dense,
 )
-from modules.sequence_normalization import preprocess_and_normalize_sequences
+from modules.sequence_normalization import preprocess_and_normalize_frames, preprocess_and_normalize_sequences
+from modules.training.windows import frame_coverage, window_starts
 
 
 def _resolve_cache_dir(dataset_path: Path, args) -> Path:
@@ -18,14 +18,11 @@ def _resolve_cache_dir(dataset_path: Path, args) -> Path:
     return Path(custom_dir).resolve() if custom_dir else (dataset_path.parent / 'cache').resolve()
 
 
-def _cache_file_path(dataset_path: Path, args, model_type: str, sequence_length: int) -> Path:
+def _cache_file_path(dataset_path: Path, args) -> Path:
+    # The cache holds per-frame arrays only; LSTM windows are strided views built after loading,
+    # so one file serves every model type, sequence length and supervision mode.
     cache_dir = _resolve_cache_dir(dataset_path, args)
-    seq_mode = 'dense' if bool(getattr(args, 'sequence_supervision', False)) else 'last'
-    name = (
-        f'{dataset_path.stem}.model-{model_type}.seq-{int(sequence_length)}.'
-        f'seqmode-{seq_mode}.cache.npz'
-    )
-    return cache_dir / name
+    return cache_dir / f'{dataset_path.stem}.frames-v{FEATURE_LAYOUT_VERSION}.cache.npz'
 
 
 def _try_load_cached_arrays(cache_path: Path, dataset_path: Path):
@@ -36,10 +33,10 @@ def _try_load_cached_arrays(cache_path: Path, dataset_path: Path):
 
     try:
         payload = np.load(cache_path, allow_pickle=False)
-        x = payload['x'].astype(np.float32)
+        x = payload['x'].astype(np.float32, copy=False)
         y = payload['y']
-        intent_y = payload['intent_y'].astype(np.float32)
-        control_y = payload['control_y'].astype(np.float32)
+        intent_y = payload['intent_y'].astype(np.float32, copy=False)
+        control_y = payload['control_y'].astype(np.float32, copy=False)
         print(f'dataset_cache=hit path={cache_path}')
         return x, y, intent_y, control_y
     except Exception as exc:
@@ -59,8 +56,16 @@ def _save_cached_arrays(cache_path: Path, x, y, intent_y, control_y):
     print(f'dataset_cache=saved path={cache_path}')
 
 
+def _owning_array(array: np.ndarray) -> np.ndarray:
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
 def _estimate_array_mb(x, y, intent_y, control_y) -> float:
-    total = int(np.asarray(x).nbytes + np.asarray(y).nbytes + np.asarray(intent_y).nbytes + np.asarray(control_y).nbytes)
+    # Window views report their logical size in nbytes; count the memory they actually share.
+    owners = {id(owner): owner for owner in (_owning_array(np.asarray(a)) for a in (x, y, intent_y, control_y))}
+    total = int(sum(owner.nbytes for owner in owners.values()))
     return float(total / (1024 ** 2))
 
 
@@ -142,43 +147,21 @@ def flatten_intents(intent):
     return intent.reshape(-1, intent.shape[-1]) if intent.ndim == 3 else intent
 
 
-def load_dataset(args):
+def load_frames(args):
     dataset_path = Path(args.dataset)
     model_type = str(args.model_type).strip().lower()
     use_cache = bool(getattr(args, 'dataset_cache_enabled', True))
+    workers = int(getattr(args, 'dataset_workers', 1))
+    effective_seq_len = _choose_effective_sequence_length(args, dataset_path) if model_type == 'lstm' else 1
 
-    if model_type == 'lstm':
-        effective_seq_len = _choose_effective_sequence_length(args, dataset_path)
-        cache_path = _cache_file_path(dataset_path, args, model_type=model_type, sequence_length=effective_seq_len)
-        if use_cache:
-            cached = _try_load_cached_arrays(cache_path, dataset_path)
-            if cached is not None:
-                x, y, intent_y, control_y = cached
-                _warn_if_large_dataset(x, y, intent_y, control_y)
-                return dataset_path, model_type, x, y, intent_y, control_y
-
-        if bool(args.sequence_supervision):
-            x, y, intent_y, control_y = load_dataset_sequences_hybrid_dense(dataset_path, sequence_length=effective_seq_len)
-        else:
-            x, y, intent_y, control_y = load_dataset_sequences_hybrid(dataset_path, sequence_length=effective_seq_len)
-
-        if use_cache:
-            _save_cached_arrays(cache_path, x, y, intent_y, control_y)
-    else:
-        cache_path = _cache_file_path(dataset_path, args, model_type=model_type, sequence_length=1)
+    cache_path = _cache_file_path(dataset_path, args)
+    frames = _try_load_cached_arrays(cache_path, dataset_path) if use_cache else None
+    if frames is None:
+        frames = load_dataset_hybrid(dataset_path, workers=workers)
         if use_cache:
-            cached = _try_load_cached_arrays(cache_path, dataset_path)
-            if cached is not None:
-                x, y, intent_y, control_y = cached
-                _warn_if_large_dataset(x, y, intent_y, control_y)
-                return dataset_path, model_type, x, y, intent_y, control_y
-
-        x, y, intent_y, control_y = load_dataset_hybrid(dataset_path)
-        if use_cache:
-            _save_cached_arrays(cache_path, x, y, intent_y, control_y)
-
-    _warn_if_large_dataset(x, y, intent_y, control_y)
-    return dataset_path, model_type, x, y, intent_y, control_y
+            _save_cached_arrays(cache_path, *frames)
+    _warn_if_large_dataset(*frames)
+    return dataset_path, model_type, frames, effective_seq_len
 
 
 def shuffle_dataset(x, y, intent_y, control_y, seed: int):
@@ -188,6 +171,34 @@ def shuffle_dataset(x, y, intent_y, control_y, seed: int):
     return x[idx], y[idx], intent_y[idx], control_y[idx]
 
 
+def split_window_starts(frame_count: int, sequence_length: int, seed: int, jsonl_path=None):
+    # Same seeding, permutation and 80/20 cut as shuffle_dataset + split_train_val, applied to
+    # window start offsets instead of materialized windows.
+    seq_len = max(2, int(sequence_length))
+    if frame_count < seq_len:
+        raise ValueError(f'Not enough records for hybrid sequence_length={seq_len}. Found {frame_count} in dataset: {jsonl_path}')
+    np.random.seed(int(seed))
+    torch.manual_seed(int(seed))
+    starts = window_starts(frame_count, seq_len)[np.random.permutation(frame_count - seq_len + 1)]
+    split_idx = max(1, int(len(starts) * 0.8))
+    train_starts, val_starts = starts[:split_idx], starts[split_idx:]
+    if len(val_starts) == 0:
+        val_starts = train_starts
+    return train_starts, val_starts
+
+
+def normalize_frames(frames_x, train_starts, sequence_length: int, args):
+    return preprocess_and_normalize_frames(
+        frames=frames_x,
+        train_weights=frame_coverage(train_starts, sequence_length, len(frames_x)),
+        normalize=bool(args.normalize_features),
+        min_feature_std=float(args.min_feature_std),
+        clip_value=float(args.normalize_clip_value),
+        preserve_binary_features=bool(args.normalize_preserve_binary),
+        log_scale=bool(args.normalize_log_scale),
+    )
+
+
 def split_train_val(x, y, intent_y, control_y):
     split_idx = max(1, int(len(x) * 0.8))
     train = (x[:split_idx], y[:split_idx], intent_y[:split_idx], control_y[:split_idx])
@@ -224,14 +235,14 @@ def to_tensors(train, val):
     }
 
 
-def print_dataset_summary(args, n, in_features, model_type, y):
+def print_dataset_summary(args, n, in_features, model_type, y, sample_weights=None):
     flat_y = flatten_actions(y)
     print(
         f'dataset_records={n} in_features={in_features} model_type={model_type} '
         f'normalize={args.normalize_features} class_weighted_loss={args.class_weighted_loss} dropout={args.dropout} '
         f'sequence_supervision={args.sequence_supervision} intent_loss_weight={args.intent_loss_weight} control_loss_weight={args.control_loss_weight}'
     )
-    counts = np.bincount(flat_y, minlength=len(ACTION_VOCAB))
+    counts = np.bincount(flat_y, weights=sample_weights, minlength=len(ACTION_VOCAB))
     print('label_distribution=' + json.dumps({ACTION_VOCAB[i]: int(c) for i, c in enumerate(counts)}, ensure_ascii=False))
     dominant_idx = int(np.argmax(counts))
     dominant_ratio = float(counts[dominant_idx] / max(1, int(counts.sum())))
@@ -49,11 +49,18 @@ def train_one_epoch(model, train_loader, optimizer, action_loss_fn, intent_loss_
     return out
 
 
+def _val_batch(tensors, start: int, end: int):
+    # LSTM runs pass a SequenceWindowDataset as 'val_windows'; a slice of it gathers one batch.
+    if 'val_windows' in tensors:
+        return tensors['val_windows'][start:end]
+    return tensors['x_val'][start:end], tensors['y_val'][start:end], tensors['intent_val'][start:end], tensors['control_val'][start:end]
+
+
 def evaluate(model, tensors, action_loss_fn, intent_loss_fn, control_loss_fn, args, device: torch.device):
     model.eval()
     non_blocking = bool(getattr(args, 'non_blocking_transfer', True))
     eval_batch_size = max(1, int(getattr(args, 'eval_batch_size', 0) or getattr(args, 'batch_size', 128)))
-    n = int(tensors['x_val'].shape[0])
+    n = len(tensors['val_windows']) if 'val_windows' in tensors else int(tensors['x_val'].shape[0])
 
     loss_sum = 0.0
     action_sum = 0.0
@@ -67,13 +74,14 @@ def evaluate(model, tensors, action_loss_fn, intent_loss_fn, control_loss_fn, ar
         for start in range(0, n, eval_batch_size):
             end = min(n, start + eval_batch_size)
             batch_n = end - start
+            xb, yb, intent_b, control_b = _val_batch(tensors, start, end)
 
             total, action, intent, control, acc, intent_acc = compute_losses(
                 model,
-                tensors['x_val'][start:end].to(device, non_blocking=non_blocking),
-                tensors['y_val'][start:end].to(device, non_blocking=non_blocking),
-                tensors['intent_val'][start:end].to(device, non_blocking=non_blocking),
-                tensors['control_val'][start:end].to(device, non_blocking=non_blocking),
+                xb.to(device, non_blocking=non_blocking),
+                yb.to(device, non_blocking=non_blocking),
+                intent_b.to(device, non_blocking=non_blocking),
+                control_b.to(device, non_blocking=non_blocking),
                 action_loss_fn,
                 intent_loss_fn,
                 control_loss_fn,
@@ -31,7 +31,7 @@ def build_model(model_type: str, in_features: int, args):
     )
 
 
-def compute_class_weights(y_train, args):
+def compute_class_weights(y_train, args, sample_weights=None):
     y_flat = flatten_actions(y_train)
     weights = compute_stable_class_weights(
         labels=y_flat,
@@ -39,8 +39,9 @@ def compute_class_weights(y_train, args):
         min_weight=float(args.class_weight_min),
         max_weight=float(args.class_weight_max),
         power=float(args.class_weight_power),
+        sample_weights=sample_weights,
     )
-    counts = np.bincount(y_flat, minlength=len(ACTION_VOCAB)).astype(np.float32)
+    counts = np.bincount(y_flat, weights=sample_weights, minlength=len(ACTION_VOCAB)).astype(np.float32)
     for action, multiplier in parse_action_boosts(args.action_weight_boost).items():
         idx = ACTION_TO_ID.get(action)
         if idx is not None and counts[idx] > 0:
@@ -60,12 +61,17 @@ def build_train_loader(tensors, y_train, class_weights, batch_size: int, oversam
     return DataLoader(train_dataset, batch_size=batch_size, sampler=sampler)
 
 
-def build_loss_functions(args, intent_train, class_weights):
+def build_loss_functions(args, intent_train, class_weights, sample_weights=None):
     action_loss_fn = nn.CrossEntropyLoss(weight=torch.tensor(class_weights, dtype=torch.float32)) if args.class_weighted_loss else nn.CrossEntropyLoss()
     if args.intent_balanced_loss:
         flat_intent = flatten_intents(intent_train)
-        intent_pos = np.clip(flat_intent.sum(axis=0), 1.0, None)
-        intent_neg = np.clip(float(flat_intent.shape[0]) - intent_pos, 1.0, None)
+        if sample_weights is None:
+            intent_pos = np.clip(flat_intent.sum(axis=0), 1.0, None)
+            intent_total = float(flat_intent.shape[0])
+        else:
+            intent_pos = np.clip(np.asarray(sample_weights, dtype=np.float64) @ flat_intent, 1.0, None)
+            intent_total = float(np.sum(sample_weights))
+        intent_neg = np.clip(intent_total - intent_pos, 1.0, None)
         pos_weight = np.clip(intent_neg / intent_pos, 1.0, float(args.intent_pos_weight_max)).astype(np.float32)
         intent_loss_fn = nn.BCEWithLogitsLoss(pos_weight=torch.tensor(pos_weight, dtype=torch.float32))
     else:
@@ -2,11 +2,13 @@ from modules.training.artifacts import save_artifacts
 from modules.training.cli import build_parser, parse_args
 from modules.training.data import (
     apply_baseline_overrides,
-    load_dataset,
+    load_frames,
     normalize_features,
+    normalize_frames,
     print_dataset_summary,
     shuffle_dataset,
     split_train_val,
+    split_window_starts,
     to_tensors,
 )
 from modules.training.engine import run_training_loop
@@ -19,36 +21,56 @@ from modules.training.modeling import (
     compute_class_weights,
     resolve_device,
 )
+from modules.training.windows import SequenceWindowDataset, build_window_train_loader, frame_coverage, window_starts
 
 
 def train(args):
     apply_baseline_overrides(args)
-    dataset_path, model_type, x, y, intent_y, control_y = load_dataset(args)
-    x, y, intent_y, control_y = shuffle_dataset(x, y, intent_y, control_y, args.seed)
+    dataset_path, model_type, frames, sequence_length = load_frames(args)
+    in_features = int(frames[0].shape[-1])
 
-    n = len(x)
-    train_split, val_split = split_train_val(x, y, intent_y, control_y)
-    x_train, y_train, intent_train, control_train = train_split
-    x_val, y_val, intent_val, control_val = val_split
+    if model_type == 'lstm':
+        # Windows are cut from the per-frame arrays at batch time instead of being materialized.
+        x, y, intent_y, control_y = frames
+        dense = bool(args.sequence_supervision)
+        train_starts, val_starts = split_window_starts(len(x), sequence_length, args.seed, dataset_path)
+        x, feature_mean, feature_std = normalize_frames(x, train_starts, sequence_length, args)
+        train_windows = SequenceWindowDataset(x, y, intent_y, control_y, train_starts, sequence_length, dense)
+        tensors = {'val_windows': SequenceWindowDataset(x, y, intent_y, control_y, val_starts, sequence_length, dense)}
+        n = len(x) - sequence_length + 1
+        y_train, intent_train, train_weights = train_windows.targets()
+        if dense:
+            summary_y, summary_weights = y, frame_coverage(window_starts(len(y), sequence_length), sequence_length, len(y))
+        else:
+            summary_y, summary_weights = y[sequence_length - 1:], None
+        class_weights = compute_class_weights(y_train, args, sample_weights=train_weights)
+        train_loader = build_window_train_loader(train_windows, class_weights, int(args.batch_size), bool(args.oversample_meaningful))
+    else:
+        x, y, intent_y, control_y = shuffle_dataset(*frames, args.seed)
+        n = len(x)
+        train_split, val_split = split_train_val(x, y, intent_y, control_y)
+        x_train, y_train, intent_train, control_train = train_split
+        x_val, y_val, intent_val, control_val = val_split
 
-    x_train, x_val, feature_mean, feature_std = normalize_features(x_train, x_val, model_type=model_type, args=args)
-    tensors = to_tensors((x_train, y_train, intent_train, control_train), (x_val, y_val, intent_val, control_val))
+        x_train, x_val, feature_mean, feature_std = normalize_features(x_train, x_val, model_type=model_type, args=args)
+        tensors = to_tensors((x_train, y_train, intent_train, control_train), (x_val, y_val, intent_val, control_val))
+        train_weights = None
+        summary_y, summary_weights = y, None
+        class_weights = compute_class_weights(y_train, args)
+        train_loader = build_train_loader(tensors, y_train, class_weights, int(args.batch_size), bool(args.oversample_meaningful))
 
-    in_features = int(x.shape[-1])
     device = resolve_device(getattr(args, 'device', 'auto'))
     model = build_model(model_type, in_features, args).to(device)
     optimizer = build_optimizer(model, args)
     scheduler = build_scheduler(optimizer, args)
 
-    class_weights = compute_class_weights(y_train, args)
-    train_loader = build_train_loader(tensors, y_train, class_weights, int(args.batch_size), bool(args.oversample_meaningful))
-    action_loss_fn, intent_loss_fn, control_loss_fn = build_loss_functions(args, intent_train, class_weights)
+    action_loss_fn, intent_loss_fn, control_loss_fn = build_loss_functions(args, intent_train, class_weights, sample_weights=train_weights)
     action_loss_fn = action_loss_fn.to(device)
     intent_loss_fn = intent_loss_fn.to(device)
     control_loss_fn = control_loss_fn.to(device)
 
     print(f'training_device={device.type}')
-    print_dataset_summary(args, n, in_features, model_type, y)
+    print_dataset_summary(args, n, in_features, model_type, summary_y, sample_weights=summary_weights)
 
     result = run_training_loop(
         model=model,
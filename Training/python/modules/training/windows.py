@@ -0,0 +1,69 @@
+from numbers import Integral
+from typing import Optional, Tuple
+
+import numpy as np
+import torch
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, WeightedRandomSampler
+
+
+def window_starts(frame_count: int, sequence_length: int) -> np.ndarray:
+    return np.arange(max(0, int(frame_count) - int(sequence_length) + 1), dtype=np.int64)
+
+
+def frame_coverage(starts: np.ndarray, sequence_length: int, frame_count: int) -> np.ndarray:
+    # Number of windows that contain each frame, i.e. how often it appears in a flattened
+    # [windows, sequence_length] batch of the same windows.
+    starts = np.asarray(starts, dtype=np.int64)
+    edges = np.bincount(starts, minlength=frame_count + 1) - np.bincount(starts + int(sequence_length), minlength=frame_count + 1)
+    return np.cumsum(edges[:frame_count])
+
+
+class SequenceWindowDataset(Dataset):
+    # Windows are gathered from the flat per-frame arrays when indexed, so memory holds N frames
+    # rather than N x sequence_length. Indexing with a list or slice returns a whole batch.
+    def __init__(self, x, y, intent, control, starts, sequence_length: int, dense: bool):
+        self.x = torch.as_tensor(x, dtype=torch.float32)
+        self.y = torch.as_tensor(y, dtype=torch.long)
+        self.intent = torch.as_tensor(intent, dtype=torch.float32)
+        self.control = torch.as_tensor(control, dtype=torch.float32)
+        self.starts = torch.as_tensor(np.asarray(starts, dtype=np.int64))
+        self.sequence_length = int(sequence_length)
+        self.dense = bool(dense)
+        self._steps = torch.arange(self.sequence_length, dtype=torch.long)
+
+    def __len__(self) -> int:
+        return int(self.starts.shape[0])
+
+    def __getitem__(self, index):
+        single = isinstance(index, Integral)
+        starts = self.starts[index:index + 1] if single else self.starts[index]
+        frames = starts.unsqueeze(1) + self._steps
+        targets = frames if self.dense else frames[:, -1]
+        batch = (self.x[frames], self.y[targets], self.intent[targets], self.control[targets])
+        return tuple(item[0] for item in batch) if single else batch
+
+    def end_frames(self) -> np.ndarray:
+        return self.starts.numpy() + self.sequence_length - 1
+
+    def last_labels(self) -> np.ndarray:
+        return self.y.numpy()[self.end_frames()]
+
+    def coverage(self) -> np.ndarray:
+        return frame_coverage(self.starts.numpy(), self.sequence_length, int(self.x.shape[0]))
+
+    def targets(self) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        # (labels, intents, weights) equivalent to flattening the windows' targets: per-frame with
+        # coverage weights for dense supervision, the last step of each window otherwise.
+        if self.dense:
+            return self.y.numpy(), self.intent.numpy(), self.coverage()
+        ends = self.end_frames()
+        return self.y.numpy()[ends], self.intent.numpy()[ends], None
+
+
+def build_window_train_loader(dataset: SequenceWindowDataset, class_weights, batch_size: int, oversample_meaningful: bool):
+    if oversample_meaningful:
+        sample_weights = torch.tensor(class_weights[dataset.last_labels()], dtype=torch.float32)
+        sampler = WeightedRandomSampler(weights=sample_weights, num_samples=len(sample_weights), replacement=True)
+    else:
+        sampler = RandomSampler(dataset)
+    return DataLoader(dataset, sampler=BatchSampler(sampler, batch_size=int(batch_size), drop_last=False), batch_size=None)
@@ -1,24 +1,46 @@
-from pathlib import Path
-from typing import Any, Dict, Optional
-from collections import deque
+import json
+import threading
 import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from contextlib import ExitStack, asynccontextmanager
+from dataclasses import dataclass
 
+import anyio
 import numpy as np
 import torch
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, ValidationError
 
 from dataset_utils import (
     ACTION_TO_ID,
+    DELTA_TIME_FEATURE_INDEX,
+    FEATURE_LAYOUT_VERSION,
     ID_TO_ACTION,
     INTENT_VOCAB,
     augment_feature_with_temporal_context,
+    delta_time_feature,
     safe_timestamp_seconds,
     state_to_feature_vector,
+    states_to_feature_matrix,
 )
 from modules.model_heads import CONTROL_KEYS
-from modules.policy_bundle import load_model
-from modules.sequence_normalization import apply_feature_normalization, log_scale_signed
+from modules.serving.agent_store import AgentSession, AgentSessionStore, ModelTrack
+from modules.serving.batching import MicroBatcher
+from modules.serving.degradation import DegradationController
+from modules.serving.incremental import DriftTracker, action_probs, split_model_output, supports_incremental
+from modules.serving.load_shedding import TIMEOUT_HEADER, ArrivalStamp, LoadShedder, arrival_time, expired, parse_timeout_ms
+from modules.serving.metrics import BATCH_SIZE_BUCKETS, REQUEST_BUCKETS_SECONDS, STAGE_BUCKETS_SECONDS, MetricsRegistry
+from modules.serving.model_runtime import ServingModel
+from modules.serving.readiness import Readiness
+from modules.serving.registry import ModelRegistry, ModelRouter, agent_bucket, parse_model_specs, parse_route_rules
+from modules.serving.sequence_arena import SlotPool
+from modules.serving.session_snapshot import SessionSnapshotter
+from modules.serving.shadow import ShadowEvaluator, ShadowJob
+from modules.serving.streaming import StreamStats, serve_stream
+from modules.serving.wire_format import WIRE_VERSION, decode_predict_batch, decode_predict_frame
+from serving_config import SERVING_CONFIG
 
 
 class PredictRequest(BaseModel):
@@ -26,44 +48,195 @@ class PredictRequest(BaseModel):
     agent_id: str = 'default'
     timestamp: Optional[Any] = None
     temperature: Optional[float] = None
+    deadline_ms: Optional[float] = None
+
+
+class PackedPredictRequest(PredictRequest):
+    features: Any = None
+
+
+class PredictBatchRequest(BaseModel):
+    requests: List[PredictRequest]
+
 
+@dataclass
+class PreparedPrediction:
+    session: AgentSession
+    serving: ServingModel
+    track: ModelTrack
+    model_type: str
+    x_t: torch.Tensor
+    temperature: float
+    shadow: Optional[ServingModel] = None
+    shadow_frame: Optional[np.ndarray] = None
+    deadline: Optional[float] = None
+    degraded: bool = False
 
-MODEL_PATH = Path(__file__).resolve().parents[1] / 'models' / 'behavior_model.pt'
-MODEL_BUNDLE = load_model(MODEL_PATH) if MODEL_PATH.exists() else None
-SEQUENCE_BUFFERS: Dict[str, deque] = {}
-LAST_ACTION_BY_AGENT: Dict[str, str] = {}
-LAST_TS_BY_AGENT: Dict[str, float] = {}
-LAST_BASE_FEATURE_BY_AGENT: Dict[str, np.ndarray] = {}
-LAST_SEEN_BY_AGENT: Dict[str, float] = {}
+
+MODEL_PATH = Path(SERVING_CONFIG['model_path'])
 ACTION_INERTIA_THRESHOLD = 0.6
-AGENT_STATE_TTL_SECONDS = 1800.0
-MAX_TRACKED_AGENTS = 4096
-PREDICT_COUNTER = 0
+AGENT_STATE_TTL_SECONDS = float(SERVING_CONFIG['agent_state_ttl_seconds'])
+MAX_TRACKED_AGENTS = int(SERVING_CONFIG['max_tracked_agents'])
+MODEL_WATCH_INTERVAL_SECONDS = float(SERVING_CONFIG['model_watch_interval_seconds'])
+SEQUENCE_SLOTS = SlotPool(MAX_TRACKED_AGENTS + int(SERVING_CONFIG['arena_headroom_slots']))
 DEFAULT_ACTION_TEMPERATURE = 0.8
 MIN_TEMPERATURE = 1e-3
+LSTM_INFERENCE_MODE = str(SERVING_CONFIG['lstm_inference_mode']).strip().lower()
+INCREMENTAL_PARITY_INTERVAL = int(SERVING_CONFIG['incremental_parity_interval'])
+INCREMENTAL_RESYNC_INTERVAL = int(SERVING_CONFIG['incremental_resync_interval'])
+
+TORCH_THREADS = int(SERVING_CONFIG['torch_threads'])
+TORCH_INTEROP_THREADS = int(SERVING_CONFIG['torch_interop_threads'])
+if TORCH_THREADS > 0:
+    torch.set_num_threads(TORCH_THREADS)
+if TORCH_INTEROP_THREADS > 0:
+    torch.set_num_interop_threads(TORCH_INTEROP_THREADS)
+WARMUP_BATCH_SIZES = tuple(
+    int(size) for size in str(SERVING_CONFIG['warmup_batch_sizes']).split(',') if size.strip()
+) or (1, int(SERVING_CONFIG['batch_max_size']))
+WARMUP_ITERATIONS = max(1, int(SERVING_CONFIG['warmup_iterations']))
+READINESS = Readiness()
+
+METRICS = MetricsRegistry(enabled=bool(SERVING_CONFIG['metrics_enabled']))
+METRICS.histogram('stage_seconds', 'Time spent in each prediction stage; batch stages are observed once per forward batch.', STAGE_BUCKETS_SECONDS)
+METRICS.histogram('request_seconds', 'End-to-end handler time per request.', REQUEST_BUCKETS_SECONDS)
+METRICS.histogram('forward_batch_size', 'Rows per model forward pass.', BATCH_SIZE_BUCKETS)
+METRICS.counter('requests_total', 'Prediction requests by endpoint.')
+METRICS.counter('predictions_total', 'Predictions served by model.')
+METRICS.counter('request_errors_total', 'Requests answered with an error by endpoint and reason.')
+METRICS.counter('shed_total', 'Predictions dropped before inference by reason and stage.')
+METRICS.counter('degradation_switches_total', 'Degradation tier changes by direction.')
+
+LOAD_SHEDDER = LoadShedder(
+    max_pending=int(SERVING_CONFIG['max_pending_requests']),
+    default_timeout_ms=float(SERVING_CONFIG['request_timeout_ms']),
+)
+
+MODEL_REGISTRY = ModelRegistry(
+    parse_model_specs(SERVING_CONFIG['models'], MODEL_PATH),
+    SEQUENCE_SLOTS,
+    warm_batch_sizes=WARMUP_BATCH_SIZES,
+    quantize=bool(SERVING_CONFIG['quantize_int8']),
+    fuse_normalization=bool(SERVING_CONFIG['fuse_normalization']),
+    warm_iterations=WARMUP_ITERATIONS,
+)
+DEFAULT_MODEL = str(SERVING_CONFIG['default_model']).strip() or (
+    'default' if 'default' in MODEL_REGISTRY else MODEL_REGISTRY.names()[0]
+)
+MODEL_ROUTER = ModelRouter(DEFAULT_MODEL, parse_route_rules(SERVING_CONFIG['model_routes']))
+SHADOW_MODEL = str(SERVING_CONFIG['shadow_model']).strip() or None
+SHADOW_AGENT_PERCENT = float(SERVING_CONFIG['shadow_agent_percent'])
+DEGRADE_MODEL = str(SERVING_CONFIG['degrade_model']).strip() or None
+for _model_name in [DEFAULT_MODEL, SHADOW_MODEL, DEGRADE_MODEL] + [model_name for _, model_name in MODEL_ROUTER.rules]:
+    if _model_name is not None and _model_name not in MODEL_REGISTRY:
+        raise ValueError(f'Unknown model {_model_name!r}; configured models: {MODEL_REGISTRY.names()}')
+if DEGRADE_MODEL is not None and DEGRADE_MODEL == SHADOW_MODEL:
+    raise ValueError('POLICY_DEGRADE_MODEL and POLICY_SHADOW_MODEL must be different models.')
+
+DEGRADATION = DegradationController(
+    DEGRADE_MODEL,
+    high_pending=float(SERVING_CONFIG['degrade_high_pending']),
+    low_pending=float(SERVING_CONFIG['degrade_low_pending']),
+    step_percent=float(SERVING_CONFIG['degrade_step_percent']),
+    max_percent=float(SERVING_CONFIG['degrade_max_percent']),
+    interval_seconds=float(SERVING_CONFIG['degrade_interval_seconds']),
+    hold_seconds=float(SERVING_CONFIG['degrade_hold_seconds']),
+) if DEGRADE_MODEL is not None else None
+
+
+def _release_sequence_slot(session: AgentSession):
+    SEQUENCE_SLOTS.release(session.slot)
+    session.slot = None
+
+
+AGENT_SESSIONS = AgentSessionStore(
+    capacity=MAX_TRACKED_AGENTS,
+    ttl_seconds=AGENT_STATE_TTL_SECONDS,
+    on_evict=_release_sequence_slot,
+)
+
 
-app = FastAPI(title='Minecraft Policy Server', version='0.1.0')
+def _session_snapshot_path() -> Optional[Path]:
+    raw = str(SERVING_CONFIG['session_snapshot_path']).strip()
+    if not raw:
+        return None
+    worker_index = int(SERVING_CONFIG['cluster_worker_index'])
+    # Each worker of serve_policy_cluster owns a disjoint set of agents and keeps its own snapshot.
+    return Path(raw).expanduser() / f'worker-{worker_index}' if worker_index >= 0 else Path(raw).expanduser()
 
 
-def _drop_agent_state(agent_key: str):
-    SEQUENCE_BUFFERS.pop(agent_key, None)
-    LAST_ACTION_BY_AGENT.pop(agent_key, None)
-    LAST_TS_BY_AGENT.pop(agent_key, None)
-    LAST_BASE_FEATURE_BY_AGENT.pop(agent_key, None)
-    LAST_SEEN_BY_AGENT.pop(agent_key, None)
+SESSION_SNAPSHOT_PATH = _session_snapshot_path()
+SESSION_SNAPSHOTTER = SessionSnapshotter(
+    SESSION_SNAPSHOT_PATH,
+    AGENT_SESSIONS,
+    lambda: {name: MODEL_REGISTRY.get(name) for name in MODEL_REGISTRY.names()},
+    interval_seconds=float(SERVING_CONFIG['session_snapshot_interval_seconds']),
+) if SESSION_SNAPSHOT_PATH is not None else None
 
 
-def _cleanup_agent_state(now_ts: float):
-    expiration_cutoff = float(now_ts) - float(AGENT_STATE_TTL_SECONDS)
-    expired_keys = [agent_key for agent_key, last_seen in LAST_SEEN_BY_AGENT.items() if float(last_seen) < expiration_cutoff]
-    for agent_key in expired_keys:
-        _drop_agent_state(agent_key)
+def _warm_request_path():
+    # Featurization, the arena, sampling and postprocessing pay first-call costs too, so run
+    # the full request path for every model before taking traffic. Shadowing is skipped, metrics
+    # are paused, and each model's forward counters and drift checks are reset afterwards, so
+    # warm-up shows up in none of them.
+    metrics_enabled = METRICS.enabled
+    METRICS.enabled = False
+    try:
+        for name in MODEL_REGISTRY.names():
+            serving = MODEL_REGISTRY.get(name)
+            if serving is None:
+                continue
+            for batch_size in WARMUP_BATCH_SIZES:
+                agent_keys = [f'__warmup-{name}-{index}' for index in range(max(1, int(batch_size)))]
+                for _ in range(WARMUP_ITERATIONS):
+                    with ExitStack() as stack:
+                        prepared = [
+                            _prepare_prediction(PredictRequest(state={}, agent_id=agent_key), stack.enter_context(AGENT_SESSIONS.locked(agent_key)), serving)
+                            for agent_key in agent_keys
+                        ]
+                        _run_prepared_batch(prepared)
+                for agent_key in agent_keys:
+                    AGENT_SESSIONS.drop(agent_key)
+            serving.reset_stats()
+    finally:
+        METRICS.enabled = metrics_enabled
+
+
+def start_serving():
+    try:
+        READINESS.advance('loading')
+        MODEL_REGISTRY.load_initial()
+        READINESS.advance('warming')
+        _warm_request_path()
+        # Restored after warm-up so warm-up sessions never push real agents out of the store.
+        if SESSION_SNAPSHOTTER is not None:
+            READINESS.advance('restoring')
+            SESSION_SNAPSHOTTER.restore(SEQUENCE_SLOTS, ttl_seconds=AGENT_STATE_TTL_SECONDS)
+            SESSION_SNAPSHOTTER.start()
+        MODEL_REGISTRY.start_watching(MODEL_WATCH_INTERVAL_SECONDS)
+        READINESS.advance('ready')
+    except Exception as exc:
+        READINESS.fail(f'{type(exc).__name__}: {exc}')
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    threadpool_size = int(SERVING_CONFIG['threadpool_size'])
+    if threadpool_size > 0:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = threadpool_size
+    # The port opens right away; /ready and request handling wait for load, warm-up and restore.
+    threading.Thread(target=start_serving, name='policy-startup', daemon=True).start()
+    try:
+        yield
+    finally:
+        MODEL_REGISTRY.stop_watching()
+        # A server that never finished restoring must not overwrite the previous snapshot.
+        if SESSION_SNAPSHOTTER is not None and READINESS.ready:
+            SESSION_SNAPSHOTTER.stop()
+
 
-    excess = len(LAST_SEEN_BY_AGENT) - int(MAX_TRACKED_AGENTS)
-    if excess > 0:
-        oldest = sorted(LAST_SEEN_BY_AGENT.items(), key=lambda item: float(item[1]))[:excess]
-        for agent_key, _ in oldest:
-            _drop_agent_state(agent_key)
+app = FastAPI(title='Minecraft Policy Server', version='0.1.0', lifespan=_lifespan)
+app.add_middleware(ArrivalStamp)
 
 
 def _resolve_temperature(raw_temperature: Optional[float]) -> float:
@@ -78,6 +251,104 @@ def _resolve_temperature(raw_temperature: Optional[float]) -> float:
     return max(float(MIN_TEMPERATURE), value)
 
 
+def _incremental_enabled(serving: Optional[ServingModel]) -> bool:
+    if LSTM_INFERENCE_MODE != 'incremental' or serving is None:
+        return False
+    return serving.model_type == 'lstm' and supports_incremental(serving.model)
+
+
+def _row_outputs(action_logits, intent_logits, control_pred, row: int):
+    return (
+        action_logits[row:row + 1],
+        intent_logits[row:row + 1] if intent_logits is not None else None,
+        control_pred[row:row + 1] if control_pred is not None else None,
+    )
+
+
+def _incremental_forward_batch(serving: ServingModel, items: List[PreparedPrediction]) -> List[tuple]:
+    model = serving.model
+    results: List[Optional[tuple]] = [None] * len(items)
+    warm_rows: List[int] = []
+    cold_rows: List[int] = []
+    for row, item in enumerate(items):
+        track = item.track
+        resync_due = INCREMENTAL_RESYNC_INTERVAL > 0 and track.incremental_steps >= INCREMENTAL_RESYNC_INTERVAL
+        if track.lstm_state is not None and not resync_due:
+            warm_rows.append(row)
+        else:
+            cold_rows.append(row)
+
+    if cold_rows:
+        lap = time.perf_counter()
+        window_t = serving.arena.gather([items[row].session.slot for row in cold_rows])
+        lap = METRICS.lap('stage_seconds', lap, _stage(serving, 'tensor'))
+        window_t = serving.normalize(window_t)
+        lap = METRICS.lap('stage_seconds', lap, _stage(serving, 'normalize'))
+        model_out, (h, c) = model.forward_with_state(window_t)
+        METRICS.lap('stage_seconds', lap, _stage(serving, 'forward'))
+        action_logits, intent_logits, control_pred = split_model_output(model_out)
+        for batch_idx, row in enumerate(cold_rows):
+            track = items[row].track
+            track.lstm_state = (h[:, batch_idx:batch_idx + 1], c[:, batch_idx:batch_idx + 1])
+            track.incremental_steps = 0
+            results[row] = _row_outputs(action_logits, intent_logits, control_pred, batch_idx)
+
+    if warm_rows:
+        lap = time.perf_counter()
+        step_t = torch.stack([items[row].x_t for row in warm_rows])
+        prev_h = torch.cat([items[row].track.lstm_state[0] for row in warm_rows], dim=1)
+        prev_c = torch.cat([items[row].track.lstm_state[1] for row in warm_rows], dim=1)
+        lap = METRICS.lap('stage_seconds', lap, _stage(serving, 'tensor'))
+        step_t = serving.normalize(step_t).unsqueeze(1)
+        lap = METRICS.lap('stage_seconds', lap, _stage(serving, 'normalize'))
+        model_out, (h, c) = model.forward_with_state(step_t, (prev_h, prev_c))
+        METRICS.lap('stage_seconds', lap, _stage(serving, 'forward'))
+        action_logits, intent_logits, control_pred = split_model_output(model_out)
+        parity_rows: List[int] = []
+        for batch_idx, row in enumerate(warm_rows):
+            track = items[row].track
+            track.incremental_steps += 1
+            steps = track.incremental_steps
+            track.lstm_state = (h[:, batch_idx:batch_idx + 1], c[:, batch_idx:batch_idx + 1])
+            results[row] = _row_outputs(action_logits, intent_logits, control_pred, batch_idx)
+            if INCREMENTAL_PARITY_INTERVAL > 0 and steps % INCREMENTAL_PARITY_INTERVAL == 0:
+                parity_rows.append(batch_idx)
+
+        if parity_rows:
+            lap = time.perf_counter()
+            window_t = serving.normalize(serving.arena.gather([items[warm_rows[batch_idx]].session.slot for batch_idx in parity_rows]))
+            window_logits, _, _ = split_model_output(model(window_t))
+            window_probs = action_probs(window_logits)
+            step_probs = action_probs(action_logits)
+            for parity_idx, batch_idx in enumerate(parity_rows):
+                serving.drift.update(step_probs[batch_idx], window_probs[parity_idx])
+            METRICS.lap('stage_seconds', lap, _stage(serving, 'parity_check'))
+
+    return results
+
+
+def _forward_batch(serving: ServingModel, items: List[PreparedPrediction]) -> List[tuple]:
+    started = time.perf_counter()
+    with torch.no_grad():
+        if _incremental_enabled(serving):
+            outputs = _incremental_forward_batch(serving, items)
+        else:
+            if serving.model_type == 'lstm':
+                xt = serving.arena.gather([item.session.slot for item in items])
+            else:
+                xt = torch.stack([item.x_t for item in items])
+            lap = METRICS.lap('stage_seconds', started, _stage(serving, 'tensor'))
+            xt = serving.normalize(xt)
+            lap = METRICS.lap('stage_seconds', lap, _stage(serving, 'normalize'))
+            model_out = serving.model(xt)
+            METRICS.lap('stage_seconds', lap, _stage(serving, 'forward'))
+            action_logits, intent_logits, control_pred = split_model_output(model_out)
+            outputs = [_row_outputs(action_logits, intent_logits, control_pred, row) for row in range(len(items))]
+    serving.record_forward(len(items), time.perf_counter() - started)
+    METRICS.observe('forward_batch_size', len(items), (('model', serving.name),))
+    return outputs
+
+
 def _select_action(action_logits: torch.Tensor, temperature: float) -> tuple[int, torch.Tensor]:
     if float(temperature) <= float(MIN_TEMPERATURE):
         probs = torch.softmax(action_logits, dim=1).squeeze(0)
@@ -88,108 +359,228 @@ def _select_action(action_logits: torch.Tensor, temperature: float) -> tuple[int
     return sampled_id, probs
 
 
+def _model_health(name: str, reloader_status: dict):
+    serving = MODEL_REGISTRY.get(name)
+    return {
+        **reloader_status,
+        'incremental_drift': serving.drift.summary() if serving is not None else None,
+        'sequence_arena': serving.arena.stats() if serving is not None and serving.arena is not None else None,
+    }
+
+
 @app.get('/health')
 def health():
+    serving = MODEL_REGISTRY.get(DEFAULT_MODEL)
+    bundle = serving.bundle if serving is not None else None
+    reload_status = MODEL_REGISTRY.status()
     return {
         'ok': True,
-        'model_loaded': MODEL_BUNDLE is not None,
-        'model_path': str(MODEL_PATH),
-        'model_type': MODEL_BUNDLE.get('model_type') if MODEL_BUNDLE else None,
-        'sequence_length': MODEL_BUNDLE.get('sequence_length') if MODEL_BUNDLE else None,
-        'hybrid_enabled': MODEL_BUNDLE.get('hybrid_enabled') if MODEL_BUNDLE else None,
+        'model_loaded': bundle is not None,
+        'model_path': str(MODEL_REGISTRY.reloaders[DEFAULT_MODEL].path),
+        'model_type': bundle.get('model_type') if bundle else None,
+        'sequence_length': bundle.get('sequence_length') if bundle else None,
+        'hybrid_enabled': bundle.get('hybrid_enabled') if bundle else None,
+        'ready': READINESS.ready,
+        'readiness': READINESS.describe(),
         'action_selection': 'temperature_sampling',
+        'torch_threads': torch.get_num_threads(),
+        'torch_interop_threads': torch.get_num_interop_threads(),
         'default_temperature': float(DEFAULT_ACTION_TEMPERATURE),
+        'lstm_inference_mode': 'incremental' if _incremental_enabled(serving) else 'window',
+        'incremental_drift': serving.drift.summary() if serving is not None else DriftTracker().summary(),
+        'agent_sessions': AGENT_SESSIONS.stats(),
+        'session_snapshot': SESSION_SNAPSHOTTER.stats() if SESSION_SNAPSHOTTER is not None else None,
+        'sequence_arena': serving.arena.stats() if serving is not None and serving.arena is not None else None,
+        'micro_batching': PREDICT_BATCHER.stats() if PREDICT_BATCHER is not None else None,
+        'load_shedding': LOAD_SHEDDER.stats(),
+        'degradation': DEGRADATION.stats() if DEGRADATION is not None else None,
+        'packed_wire': {'wire_version': WIRE_VERSION, 'feature_layout_version': FEATURE_LAYOUT_VERSION},
+        'streaming': STREAM_STATS.snapshot(),
+        'model_reload': reload_status[DEFAULT_MODEL],
+        'models': {name: _model_health(name, status) for name, status in reload_status.items()},
+        'routing': MODEL_ROUTER.describe(),
+        'shadow': {
+            'model': SHADOW_MODEL,
+            'agent_percent': SHADOW_AGENT_PERCENT,
+            **SHADOW_EVALUATOR.stats(),
+        } if SHADOW_EVALUATOR is not None else None,
     }
 
 
-@app.post('/predict')
-def predict(request: PredictRequest):
-    global PREDICT_COUNTER
-    if MODEL_BUNDLE is None:
-        return {
-            'ok': False,
-            'error': f'Model not found at {MODEL_PATH}',
-            'fallback_action': 'EXPLORE',
-        }
+@app.get('/ready')
+def ready():
+    if READINESS.ready and MODEL_REGISTRY.get(DEFAULT_MODEL) is not None:
+        return {'ready': True, 'state': READINESS.state}
+    return JSONResponse(status_code=503, content={'ready': False, 'state': READINESS.state, 'error': READINESS.error})
 
-    agent_key = str(request.agent_id or 'default')
-    current_ts = safe_timestamp_seconds(request.timestamp if request.timestamp is not None else request.state.get('timestamp'))
-    observed_ts = float(current_ts) if current_ts > 0.0 else float(time.time())
-    LAST_SEEN_BY_AGENT[agent_key] = observed_ts
-    PREDICT_COUNTER += 1
-    if len(LAST_SEEN_BY_AGENT) > int(MAX_TRACKED_AGENTS) or (PREDICT_COUNTER % 128 == 0):
-        _cleanup_agent_state(observed_ts)
 
-    previous_ts = LAST_TS_BY_AGENT.get(agent_key, 0.0)
-    delta_time = max(0.0, current_ts - previous_ts) if current_ts > 0.0 and previous_ts > 0.0 else 0.0
-    if current_ts > 0.0:
-        LAST_TS_BY_AGENT[agent_key] = current_ts
+@app.post('/admin/reload')
+def admin_reload(model: Optional[str] = None, wait: bool = False):
+    if model is not None and model not in MODEL_REGISTRY:
+        return {'ok': False, 'error': f'Unknown model {model!r}', 'models': MODEL_REGISTRY.names()}
+    reloaders = [MODEL_REGISTRY.reloaders[model]] if model is not None else list(MODEL_REGISTRY.reloaders.values())
+    started = {reloader.name: reloader.request_reload() for reloader in reloaders}
+    if wait:
+        for reloader in reloaders:
+            reloader.wait()
+    status = {reloader.name: reloader.status() for reloader in reloaders}
+    return {
+        'ok': all(item['state'] != 'failed' for item in status.values()),
+        'started': started,
+        'model_reload': status,
+    }
 
-    base_x = state_to_feature_vector(request.state, delta_time=delta_time)
-    prev_base = LAST_BASE_FEATURE_BY_AGENT.get(agent_key)
-    prev_action_name = LAST_ACTION_BY_AGENT.get(agent_key)
-    prev_action_id = ACTION_TO_ID.get(str(prev_action_name or '').upper()) if prev_action_name else None
 
-    if bool(MODEL_BUNDLE.get('temporal_context_features', False)):
+def _agent_key(request: PredictRequest) -> str:
+    return str(request.agent_id or 'default')
+
+
+def _stage(serving: ServingModel, stage: str):
+    return (('model', serving.name), ('stage', stage))
+
+
+def _degradation_tier(agent_key: str, serving: Optional[ServingModel]) -> tuple:
+    if DEGRADATION is None or serving is None or serving.name == DEGRADE_MODEL:
+        return serving, None, False
+    cheaper = MODEL_REGISTRY.get(DEGRADE_MODEL)
+    bucket = agent_bucket(agent_key)
+    if cheaper is None or not DEGRADATION.eligible(agent_key, bucket):
+        return serving, None, False
+    # The model not serving this agent is kept on standby: it is fed every frame too, so
+    # switching tier in either direction continues the agent's window instead of restarting it.
+    if DEGRADATION.degraded(agent_key, bucket):
+        return cheaper, serving, True
+    return serving, cheaper, False
+
+
+def _resolve_models(agent_key: str) -> tuple:
+    routed = MODEL_REGISTRY.get(MODEL_ROUTER.route(agent_key)) or MODEL_REGISTRY.get(DEFAULT_MODEL)
+    serving, standby, degraded = _degradation_tier(agent_key, routed)
+    if degraded or SHADOW_EVALUATOR is None or serving is None or serving.name == SHADOW_MODEL:
+        return serving, None, standby, degraded
+    if SHADOW_AGENT_PERCENT < 100.0 and agent_bucket(agent_key) >= SHADOW_AGENT_PERCENT:
+        return serving, None, standby, degraded
+    return serving, MODEL_REGISTRY.get(SHADOW_MODEL), standby, degraded
+
+
+def _model_frame(bundle: dict, base_x: np.ndarray, prev_base: Optional[np.ndarray], prev_action_id: Optional[int]) -> np.ndarray:
+    if bool(bundle.get('temporal_context_features', False)):
         x = augment_feature_with_temporal_context(base_x, prev_base, prev_action_id)
     else:
         x = base_x
+    return np.ascontiguousarray(x, dtype=np.float32)
+
+
+def _stage_frame(serving: ServingModel, track: ModelTrack, slot: Optional[int], x: np.ndarray, fresh: bool = False):
+    if serving.arena is None:
+        return
+    if track.model_generation != serving.generation:
+        track.lstm_state = None
+        track.incremental_steps = 0
+        track.model_generation = serving.generation
+    fresh = fresh or track.layout_generation != serving.layout_generation
+    serving.arena.append(slot, x, fresh=fresh)
+    track.layout_generation = serving.layout_generation
 
-    LAST_BASE_FEATURE_BY_AGENT[agent_key] = base_x
-    if (
-        MODEL_BUNDLE.get('normalize_features', True)
-        and MODEL_BUNDLE['feature_mean'] is not None
-        and MODEL_BUNDLE['feature_std'] is not None
-    ):
-        if bool(MODEL_BUNDLE.get('normalize_log_scale', False)):
-            x = log_scale_signed(x)
-        x = apply_feature_normalization(
-            x,
-            MODEL_BUNDLE['feature_mean'],
-            MODEL_BUNDLE['feature_std'],
-            clip_value=float(MODEL_BUNDLE.get('normalize_clip_value', 10.0)),
-        )
-
-    model_type = MODEL_BUNDLE.get('model_type', 'mlp')
-    seq_len = int(MODEL_BUNDLE.get('sequence_length', 1))
-
-    if model_type == 'lstm':
-        key = agent_key
-        if key not in SEQUENCE_BUFFERS:
-            SEQUENCE_BUFFERS[key] = deque(maxlen=seq_len)
-
-        buffer = SEQUENCE_BUFFERS[key]
-        buffer.append(x)
-
-        while len(buffer) < seq_len:
-            buffer.appendleft(x)
-
-        seq_array = np.stack(list(buffer)).astype(np.float32)
-        xt = torch.tensor(seq_array, dtype=torch.float32).unsqueeze(0)
-    else:
-        xt = torch.tensor(x, dtype=torch.float32).unsqueeze(0)
 
+def _session_delta_time(request: PredictRequest, session: AgentSession) -> float:
+    current_ts = safe_timestamp_seconds(request.timestamp if request.timestamp is not None else request.state.get('timestamp'))
+    previous_ts = session.last_ts
+    delta_time = max(0.0, current_ts - previous_ts) if current_ts > 0.0 and previous_ts > 0.0 else 0.0
+    if current_ts > 0.0:
+        session.last_ts = current_ts
+    return delta_time
+
+
+def _featurize_round(items: List[PredictRequest], sessions: Dict[str, AgentSession], servings: List[ServingModel]) -> List[Optional[np.ndarray]]:
+    # JSON requests in one round are featurized as a single matrix; packed requests already
+    # carry their features and keep going through _prepare_prediction on their own.
+    rows = [index for index, item in enumerate(items) if not isinstance(item, PackedPredictRequest)]
+    features: List[Optional[np.ndarray]] = [None] * len(items)
+    if len(rows) < 2:
+        return features
+    started = time.perf_counter()
+    delta_times = [_session_delta_time(items[index], sessions[_agent_key(items[index])]) for index in rows]
+    matrix = states_to_feature_matrix([items[index].state for index in rows], delta_times)
+    per_row = (time.perf_counter() - started) / len(rows)
+    for row, index in enumerate(rows):
+        features[index] = matrix[row]
+        METRICS.observe('stage_seconds', per_row, _stage(servings[index], 'featurize'))
+    return features
+
+
+def _prepare_prediction(
+    request: PredictRequest,
+    session: AgentSession,
+    serving: ServingModel,
+    shadow: Optional[ServingModel] = None,
+    standby: Optional[ServingModel] = None,
+    degraded: bool = False,
+    deadline: Optional[float] = None,
+    base_x: Optional[np.ndarray] = None,
+) -> PreparedPrediction:
+    # A caller-supplied base_x was featurized with the rest of its round by _featurize_round,
+    # which has already advanced the session clock.
+    started = time.perf_counter()
+    if base_x is None and isinstance(request, PackedPredictRequest):
+        base_x = request.features
+        base_x[DELTA_TIME_FEATURE_INDEX] = delta_time_feature(_session_delta_time(request, session))
+    elif base_x is None:
+        base_x = state_to_feature_vector(request.state, delta_time=_session_delta_time(request, session))
+        started = METRICS.lap('stage_seconds', started, _stage(serving, 'featurize'))
+    prev_base = session.last_base_feature
+    prev_action_name = session.last_action
+    prev_action_id = ACTION_TO_ID.get(str(prev_action_name or '').upper()) if prev_action_name else None
+    session.last_base_feature = base_x
+    x = _model_frame(serving.bundle, base_x, prev_base, prev_action_id)
+    started = METRICS.lap('stage_seconds', started, _stage(serving, 'temporal'))
+
+    if session.slot is None and any(model is not None and model.arena is not None for model in (serving, shadow, standby)):
+        session.slot = SEQUENCE_SLOTS.allocate()
+        if session.slot is None:
+            raise RuntimeError('Sequence arena is full; raise POLICY_ARENA_HEADROOM_SLOTS.')
+    track = session.track(serving.name)
+    _stage_frame(serving, track, session.slot, x)
+    if standby is not None and standby.arena is not None:
+        standby_track = session.track(standby.name)
+        _stage_frame(standby, standby_track, session.slot, _model_frame(standby.bundle, base_x, prev_base, prev_action_id))
+        # The standby model does not step its incremental state, so it is re-derived from the window on switch.
+        standby_track.lstm_state = None
+    METRICS.lap('stage_seconds', started, _stage(serving, 'tensor'))
+
+    return PreparedPrediction(
+        session=session,
+        serving=serving,
+        track=track,
+        model_type=serving.model_type,
+        x_t=torch.from_numpy(x),
+        temperature=_resolve_temperature(request.temperature),
+        shadow=shadow,
+        shadow_frame=_model_frame(shadow.bundle, base_x, prev_base, prev_action_id) if shadow is not None else None,
+        deadline=deadline,
+        degraded=degraded,
+    )
+
+
+def _finalize_prediction(prepared: PreparedPrediction, outputs: tuple):
+    session = prepared.session
+    bundle = prepared.serving.bundle
+    action_logits, intent_logits, control_pred = outputs
+    hybrid_runtime = intent_logits is not None and control_pred is not None
+    action_temperature = prepared.temperature
+    started = time.perf_counter()
     with torch.no_grad():
-        model_out = MODEL_BUNDLE['model'](xt)
-        if isinstance(model_out, tuple) and len(model_out) == 3:
-            action_logits, intent_logits, control_pred = model_out
-            hybrid_runtime = True
-        else:
-            action_logits = model_out
-            intent_logits = None
-            control_pred = None
-            hybrid_runtime = False
-        action_temperature = _resolve_temperature(request.temperature)
         action_id, probs = _select_action(action_logits, action_temperature)
+    started = METRICS.lap('stage_seconds', started, _stage(prepared.serving, 'sampling'))
 
     action_name = ID_TO_ACTION.get(action_id, 'IDLE')
     confidence = float(probs[action_id].item())
 
-    if hybrid_runtime and intent_logits is not None and control_pred is not None:
-        explicit_intent_supervision = bool(MODEL_BUNDLE.get('explicit_intent_supervision', True))
+    if hybrid_runtime:
+        explicit_intent_supervision = bool(bundle.get('explicit_intent_supervision', True))
         if explicit_intent_supervision:
             intent_probs = torch.sigmoid(intent_logits).squeeze(0)
-            intent_vocab = MODEL_BUNDLE.get('intent_vocab') or INTENT_VOCAB
+            intent_vocab = bundle.get('intent_vocab') or INTENT_VOCAB
             intent_scores = {
                 str(intent_vocab[idx]): float(intent_probs[idx].item())
                 for idx in range(min(len(intent_vocab), int(intent_probs.shape[0])))
@@ -209,25 +600,395 @@ def predict(request: PredictRequest):
         active_intents = []
         continuous_control = {}
 
-    previous_action = LAST_ACTION_BY_AGENT.get(agent_key)
+    previous_action = session.last_action
     if previous_action and confidence < ACTION_INERTIA_THRESHOLD:
         action_name = previous_action
     else:
-        LAST_ACTION_BY_AGENT[agent_key] = action_name
+        session.last_action = action_name
+
+    if prepared.shadow is not None:
+        session.shadow_sequence += 1
+        SHADOW_EVALUATOR.submit(ShadowJob(
+            session=session,
+            slot=session.slot,
+            sequence=session.shadow_sequence,
+            frame=prepared.shadow_frame,
+            primary_model=prepared.serving.name,
+            primary_action=action_name,
+            primary_probs=action_probs(action_logits).squeeze(0),
+            shadow_model=prepared.shadow.name,
+        ))
 
     hybrid_action = [action_name] + [intent for intent in active_intents if intent != action_name]
 
-    return {
+    result = {
         'ok': True,
         'action': action_name,
         'confidence': confidence,
-        'agent_id': agent_key,
-        'model_type': model_type,
-        'hybrid_enabled': bool(MODEL_BUNDLE.get('hybrid_enabled', False) and hybrid_runtime),
+        'agent_id': session.agent_key,
+        'model': prepared.serving.name,
+        'model_type': prepared.model_type,
+        'degraded': prepared.degraded,
+        'hybrid_enabled': bool(bundle.get('hybrid_enabled', False) and hybrid_runtime),
         'action_temperature': float(action_temperature),
-        'explicit_intent_supervision': bool(MODEL_BUNDLE.get('explicit_intent_supervision', True)),
+        'explicit_intent_supervision': bool(bundle.get('explicit_intent_supervision', True)),
         'intent_scores': intent_scores,
         'active_intents': active_intents,
         'continuous_control': continuous_control,
         'hybrid_action': hybrid_action,
     }
+    METRICS.lap('stage_seconds', started, _stage(prepared.serving, 'postprocess'))
+    METRICS.inc('predictions_total', (('model', prepared.serving.name),))
+    return result
+
+
+def _run_prepared_batch(items: List[PreparedPrediction]):
+    groups: Dict[int, List[int]] = {}
+    results: List[Optional[dict]] = [None] * len(items)
+    now = time.perf_counter()
+    for row, item in enumerate(items):
+        if expired(item.deadline, now):
+            # The frame is already in the window but the incremental state never saw it, so re-derive it next time.
+            item.track.lstm_state = None
+            results[row] = _shed_request('deadline', 'batch')
+            continue
+        groups.setdefault(id(item.serving), []).append(row)
+    for rows in groups.values():
+        group = [items[row] for row in rows]
+        for row, item, outputs in zip(rows, group, _forward_batch(group[0].serving, group)):
+            results[row] = _finalize_prediction(item, outputs)
+    return results
+
+
+def _run_shadow_jobs(jobs: List[ShadowJob]) -> List[Optional[torch.Tensor]]:
+    results: List[Optional[torch.Tensor]] = [None] * len(jobs)
+    rows: List[int] = []
+    items: List[PreparedPrediction] = []
+    serving = MODEL_REGISTRY.get(SHADOW_MODEL)
+    if serving is None:
+        return results
+    with ExitStack() as stack:
+        # Session locks are held until the forward pass has read the arena rows, so an agent
+        # evicted meanwhile cannot hand its slot to another agent. They are taken in agent-key
+        # order, like _predict_many; each round has at most one job per agent.
+        for row, job in sorted(enumerate(jobs), key=lambda entry: entry[1].session.agent_key):
+            stack.enter_context(AGENT_SESSIONS.held(job.session))
+            if job.session.evicted or job.session.slot != job.slot:
+                continue
+            if serving.arena is not None and job.slot is None:
+                continue
+            track = job.session.track(serving.name)
+            # A dropped job leaves a gap in this agent's shadow window, so restart it from the current frame.
+            fresh = job.sequence != track.sequence + 1
+            track.sequence = job.sequence
+            _stage_frame(serving, track, job.slot, job.frame, fresh=fresh)
+            rows.append(row)
+            items.append(PreparedPrediction(
+                session=job.session,
+                serving=serving,
+                track=track,
+                model_type=serving.model_type,
+                x_t=torch.from_numpy(job.frame),
+                temperature=1.0,
+            ))
+        if items:
+            for row, outputs in zip(rows, _forward_batch(serving, items)):
+                results[row] = action_probs(outputs[0]).squeeze(0)
+    return results
+
+
+SHADOW_EVALUATOR = (
+    ShadowEvaluator(
+        _run_shadow_jobs,
+        action_names=lambda action_id: ID_TO_ACTION.get(action_id, 'IDLE'),
+        queue_size=int(SERVING_CONFIG['shadow_queue_size']),
+        max_batch_size=int(SERVING_CONFIG['batch_max_size']),
+        log_path=str(SERVING_CONFIG['shadow_log_path']).strip() or None,
+    )
+    if SHADOW_MODEL is not None
+    else None
+)
+
+PREDICT_BATCHER = (
+    MicroBatcher(
+        _run_prepared_batch,
+        max_batch_size=int(SERVING_CONFIG['batch_max_size']),
+        max_wait_ms=float(SERVING_CONFIG['batch_max_wait_ms']),
+    )
+    if bool(SERVING_CONFIG['micro_batching'])
+    else None
+)
+
+
+def _model_unavailable(agent_key: str):
+    path = MODEL_REGISTRY.reloaders[MODEL_ROUTER.route(agent_key)].path
+    return {
+        'ok': False,
+        'error': f'Model not found at {path}',
+        'fallback_action': 'EXPLORE',
+    }
+
+
+SHED_ERRORS = {
+    'deadline': 'Request deadline passed before inference',
+    'overloaded': 'Policy server is overloaded',
+}
+
+
+def _shed_request(reason: str, stage: str, count: int = 1):
+    LOAD_SHEDDER.record(reason, stage, count)
+    METRICS.inc('shed_total', (('reason', reason), ('stage', stage)), count)
+    return {'ok': False, 'error': SHED_ERRORS[reason], 'shed': reason, 'fallback_action': 'EXPLORE'}
+
+
+def _observe_pressure():
+    step = DEGRADATION.observe(LOAD_SHEDDER.pending)
+    if step:
+        METRICS.inc('degradation_switches_total', (('direction', 'up' if step > 0 else 'down'),))
+
+
+def _observe_request(endpoint: str, handler, request, deadline=None):
+    started = time.perf_counter()
+    labels = (('endpoint', endpoint),)
+    METRICS.inc('requests_total', labels)
+    if DEGRADATION is not None:
+        _observe_pressure()
+    if not READINESS.ready:
+        METRICS.inc('request_errors_total', labels + (('reason', 'not_ready'),))
+        return {
+            'ok': False,
+            'error': f'Policy server is not ready ({READINESS.state})',
+            'readiness': READINESS.state,
+            'fallback_action': 'EXPLORE',
+        }
+    try:
+        result = handler(request, deadline)
+    except Exception:
+        METRICS.inc('request_errors_total', labels + (('reason', 'exception'),))
+        raise
+    finally:
+        METRICS.observe('request_seconds', time.perf_counter() - started, labels)
+    if not result.get('ok'):
+        METRICS.inc('request_errors_total', labels + (('reason', result.get('shed') or 'model_unavailable'),))
+    return result
+
+
+def _predict_one(request: PredictRequest, deadline: Optional[float] = None):
+    agent_key = _agent_key(request)
+    serving, shadow, standby, degraded = _resolve_models(agent_key)
+    if serving is None:
+        return _model_unavailable(agent_key)
+    if expired(deadline):
+        return _shed_request('deadline', 'queued')
+
+    with AGENT_SESSIONS.locked(agent_key) as session:
+        # Waiting behind this agent's previous request can use up the rest of the budget.
+        if expired(deadline):
+            return _shed_request('deadline', 'queued')
+        prepared = _prepare_prediction(request, session, serving, shadow, standby, degraded, deadline)
+        if PREDICT_BATCHER is not None:
+            return PREDICT_BATCHER.submit(prepared, key=session.agent_key)
+        return _run_prepared_batch([prepared])[0]
+
+
+def _predict_many(request: PredictBatchRequest, deadlines: Optional[List[Optional[float]]] = None):
+    deadlines = deadlines or [None] * len(request.requests)
+    routes = {_agent_key(item): None for item in request.requests}
+    for agent_key in routes:
+        routes[agent_key] = _resolve_models(agent_key)
+    if routes and all(route[0] is None for route in routes.values()):
+        return {
+            **_model_unavailable(next(iter(routes))),
+            'results': [],
+        }
+
+    results: List[Optional[dict]] = [None] * len(request.requests)
+    pending = []
+    for index, item in enumerate(request.requests):
+        if routes[_agent_key(item)][0] is None:
+            results[index] = _model_unavailable(_agent_key(item))
+        else:
+            pending.append((index, item))
+    while pending:
+        round_items = []
+        deferred = []
+        round_agents = set()
+        for index, item in pending:
+            agent_key = _agent_key(item)
+            if agent_key in round_agents:
+                deferred.append((index, item))
+                continue
+            round_agents.add(agent_key)
+            round_items.append((index, item))
+
+        with ExitStack() as stack:
+            sessions = {
+                agent_key: stack.enter_context(AGENT_SESSIONS.locked(agent_key))
+                for agent_key in sorted(round_agents)
+            }
+            prepared = []
+            prepared_rows = []
+            live = []
+            for index, item in round_items:
+                if expired(deadlines[index]):
+                    results[index] = _shed_request('deadline', 'queued')
+                    continue
+                live.append((index, item))
+            features = _featurize_round(
+                [item for _, item in live],
+                sessions,
+                [routes[_agent_key(item)][0] for _, item in live],
+            )
+            for (index, item), base_x in zip(live, features):
+                prepared.append(_prepare_prediction(item, sessions[_agent_key(item)], *routes[_agent_key(item)], deadline=deadlines[index], base_x=base_x))
+                prepared_rows.append(index)
+            for index, result in zip(prepared_rows, _run_prepared_batch(prepared)):
+                results[index] = result
+        pending = deferred
+
+    return {'ok': True, 'results': results}
+
+
+def _request_deadline(item: PredictRequest, received: float, headers) -> Optional[float]:
+    return LOAD_SHEDDER.deadline(received, item.deadline_ms, parse_timeout_ms(headers.get(TIMEOUT_HEADER)))
+
+
+async def _admit(endpoint: str, handler, request, deadline, weight: int = 1):
+    # Requests past the pending bound are answered at once instead of queueing for a thread,
+    # so a spike costs some bots one decision rather than every bot its latency.
+    if not LOAD_SHEDDER.enter(weight):
+        METRICS.inc('requests_total', (('endpoint', endpoint),))
+        METRICS.inc('request_errors_total', (('endpoint', endpoint), ('reason', 'overloaded')))
+        content = _shed_request('overloaded', 'admission', weight)
+        return {**content, 'results': [content] * len(request.requests)} if isinstance(request, PredictBatchRequest) else content
+    try:
+        return await anyio.to_thread.run_sync(_observe_request, endpoint, handler, request, deadline)
+    finally:
+        LOAD_SHEDDER.leave(weight)
+
+
+@app.post('/predict')
+async def predict(request: PredictRequest, http_request: Request):
+    deadline = _request_deadline(request, arrival_time(http_request.scope), http_request.headers)
+    return await _admit('predict', _predict_one, request, deadline)
+
+
+@app.post('/predict_batch')
+async def predict_batch(request: PredictBatchRequest, http_request: Request):
+    received = arrival_time(http_request.scope)
+    deadlines = [_request_deadline(item, received, http_request.headers) for item in request.requests]
+    return await _admit('predict_batch', _predict_many, request, deadlines, weight=len(request.requests))
+
+
+def _packed_error_content(exc: Exception):
+    return {
+        'ok': False,
+        'error': str(exc),
+        'wire_rejected': True,
+        'wire_version': WIRE_VERSION,
+        'feature_layout_version': FEATURE_LAYOUT_VERSION,
+        'fallback_action': 'EXPLORE',
+    }
+
+
+def _packed_error(endpoint: str, exc: Exception):
+    METRICS.inc('request_errors_total', (('endpoint', endpoint), ('reason', 'bad_frame')))
+    return JSONResponse(status_code=400, content=_packed_error_content(exc))
+
+
+@app.post('/predict_packed')
+async def predict_packed(request: Request):
+    received = arrival_time(request.scope)
+    try:
+        fields = decode_predict_frame(await request.body())
+    except ValueError as exc:
+        return _packed_error('predict_packed', exc)
+    item = PackedPredictRequest.model_construct(state={}, **fields)
+    return await _admit('predict_packed', _predict_one, item, _request_deadline(item, received, request.headers))
+
+
+@app.post('/predict_batch_packed')
+async def predict_batch_packed(request: Request):
+    received = arrival_time(request.scope)
+    try:
+        frames = decode_predict_batch(await request.body())
+    except ValueError as exc:
+        return _packed_error('predict_batch_packed', exc)
+    batch = PredictBatchRequest.model_construct(
+        requests=[PackedPredictRequest.model_construct(state={}, **fields) for fields in frames],
+    )
+    deadlines = [_request_deadline(item, received, request.headers) for item in batch.requests]
+    return await _admit('predict_batch_packed', _predict_many, batch, deadlines, weight=len(batch.requests))
+
+
+STREAM_STATS = StreamStats()
+
+
+def _observe_stream(request: PredictRequest, deadline: Optional[float]):
+    # Stream frames are bounded per connection rather than admitted, but still count as pending load.
+    LOAD_SHEDDER.enter(bounded=False)
+    try:
+        return _observe_request('stream', _predict_one, request, deadline)
+    finally:
+        LOAD_SHEDDER.leave()
+
+
+def _stream_frame(agent_key: str, message: Dict[str, Any], received: float, timeout_ms: Optional[float]) -> dict:
+    if message.get('bytes') is not None:
+        try:
+            fields = decode_predict_frame(message['bytes'])
+        except ValueError as exc:
+            METRICS.inc('request_errors_total', (('endpoint', 'stream'), ('reason', 'bad_frame')))
+            return _packed_error_content(exc)
+        request = PackedPredictRequest.model_construct(state={}, **{**fields, 'agent_id': agent_key})
+        return _observe_stream(request, LOAD_SHEDDER.deadline(received, None, timeout_ms))
+
+    try:
+        payload = json.loads(message.get('text') or '')
+        request = PredictRequest.model_validate({**payload, 'agent_id': agent_key})
+    except (ValueError, TypeError, ValidationError) as exc:
+        METRICS.inc('request_errors_total', (('endpoint', 'stream'), ('reason', 'bad_frame')))
+        return {'ok': False, 'error': f'Invalid stream frame: {exc}', 'fallback_action': 'EXPLORE'}
+    result = _observe_stream(request, LOAD_SHEDDER.deadline(received, request.deadline_ms, timeout_ms))
+    return {**result, 'id': payload['id']} if 'id' in payload else result
+
+
+@app.websocket('/stream')
+async def stream(websocket: WebSocket, agent_id: str = 'default', timeout_ms: Optional[float] = None):
+    agent_key = str(agent_id or 'default')
+    timeout_ms = parse_timeout_ms(timeout_ms)
+    await serve_stream(
+        websocket,
+        lambda seq, message, received: _stream_frame(agent_key, message, received, timeout_ms),
+        STREAM_STATS,
+        max_inflight=int(SERVING_CONFIG['stream_max_inflight']),
+    )
+
+
+def _metric_gauges():
+    sessions = AGENT_SESSIONS.stats()
+    gauges = [
+        ('active_agents', 'gauge', 'Agent sessions currently tracked.', [((), sessions['active_agents'])]),
+        ('agent_evictions_total', 'counter', 'Agent sessions evicted for capacity.', [((), sessions['evictions'])]),
+        ('agent_expirations_total', 'counter', 'Agent sessions expired by TTL.', [((), sessions['expirations'])]),
+        ('micro_batch_queue_depth', 'gauge', 'Prepared requests waiting for the micro-batcher.', [((), PREDICT_BATCHER.queue_depth() if PREDICT_BATCHER is not None else 0)]),
+        ('pending_requests', 'gauge', 'Admitted predictions not yet answered (batch items count individually).', [((), LOAD_SHEDDER.pending)]),
+        ('stream_connections', 'gauge', 'Open /stream connections.', [((), STREAM_STATS.active)]),
+        ('ready', 'gauge', 'Whether startup (load, warm-up, session restore) has finished.', [((), 1 if READINESS.ready else 0)]),
+        ('model_loaded', 'gauge', 'Whether each configured model is serving.', [
+            ((('model', name),), 1 if MODEL_REGISTRY.get(name) is not None else 0) for name in MODEL_REGISTRY.names()
+        ]),
+    ]
+    if DEGRADATION is not None:
+        gauges.append(('degradation_level', 'gauge', 'Current degradation tier; 0 serves every agent its routed model.', [((), DEGRADATION.level)]))
+        gauges.append(('degraded_agent_percent', 'gauge', 'Share of agents currently served by the degrade model.', [((), DEGRADATION.degraded_percent)]))
+    if SHADOW_EVALUATOR is not None:
+        shadow = SHADOW_EVALUATOR.stats()
+        gauges.append(('shadow_queue_depth', 'gauge', 'Shadow comparisons waiting to run.', [((), shadow['queue_depth'])]))
+        gauges.append(('shadow_dropped_total', 'counter', 'Shadow comparisons dropped on a full queue.', [((), shadow['dropped'])]))
+    return gauges
+
+
+@app.get('/metrics')
+def metrics():
+    return PlainTextResponse(METRICS.render(_metric_gauges()), media_type='text/plain; version=0.0.4')
@@ -0,0 +1,318 @@
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlencode
+
+import anyio
+import websockets
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from modules.serving.cluster import UpstreamError, WorkerClient, WorkerPool, default_worker_count, merge_prometheus
+from modules.serving.load_shedding import TIMEOUT_HEADER, ArrivalStamp, arrival_time, parse_timeout_ms
+from modules.serving.metrics import REQUEST_BUCKETS_SECONDS, MetricsRegistry
+from modules.serving.wire_format import PACKED_CONTENT_TYPE, encode_predict_batch, frame_agent_id, split_predict_batch
+from serving_config import SERVING_CONFIG
+
+
+WORKER_THREADS = max(1, int(SERVING_CONFIG['cluster_worker_threads']))
+WORKER_COUNT = int(SERVING_CONFIG['cluster_workers']) or default_worker_count(WORKER_THREADS)
+STARTUP_TIMEOUT_SECONDS = float(SERVING_CONFIG['cluster_startup_timeout_seconds'])
+UPSTREAM_TIMEOUT_SECONDS = float(SERVING_CONFIG['cluster_upstream_timeout_seconds'])
+HEALTH_FIELDS = ('model_path', 'model_type', 'sequence_length', 'hybrid_enabled', 'lstm_inference_mode', 'packed_wire')
+
+WORKER_POOL = WorkerPool(
+    WORKER_COUNT,
+    threads=WORKER_THREADS,
+    base_port=int(SERVING_CONFIG['cluster_base_port']),
+    pin_cpus=bool(SERVING_CONFIG['cluster_pin_cpus']),
+    virtual_nodes=int(SERVING_CONFIG['cluster_virtual_nodes']),
+    startup_timeout=STARTUP_TIMEOUT_SECONDS,
+)
+WORKER_CLIENTS = [WorkerClient(worker.host, worker.port, timeout=UPSTREAM_TIMEOUT_SECONDS) for worker in WORKER_POOL.workers]
+
+METRICS = MetricsRegistry(prefix='policy_dispatcher', enabled=bool(SERVING_CONFIG['metrics_enabled']))
+METRICS.histogram('request_seconds', 'Dispatcher time per request, including the worker round trip.', REQUEST_BUCKETS_SECONDS)
+METRICS.counter('requests_total', 'Requests by endpoint and worker.')
+METRICS.counter('upstream_errors_total', 'Requests that could not reach their worker.')
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    WORKER_POOL.start()
+    try:
+        yield
+    finally:
+        for client in WORKER_CLIENTS:
+            await client.close()
+        await anyio.to_thread.run_sync(WORKER_POOL.stop)
+
+
+app = FastAPI(title='Minecraft Policy Dispatcher', version='0.1.0', lifespan=_lifespan)
+app.add_middleware(ArrivalStamp)
+
+
+def _no_worker_content(error: str = 'No policy worker available'):
+    return {'ok': False, 'error': error, 'fallback_action': 'EXPLORE'}
+
+
+def _upstream_failed(endpoint: str, worker_index: int, exc: Exception):
+    METRICS.inc('upstream_errors_total', (('endpoint', endpoint), ('worker', str(worker_index))))
+    WORKER_POOL.mark_failed(worker_index, f'{type(exc).__name__}: {exc}')
+    return _no_worker_content(f'Policy worker {worker_index} unavailable')
+
+
+def _request_deadline(request: Request) -> Optional[float]:
+    timeout_ms = parse_timeout_ms(request.headers.get(TIMEOUT_HEADER))
+    return arrival_time(request.scope) + timeout_ms / 1000.0 if timeout_ms is not None else None
+
+
+def _budget_headers(deadline: Optional[float]) -> Optional[Dict[str, str]]:
+    if deadline is None:
+        return None
+    # Workers measure the budget from their own arrival, so only what is left is passed on.
+    return {TIMEOUT_HEADER: f'{max(0.001, 1000.0 * (deadline - time.perf_counter())):.3f}'}
+
+
+async def _forward(endpoint: str, agent_key: str, path: str, body: bytes, content_type: str, deadline: Optional[float] = None):
+    started = time.perf_counter()
+    worker = WORKER_POOL.worker_for(agent_key)
+    if worker is None:
+        return JSONResponse(_no_worker_content())
+    METRICS.inc('requests_total', (('endpoint', endpoint), ('worker', str(worker.index))))
+    try:
+        status, media_type, content = await WORKER_CLIENTS[worker.index].request('POST', path, body, content_type, _budget_headers(deadline))
+    except UpstreamError as exc:
+        return JSONResponse(_upstream_failed(endpoint, worker.index, exc))
+    finally:
+        METRICS.observe('request_seconds', time.perf_counter() - started, (('endpoint', endpoint),))
+    return Response(content, status_code=status, media_type=media_type)
+
+
+async def _fan_out(
+    endpoint: str,
+    path: str,
+    agent_keys: List[str],
+    build_body: Callable[[List[int]], bytes],
+    content_type: str,
+    deadline: Optional[float] = None,
+):
+    started = time.perf_counter()
+    results: List[Optional[dict]] = [None] * len(agent_keys)
+    groups: Dict[int, List[int]] = {}
+    for index, agent_key in enumerate(agent_keys):
+        worker = WORKER_POOL.worker_for(agent_key)
+        if worker is None:
+            results[index] = _no_worker_content()
+        else:
+            groups.setdefault(worker.index, []).append(index)
+    rejected: List[tuple] = []
+
+    async def run(worker_index: int, indices: List[int]):
+        METRICS.inc('requests_total', (('endpoint', endpoint), ('worker', str(worker_index))))
+        try:
+            upstream = await WORKER_CLIENTS[worker_index].request('POST', path, build_body(indices), content_type, _budget_headers(deadline))
+            content = json.loads(upstream[2]) if upstream[0] == 200 else None
+        except (UpstreamError, ValueError) as exc:
+            failed = _upstream_failed(endpoint, worker_index, exc)
+            for index in indices:
+                results[index] = failed
+            return
+        if content is None:
+            rejected.append(upstream)
+            return
+        # Each worker answers its share in order, so per-agent ordering within the batch is kept.
+        shared = {key: value for key, value in content.items() if key != 'results'}
+        worker_results = content.get('results') or []
+        for position, index in enumerate(indices):
+            results[index] = worker_results[position] if position < len(worker_results) else shared
+
+    async with anyio.create_task_group() as tasks:
+        for worker_index, indices in groups.items():
+            tasks.start_soon(run, worker_index, indices)
+    METRICS.observe('request_seconds', time.perf_counter() - started, (('endpoint', endpoint),))
+    if rejected:
+        status, media_type, content = rejected[0]
+        return Response(content, status_code=status, media_type=media_type)
+    return {'ok': True, 'results': results}
+
+
+def _json_agent_key(item) -> str:
+    return str((item.get('agent_id') if isinstance(item, dict) else None) or 'default')
+
+
+@app.post('/predict')
+async def predict(request: Request):
+    deadline = _request_deadline(request)
+    body = await request.body()
+    try:
+        agent_key = _json_agent_key(json.loads(body))
+    except ValueError:
+        # Malformed bodies go to a worker so the error matches the single-process server.
+        agent_key = 'default'
+    return await _forward('predict', agent_key, '/predict', body, 'application/json', deadline)
+
+
+@app.post('/predict_batch')
+async def predict_batch(request: Request):
+    deadline = _request_deadline(request)
+    body = await request.body()
+    try:
+        items = json.loads(body)['requests']
+        if not isinstance(items, list):
+            raise TypeError('requests must be a list')
+    except (ValueError, KeyError, TypeError):
+        return await _forward('predict_batch', 'default', '/predict_batch', body, 'application/json', deadline)
+    return await _fan_out(
+        'predict_batch',
+        '/predict_batch',
+        [_json_agent_key(item) for item in items],
+        lambda indices: json.dumps({'requests': [items[index] for index in indices]}).encode('utf-8'),
+        'application/json',
+        deadline,
+    )
+
+
+@app.post('/predict_packed')
+async def predict_packed(request: Request):
+    deadline = _request_deadline(request)
+    body = await request.body()
+    try:
+        agent_key = frame_agent_id(body)
+    except ValueError:
+        agent_key = 'default'
+    return await _forward('predict_packed', agent_key, '/predict_packed', body, PACKED_CONTENT_TYPE, deadline)
+
+
+@app.post('/predict_batch_packed')
+async def predict_batch_packed(request: Request):
+    deadline = _request_deadline(request)
+    body = await request.body()
+    try:
+        frames = split_predict_batch(body)
+        agent_keys = [frame_agent_id(frame) for frame in frames]
+    except ValueError:
+        return await _forward('predict_batch_packed', 'default', '/predict_batch_packed', body, PACKED_CONTENT_TYPE, deadline)
+    return await _fan_out(
+        'predict_batch_packed',
+        '/predict_batch_packed',
+        agent_keys,
+        lambda indices: encode_predict_batch([frames[index] for index in indices]),
+        PACKED_CONTENT_TYPE,
+        deadline,
+    )
+
+
+async def _relay_replies(websocket: WebSocket, upstream, cancel_scope):
+    try:
+        async for data in upstream:
+            if isinstance(data, bytes):
+                await websocket.send_bytes(data)
+            else:
+                await websocket.send_text(data)
+    except (websockets.ConnectionClosed, RuntimeError):
+        pass
+    cancel_scope.cancel()
+
+
+@app.websocket('/stream')
+async def stream(websocket: WebSocket, agent_id: str = 'default', timeout_ms: Optional[float] = None):
+    agent_key = str(agent_id or 'default')
+    query = {'agent_id': agent_key, **({'timeout_ms': timeout_ms} if parse_timeout_ms(timeout_ms) is not None else {})}
+    worker = WORKER_POOL.worker_for(agent_key)
+    if worker is None:
+        await websocket.close(code=1013)
+        return
+    METRICS.inc('requests_total', (('endpoint', 'stream'), ('worker', str(worker.index))))
+    try:
+        upstream = await websockets.connect(
+            f'ws://{worker.host}:{worker.port}/stream?{urlencode(query)}',
+            max_size=None,
+            open_timeout=UPSTREAM_TIMEOUT_SECONDS,
+        )
+    except (OSError, websockets.WebSocketException, TimeoutError) as exc:
+        _upstream_failed('stream', worker.index, exc)
+        await websocket.close(code=1013)
+        return
+
+    await websocket.accept()
+    # One upstream connection per bot: the worker keeps assigning seq numbers and applying backpressure.
+    try:
+        async with anyio.create_task_group() as tasks:
+            tasks.start_soon(_relay_replies, websocket, upstream, tasks.cancel_scope)
+            try:
+                while True:
+                    message = await websocket.receive()
+                    if message['type'] == 'websocket.disconnect':
+                        break
+                    await upstream.send(message['bytes'] if message.get('bytes') is not None else message.get('text') or '')
+            except websockets.ConnectionClosed:
+                pass
+            tasks.cancel_scope.cancel()
+    finally:
+        await upstream.close()
+
+
+async def _gather(method: str, path: str, params: Optional[dict] = None, parse: str = 'json') -> Dict[int, object]:
+    replies: Dict[int, object] = {}
+
+    async def fetch(worker_index: int):
+        target = f'{path}?{urlencode(params)}' if params else path
+        try:
+            status, _, content = await WORKER_CLIENTS[worker_index].request(method, target)
+            if status != 200:
+                raise ValueError(f'status {status}')
+            replies[worker_index] = json.loads(content) if parse == 'json' else content.decode('utf-8')
+        except (UpstreamError, ValueError):
+            replies[worker_index] = None
+
+    async with anyio.create_task_group() as tasks:
+        for worker in WORKER_POOL.available():
+            tasks.start_soon(fetch, worker.index)
+    return replies
+
+
+@app.get('/health')
+async def health():
+    replies = await _gather('GET', '/health')
+    healthy = [reply for reply in replies.values() if reply]
+    first = healthy[0] if healthy else {}
+    return {
+        'ok': True,
+        'dispatcher': True,
+        'ready': WORKER_POOL.ready(),
+        'model_loaded': bool(healthy) and all(bool(reply.get('model_loaded')) for reply in healthy),
+        **{key: first.get(key) for key in HEALTH_FIELDS},
+        'cluster': WORKER_POOL.stats(),
+        'workers': {str(index): reply for index, reply in sorted(replies.items())},
+    }
+
+
+@app.get('/ready')
+async def ready():
+    if WORKER_POOL.ready():
+        return {'ready': True, 'ready_workers': len(WORKER_POOL.available())}
+    return JSONResponse(status_code=503, content={'ready': False, 'ready_workers': len(WORKER_POOL.available())})
+
+
+@app.post('/admin/reload')
+async def admin_reload(model: Optional[str] = None, wait: bool = False):
+    params = {'wait': str(wait).lower(), **({'model': model} if model is not None else {})}
+    replies = await _gather('POST', '/admin/reload', params=params)
+    return {
+        'ok': bool(replies) and all(bool(reply and reply.get('ok')) for reply in replies.values()),
+        'workers': {str(index): reply for index, reply in sorted(replies.items())},
+    }
+
+
+@app.get('/metrics')
+async def metrics():
+    replies = await _gather('GET', '/metrics', parse='text')
+    merged = merge_prometheus([(str(index), text) for index, text in sorted(replies.items()) if text])
+    stats = WORKER_POOL.stats()
+    gauges = [
+        ('workers_ready', 'gauge', 'Worker processes currently receiving traffic.', [((), stats['ready_workers'])]),
+        ('worker_restarts_total', 'counter', 'Worker processes restarted after exiting.', [((), stats['restarts'])]),
+    ]
+    return PlainTextResponse(merged + METRICS.render(gauges), media_type='text/plain; version=0.0.4')
@@ -0,0 +1,74 @@
+import os
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def _env_override(key: str, default):
+    raw = os.environ.get(f'POLICY_{key.upper()}')
+    if raw is None or str(raw).strip() == '':
+        return default
+    text = str(raw).strip()
+    try:
+        if isinstance(default, bool):
+            return text.lower() in ('1', 'true', 'yes', 'on')
+        if isinstance(default, int):
+            return int(text)
+        if isinstance(default, float):
+            return float(text)
+    except ValueError:
+        return default
+    return text
+
+
+SERVING_DEFAULTS = {
+    'model_path': str((BASE_DIR / '../models/behavior_model.pt').resolve()),
+    'models': '',
+    'default_model': '',
+    'model_routes': '',
+    'shadow_model': '',
+    'shadow_agent_percent': 100.0,
+    'shadow_queue_size': 1024,
+    'shadow_log_path': '',
+    'max_tracked_agents': 4096,
+    'agent_state_ttl_seconds': 1800.0,
+    'arena_headroom_slots': 256,
+    'quantize_int8': False,
+    'fuse_normalization': False,
+    'lstm_inference_mode': 'window',
+    'incremental_parity_interval': 64,
+    'incremental_resync_interval': 0,
+    'micro_batching': False,
+    'batch_max_size': 64,
+    'batch_max_wait_ms': 2.0,
+    'threadpool_size': 0,
+    'stream_max_inflight': 8,
+    'request_timeout_ms': 0.0,
+    'max_pending_requests': 0,
+    'degrade_model': '',
+    'degrade_high_pending': 32.0,
+    'degrade_low_pending': 8.0,
+    'degrade_step_percent': 25.0,
+    'degrade_max_percent': 100.0,
+    'degrade_interval_seconds': 1.0,
+    'degrade_hold_seconds': 10.0,
+    'metrics_enabled': True,
+    'model_watch_interval_seconds': 0.0,
+    'torch_threads': 0,
+    'torch_interop_threads': 0,
+    'warmup_batch_sizes': '',
+    'warmup_iterations': 3,
+    'session_snapshot_path': '',
+    'session_snapshot_interval_seconds': 60.0,
+    'cluster_workers': 0,
+    'cluster_worker_index': -1,
+    'cluster_worker_threads': 1,
+    'cluster_base_port': 0,
+    'cluster_pin_cpus': False,
+    'cluster_virtual_nodes': 64,
+    'cluster_startup_timeout_seconds': 180.0,
+    'cluster_upstream_timeout_seconds': 5.0,
+}
+
+SERVING_CONFIG = {key: _env_override(key, value) for key, value in SERVING_DEFAULTS.items()}
@@ -8,6 +8,7 @@ TRAINING_CONFIG = {
     'dataset': str((BASE_DIR / '../datasets/state-action-2026-02-19.jsonl').resolve()),
     'dataset_cache_enabled': True,
     'dataset_cache_dir': '',
+    'dataset_workers': 0,
     'out_dir': str((BASE_DIR / '../models').resolve()),
     'model_type': 'lstm',
     'sequence_length': 32,
@@ -51,4 +52,5 @@ TRAINING_CONFIG = {
     'early_stopping_patience': 5,
     'early_stopping_min_delta': 1e-6,
     'non_blocking_transfer': True,
+    'export_compiled': True,
 }
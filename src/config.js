@@ -75,6 +75,16 @@ const config = {
   policyServerUrl: strEnv('BOT_POLICY_SERVER_URL', 'http://127.0.0.1:8765/predict'),
   policyTimeoutMs: numEnv('BOT_POLICY_TIMEOUT_MS', 1200, { min: 200, max: 10_000 }),
   policyMinConfidence: numEnv('BOT_POLICY_MIN_CONFIDENCE', 0.25, { min: 0, max: 1 }),
+  policyBatchEnabled: boolEnv('BOT_POLICY_BATCH_ENABLED', false),
+  policyBatchUrl: strEnv('BOT_POLICY_BATCH_URL', 'http://127.0.0.1:8765/predict_batch'),
+  policyBatchWindowMs: numEnv('BOT_POLICY_BATCH_WINDOW_MS', 15, { min: 0, max: 500 }),
+  policyBatchMaxSize: numEnv('BOT_POLICY_BATCH_MAX_SIZE', 64, { min: 1, max: 1024 }),
+  policyWireFormat: strEnv('BOT_POLICY_WIRE_FORMAT', 'json').toLowerCase(),
+  policyPackedUrl: strEnv('BOT_POLICY_PACKED_URL', 'http://127.0.0.1:8765/predict_packed'),
+  policyPackedBatchUrl: strEnv('BOT_POLICY_PACKED_BATCH_URL', 'http://127.0.0.1:8765/predict_batch_packed'),
+  policyStreamEnabled: boolEnv('BOT_POLICY_STREAM_ENABLED', false),
+  policyStreamUrl: strEnv('BOT_POLICY_STREAM_URL', 'ws://127.0.0.1:8765/stream'),
+  policyStreamMaxInflight: numEnv('BOT_POLICY_STREAM_MAX_INFLIGHT', 4, { min: 1, max: 64 }),
   allowCheats: boolEnv('BOT_ALLOW_CHEATS', false),
   localLlmDetectorEnabled: boolEnv('BOT_LOCAL_LLM_DETECTOR_ENABLED', false),
   planIntervalMs: numEnv('BOT_PLAN_INTERVAL_MS', 20_000, { min: 5_000 }),
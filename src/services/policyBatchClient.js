@@ -0,0 +1,84 @@
+const { PACKED_CONTENT_TYPE, encodePolicyBatch } = require('./policyWireFormat')
+
+const sharedClients = new Map()
+const WIRE_REJECTED_STATUSES = new Set([400, 404, 415])
+
+function createPolicyBatchClient({ url, windowMs = 15, maxBatch = 64, timeoutMs = 1200, packed = false }) {
+  let pending = []
+  let timer = null
+
+  async function flush() {
+    if (timer) {
+      clearTimeout(timer)
+      timer = null
+    }
+    const batch = pending
+    pending = []
+    if (!batch.length) return
+
+    const controller = new AbortController()
+    const abortTimer = setTimeout(() => controller.abort(), timeoutMs)
+    try {
+      const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+          'Content-Type': packed ? PACKED_CONTENT_TYPE : 'application/json',
+          'X-Policy-Timeout-Ms': String(timeoutMs),
+        },
+        body: packed
+          ? encodePolicyBatch(batch.map((entry) => entry.body))
+          : JSON.stringify({ requests: batch.map((entry) => entry.body) }),
+        signal: controller.signal,
+      })
+      if (packed && WIRE_REJECTED_STATUSES.has(response.status)) {
+        batch.forEach((entry) => entry.resolve({ ok: false, wireRejected: true }))
+        return
+      }
+      const payload = response.ok ? await response.json() : null
+      const results = Array.isArray(payload?.results) ? payload.results : []
+      batch.forEach((entry, index) => entry.resolve(results[index] || null))
+    } catch {
+      batch.forEach((entry) => entry.resolve(null))
+    } finally {
+      clearTimeout(abortTimer)
+    }
+  }
+
+  function request(body) {
+    return new Promise((resolve) => {
+      pending.push({ body, resolve })
+      if (pending.length >= maxBatch) {
+        flush()
+      } else if (!timer) {
+        timer = setTimeout(flush, windowMs)
+      }
+    })
+  }
+
+  return {
+    request,
+    flush,
+  }
+}
+
+function getSharedPolicyBatchClient(config, { packed = false } = {}) {
+  const url = packed
+    ? String(config.policyPackedBatchUrl || 'http://127.0.0.1:8765/predict_batch_packed')
+    : String(config.policyBatchUrl || 'http://127.0.0.1:8765/predict_batch')
+  if (!sharedClients.has(url)) {
+    sharedClients.set(url, createPolicyBatchClient({
+      url,
+      windowMs: Math.max(0, Number(config.policyBatchWindowMs ?? 15)),
+      maxBatch: Math.max(1, Number(config.policyBatchMaxSize || 64)),
+      timeoutMs: Math.max(200, Number(config.policyTimeoutMs || 1200)),
+      packed,
+    }))
+  }
+  return sharedClients.get(url)
+}
+
+module.exports = {
+  WIRE_REJECTED_STATUSES,
+  createPolicyBatchClient,
+  getSharedPolicyBatchClient,
+}
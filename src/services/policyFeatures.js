@@ -0,0 +1,381 @@
+// Port of state_to_feature_vector in Training/python/modules/dataset_core.py.
+// Keep FEATURE_LAYOUT_VERSION in sync with the Python side; check_packed_features.py verifies parity.
+const FEATURE_LAYOUT_VERSION = 1
+const BASE_FEATURE_DIM = 95
+
+const HOSTILE_ENTITY_HINTS = [
+  'zombie', 'skeleton', 'creeper', 'spider', 'witch', 'pillager', 'vindicator',
+  'evoker', 'enderman', 'blaze', 'ghast', 'slime', 'drowned',
+]
+const ITEM_TYPE_KEYS = ['NONE', 'TOOL', 'RANGED', 'FOOD', 'BLOCK', 'OTHER']
+const BLOCK_KEYS = ['UNKNOWN', 'AIR', 'WATER', 'LAVA', 'PLANT', 'UTILITY', 'SOLID']
+const FOOD_HINTS = ['bread', 'beef', 'pork', 'chicken', 'carrot', 'potato', 'apple', 'food']
+const BLOCK_HINTS = ['plank', 'stone', 'dirt', 'cobblestone', 'sand', 'glass', 'brick', 'block']
+const PY_FLOAT_PATTERN = /^[+-]?(?:(?:\d(?:_?\d)*)?\.?\d(?:_?\d)*|\d(?:_?\d)*\.)(?:e[+-]?\d(?:_?\d)*)?$/i
+const PY_SPECIAL_FLOAT_PATTERN = /^([+-]?)(inf|infinity|nan)$/i
+
+function isDict(value) {
+  return value != null && typeof value === 'object' && !Array.isArray(value)
+}
+
+function dictOr(value) {
+  return isDict(value) ? value : {}
+}
+
+function listOr(value) {
+  return Array.isArray(value) ? value : []
+}
+
+function has(source, key) {
+  return Object.prototype.hasOwnProperty.call(source, key)
+}
+
+function get(source, key, fallback) {
+  return has(source, key) ? source[key] : fallback
+}
+
+function truthy(value) {
+  if (Array.isArray(value)) return value.length > 0
+  if (isDict(value)) return Object.keys(value).length > 0
+  if (typeof value === 'number') return value !== 0
+  return Boolean(value)
+}
+
+function parseFloatText(text) {
+  const trimmed = text.trim()
+  const special = PY_SPECIAL_FLOAT_PATTERN.exec(trimmed)
+  if (special) {
+    if (special[2].toLowerCase() === 'nan') return NaN
+    return special[1] === '-' ? -Infinity : Infinity
+  }
+  if (!PY_FLOAT_PATTERN.test(trimmed)) return null
+  return Number(trimmed.replace(/_/g, ''))
+}
+
+function safeFloat(value, fallback = 0) {
+  if (typeof value === 'number') return value
+  if (typeof value === 'boolean') return value ? 1 : 0
+  if (typeof value === 'string') {
+    const parsed = parseFloatText(value)
+    return parsed == null ? Number(fallback) : parsed
+  }
+  return Number(fallback)
+}
+
+function safeBool(value) {
+  return truthy(value) ? 1 : 0
+}
+
+function safeStr(value, fallback = '') {
+  if (value == null) return fallback
+  if (typeof value === 'boolean') return value ? 'True' : 'False'
+  return String(value).trim()
+}
+
+function pyMax(a, b) {
+  return b > a ? b : a
+}
+
+function pyMin(a, b) {
+  return b < a ? b : a
+}
+
+function includesAny(text, hints) {
+  return hints.some((hint) => text.includes(hint))
+}
+
+function categorizeItemName(name) {
+  const n = safeStr(name, '').toLowerCase()
+  if (!n || n === 'none') return 'NONE'
+  if (includesAny(n, ['sword', 'axe', 'pickaxe', 'shovel', 'hoe'])) return 'TOOL'
+  if (includesAny(n, ['bow', 'crossbow', 'trident'])) return 'RANGED'
+  if (includesAny(n, FOOD_HINTS)) return 'FOOD'
+  if (includesAny(n, BLOCK_HINTS)) return 'BLOCK'
+  return 'OTHER'
+}
+
+function itemTypeOneHot(name) {
+  const bucket = categorizeItemName(name)
+  return ITEM_TYPE_KEYS.map((key) => (bucket === key ? 1 : 0))
+}
+
+function inventoryBucket(name) {
+  const n = safeStr(name, '').toLowerCase()
+  if (!n || n === 'none') return 'OTHER'
+  if (includesAny(n, ['sword', 'axe', 'trident', 'bow', 'crossbow'])) return 'WEAPON'
+  if (includesAny(n, ['pickaxe', 'shovel', 'hoe', 'shears', 'fishing_rod'])) return 'TOOL'
+  if (includesAny(n, FOOD_HINTS)) return 'FOOD'
+  if (includesAny(n, BLOCK_HINTS)) return 'BLOCK'
+  if (includesAny(n, ['torch', 'table', 'furnace', 'bed', 'chest', 'anvil'])) return 'UTILITY'
+  return 'OTHER'
+}
+
+function inventoryFeatures(inventory) {
+  let slotsUsed = 0
+  let totalCount = 0
+  let maxStack = 0
+  const uniqueItems = new Set()
+  const bucketCounts = { TOOL: 0, FOOD: 0, BLOCK: 0, WEAPON: 0, UTILITY: 0, OTHER: 0 }
+
+  for (const item of inventory) {
+    if (!isDict(item)) continue
+    const name = safeStr(item.name, 'none').toLowerCase()
+    const count = pyMax(0, safeFloat(item.count, 0))
+    if (name && name !== 'none') {
+      slotsUsed += 1
+      uniqueItems.add(name)
+    }
+    totalCount += count
+    maxStack = pyMax(maxStack, count)
+    bucketCounts[inventoryBucket(name)] += count
+  }
+
+  return [
+    slotsUsed,
+    totalCount,
+    uniqueItems.size,
+    maxStack,
+    bucketCounts.TOOL,
+    bucketCounts.FOOD,
+    bucketCounts.BLOCK,
+    bucketCounts.WEAPON,
+    bucketCounts.UTILITY,
+    bucketCounts.OTHER,
+  ]
+}
+
+function entityTypeOneHot(entityType) {
+  const et = safeStr(entityType, 'other').toLowerCase()
+  if (et === 'player') return [1, 0, 0, 0, 0]
+  if (et === 'mob') return [0, 1, 0, 0, 0]
+  if (et === 'object') return [0, 0, 1, 0, 0]
+  if (et === 'other') return [0, 0, 0, 1, 0]
+  return [0, 0, 0, 0, 1]
+}
+
+function playerPosition(state) {
+  const pos = state.position
+  if (truthy(pos)) return [safeFloat(pos.x), safeFloat(pos.y), safeFloat(pos.z)]
+  const observer = truthy(state.observer) ? state.observer : {}
+  const observerPos = observer.position
+  if (truthy(observerPos)) return [safeFloat(observerPos.x), safeFloat(observerPos.y), safeFloat(observerPos.z)]
+  return null
+}
+
+function normalized(ex, ey, ez) {
+  const norm = pyMax(1e-6, Math.sqrt(ex * ex + ey * ey + ez * ez))
+  return [ex / norm, ey / norm, ez / norm]
+}
+
+function entityRelativeDirection(entity, state) {
+  const ex = safeFloat(entity.dx)
+  const ey = safeFloat(entity.dy)
+  const ez = safeFloat(entity.dz)
+  if (truthy(ex) || truthy(ey) || truthy(ez)) return normalized(ex, ey, ez)
+
+  const playerPos = playerPosition(state)
+  const entityPos = isDict(entity.position) ? entity.position : {}
+  if (playerPos && truthy(entityPos)) {
+    return normalized(
+      safeFloat(entityPos.x) - playerPos[0],
+      safeFloat(entityPos.y) - playerPos[1],
+      safeFloat(entityPos.z) - playerPos[2],
+    )
+  }
+  return [0, 0, 0]
+}
+
+function topKEntityFeatures(entities, state, k = 3) {
+  const sortedEntities = entities
+    .map((entity, index) => ({ entity, index, distance: safeFloat(entity.distance, 99) }))
+    .sort((a, b) => (a.distance < b.distance ? -1 : b.distance < a.distance ? 1 : a.index - b.index))
+    .map(({ entity }) => entity)
+  const features = []
+
+  for (let idx = 0; idx < k; idx += 1) {
+    if (idx < sortedEntities.length) {
+      const entity = sortedEntities[idx]
+      const dist = pyMax(0, safeFloat(entity.distance, 99))
+      features.push(1, dist, 1 / (1 + dist))
+      features.push(...entityTypeOneHot(entity.type))
+      features.push(...entityRelativeDirection(entity, state))
+    } else {
+      features.push(0, 99, 0)
+      features.push(0, 0, 0, 0, 0)
+      features.push(0, 0, 0)
+    }
+  }
+  return features
+}
+
+function blockBucket(name) {
+  const n = safeStr(name, 'unknown').toLowerCase()
+  if (!n || n === 'unknown') return 'UNKNOWN'
+  if (n.includes('air')) return 'AIR'
+  if (n.includes('water') || n.includes('bubble_column')) return 'WATER'
+  if (n.includes('lava')) return 'LAVA'
+  if (includesAny(n, ['grass', 'flower', 'leaves', 'vine', 'sapling'])) return 'PLANT'
+  if (includesAny(n, ['crafting_table', 'furnace', 'chest', 'anvil', 'enchanting_table', 'bed'])) return 'UTILITY'
+  return 'SOLID'
+}
+
+function blockOneHot(name) {
+  const bucket = blockBucket(name)
+  return BLOCK_KEYS.map((key) => (bucket === key ? 1 : 0))
+}
+
+function nearbyBlocksFeatures(nearbyBlocks, nearbyBlocksStats) {
+  const bucketCounts = Object.fromEntries(BLOCK_KEYS.map((key) => [key, 0]))
+  const layerNonAir = { '-1': 0, 0: 0, 1: 0 }
+  const layerTotal = { '-1': 0, 0: 0, 1: 0 }
+  let nonAirWeightedDy = 0
+  let nonAirCount = 0
+
+  for (const entry of nearbyBlocks) {
+    if (!isDict(entry)) continue
+    const count = pyMax(1, safeFloat(entry.count, 1))
+    const bucket = blockBucket(safeStr(entry.block, 'unknown'))
+    bucketCounts[bucket] += count
+    const dy = Math.trunc(safeFloat(entry.dy, 0)) || 0
+    if (has(entry, 'dy') && dy >= -1 && dy <= 1) {
+      layerTotal[dy] += count
+      if (bucket !== 'AIR') layerNonAir[dy] += count
+    }
+    if (bucket !== 'AIR') {
+      nonAirWeightedDy += dy * count
+      nonAirCount += count
+    }
+  }
+
+  if (isDict(nearbyBlocksStats)) {
+    const statsBucket = get(nearbyBlocksStats, 'bucketCounts', {})
+    if (isDict(statsBucket)) {
+      for (const key of BLOCK_KEYS) bucketCounts[key] = pyMax(0, safeFloat(statsBucket[key], bucketCounts[key]))
+    }
+    const statsLayerTotal = get(nearbyBlocksStats, 'layerTotals', {})
+    const statsLayerNonAir = get(nearbyBlocksStats, 'layerNonAir', {})
+    if (isDict(statsLayerTotal)) {
+      for (const layer of [-1, 0, 1]) layerTotal[layer] = pyMax(0, safeFloat(statsLayerTotal[String(layer)], layerTotal[layer]))
+    }
+    if (isDict(statsLayerNonAir)) {
+      for (const layer of [-1, 0, 1]) layerNonAir[layer] = pyMax(0, safeFloat(statsLayerNonAir[String(layer)], layerNonAir[layer]))
+    }
+    nonAirCount = pyMax(0, safeFloat(nearbyBlocksStats.nonAirCount, nonAirCount))
+    if (nonAirCount > 0) {
+      const meanNonAirDy = safeFloat(nearbyBlocksStats.meanNonAirDy, nonAirWeightedDy / pyMax(1, nonAirCount))
+      nonAirWeightedDy = meanNonAirDy * nonAirCount
+    }
+  }
+
+  let total = 0
+  for (const key of BLOCK_KEYS) total += bucketCounts[key]
+  total = pyMax(1, total)
+  return [
+    ...BLOCK_KEYS.map((key) => bucketCounts[key] / total),
+    layerNonAir[-1] / pyMax(1, layerTotal[-1]),
+    layerNonAir[0] / pyMax(1, layerTotal[0]),
+    layerNonAir[1] / pyMax(1, layerTotal[1]),
+    nonAirCount / total,
+    nonAirWeightedDy / pyMax(1, nonAirCount),
+  ]
+}
+
+function threatFeatures(entities) {
+  let mobCount = 0
+  let hostileCount = 0
+  let nearestHostileDist = 99
+  let playerCount = 0
+
+  for (const entity of entities) {
+    if (!isDict(entity)) continue
+    const entityType = safeStr(entity.type, 'other').toLowerCase()
+    const entityName = safeStr(entity.name, '').toLowerCase()
+    const dist = pyMax(0, safeFloat(entity.distance, 99))
+    if (entityType === 'mob') mobCount += 1
+    if (entityType === 'player') playerCount += 1
+    if (entityType === 'mob' || includesAny(entityName, HOSTILE_ENTITY_HINTS)) {
+      hostileCount += 1
+      nearestHostileDist = pyMin(nearestHostileDist, dist)
+    }
+  }
+
+  return [mobCount, hostileCount, playerCount, nearestHostileDist, hostileCount / pyMax(1, entities.length)]
+}
+
+function deltaTimeFeature(deltaTime) {
+  return pyMax(0, pyMin(5, safeFloat(deltaTime, 0)))
+}
+
+function stateToFeatureVector(state, deltaTime = 0) {
+  const source = dictOr(state)
+  const velocity = dictOr(get(source, 'velocity', {}))
+  const entities = listOr(get(source, 'nearbyEntities', []))
+  const inventory = listOr(get(source, 'inventory', []))
+  const nearbyBlocks = listOr(get(source, 'nearbyBlocks', []))
+  const heldItem = dictOr(get(source, 'heldItem', {}))
+  const observer = dictOr(source.observer)
+
+  const vx = safeFloat(velocity.vx)
+  const vy = safeFloat(velocity.vy)
+  const vz = safeFloat(velocity.vz)
+  const yaw = safeFloat(source.yaw, safeFloat(observer.yaw))
+  const pitch = safeFloat(source.pitch, safeFloat(observer.pitch))
+
+  const feature = [
+    vx,
+    vy,
+    vz,
+    Math.sqrt(vx * vx + vz * vz),
+    deltaTimeFeature(deltaTime),
+    Math.sin(yaw),
+    Math.cos(yaw),
+    Math.sin(pitch),
+    Math.cos(pitch),
+    safeBool(source.onGround),
+    safeBool(source.inAir),
+    safeFloat(source.health, 20),
+    safeFloat(source.hunger, 20),
+    safeFloat(source.selectedHotbarSlot, -1),
+    entities.length,
+    ...inventoryFeatures(inventory),
+    ...itemTypeOneHot(safeStr(get(heldItem, 'name', 'none'), 'none')),
+    ...topKEntityFeatures(entities, source, 3),
+    ...blockOneHot(safeStr(get(source, 'blockBelow', 'unknown'), 'unknown')),
+    ...blockOneHot(safeStr(get(source, 'blockFront', 'unknown'), 'unknown')),
+    ...nearbyBlocksFeatures(nearbyBlocks, get(source, 'nearbyBlocksStats', {})),
+    ...threatFeatures(entities),
+  ]
+  return Float32Array.from(feature)
+}
+
+function formatFeature(value) {
+  if (Number.isFinite(value)) return String(value)
+  if (Number.isNaN(value)) return 'NaN'
+  return value > 0 ? 'Infinity' : '-Infinity'
+}
+
+function runParityDump() {
+  const readline = require('readline')
+  const lines = readline.createInterface({ input: process.stdin, crlfDelay: Infinity })
+  lines.on('line', (line) => {
+    if (!line.trim()) return
+    let row = null
+    try {
+      row = JSON.parse(line)
+    } catch {
+      return
+    }
+    const state = isDict(row?.state) ? row.state : {}
+    process.stdout.write(`[${Array.from(stateToFeatureVector(state), formatFeature).join(',')}]\n`)
+  })
+}
+
+if (require.main === module) {
+  runParityDump()
+}
+
+module.exports = {
+  FEATURE_LAYOUT_VERSION,
+  BASE_FEATURE_DIM,
+  stateToFeatureVector,
+}
@@ -0,0 +1,118 @@
+function resolveWebSocket() {
+  if (typeof globalThis.WebSocket === 'function') return globalThis.WebSocket
+  try {
+    return require('ws')
+  } catch {
+    return null
+  }
+}
+
+function createPolicyStreamClient({ url, agentId, timeoutMs = 1200, maxInflight = 4, reconnectDelayMs = 1000 }) {
+  const WebSocketImpl = resolveWebSocket()
+  const pending = new Map()
+  let socket = null
+  let opening = null
+  let nextSeq = 0
+  let retryAfter = 0
+
+  function streamUrl() {
+    const target = new URL(url)
+    target.searchParams.set('agent_id', String(agentId || 'default'))
+    target.searchParams.set('timeout_ms', String(timeoutMs))
+    return target.toString()
+  }
+
+  function settleAll() {
+    for (const entry of pending.values()) {
+      clearTimeout(entry.timer)
+      entry.resolve(null)
+    }
+    pending.clear()
+  }
+
+  function handleMessage(event) {
+    let payload = null
+    try {
+      payload = JSON.parse(String(event.data))
+    } catch {
+      return
+    }
+    const entry = pending.get(payload?.seq)
+    if (!entry) return
+    pending.delete(payload.seq)
+    clearTimeout(entry.timer)
+    entry.resolve(payload)
+  }
+
+  function connect() {
+    if (socket?.readyState === 1) return Promise.resolve(socket)
+    if (opening) return opening
+    if (!WebSocketImpl || Date.now() < retryAfter) return Promise.resolve(null)
+
+    opening = new Promise((resolve) => {
+      const ws = new WebSocketImpl(streamUrl())
+      const openTimer = setTimeout(() => ws.close(), timeoutMs)
+      ws.binaryType = 'arraybuffer'
+      ws.onopen = () => {
+        clearTimeout(openTimer)
+        if (retryAfter === Infinity) {
+          ws.close()
+          return
+        }
+        // Sequence numbers are assigned per connection by the server, starting at zero.
+        nextSeq = 0
+        socket = ws
+        opening = null
+        resolve(ws)
+      }
+      ws.onmessage = handleMessage
+      ws.onerror = () => {}
+      ws.onclose = () => {
+        clearTimeout(openTimer)
+        if (socket === ws) socket = null
+        if (opening) {
+          opening = null
+          resolve(null)
+        }
+        retryAfter = Date.now() + reconnectDelayMs
+        settleAll()
+      }
+    })
+    return opening
+  }
+
+  async function request(body) {
+    const ws = await connect()
+    if (!ws) return null
+    // Backpressure: skip this decision instead of queueing stale states behind slow ones.
+    if (pending.size >= maxInflight) return null
+
+    const seq = nextSeq
+    nextSeq += 1
+    return new Promise((resolve) => {
+      const timer = setTimeout(() => {
+        pending.delete(seq)
+        resolve(null)
+      }, timeoutMs)
+      pending.set(seq, { resolve, timer })
+      ws.send(Buffer.isBuffer(body) ? body : JSON.stringify(body))
+    })
+  }
+
+  function close() {
+    retryAfter = Infinity
+    socket?.close()
+    socket = null
+    settleAll()
+  }
+
+  return {
+    available: Boolean(WebSocketImpl),
+    request,
+    close,
+  }
+}
+
+module.exports = {
+  createPolicyStreamClient,
+}
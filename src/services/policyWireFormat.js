@@ -0,0 +1,59 @@
+// Encoder for Training/python/modules/serving/wire_format.py (little-endian throughout).
+// Frame: magic 'MFPF', u16 wire version, u16 feature layout version, u16 feature count,
+// u16 agent id byte length, f64 timestamp (NaN = absent), f64 temperature (NaN = absent),
+// agent id utf-8 bytes, then feature count float32 values.
+// Batch: magic 'MFPB', u16 wire version, u32 frame count, then u32 byte length + frame per entry.
+const { FEATURE_LAYOUT_VERSION } = require('./policyFeatures')
+
+const PACKED_CONTENT_TYPE = 'application/x-policy-features'
+const WIRE_VERSION = 1
+const FRAME_MAGIC = Buffer.from('MFPF', 'ascii')
+const BATCH_MAGIC = Buffer.from('MFPB', 'ascii')
+const FRAME_HEADER_SIZE = 28
+const BATCH_HEADER_SIZE = 10
+
+function optionalNumber(value) {
+  const n = Number(value)
+  return value == null || !Number.isFinite(n) ? NaN : n
+}
+
+function encodePolicyFrame({ features, agentId = 'default', timestamp = null, temperature = null }) {
+  const agent = Buffer.from(String(agentId || ''), 'utf8')
+  const frame = Buffer.alloc(FRAME_HEADER_SIZE + agent.length + features.length * 4)
+  FRAME_MAGIC.copy(frame, 0)
+  frame.writeUInt16LE(WIRE_VERSION, 4)
+  frame.writeUInt16LE(FEATURE_LAYOUT_VERSION, 6)
+  frame.writeUInt16LE(features.length, 8)
+  frame.writeUInt16LE(agent.length, 10)
+  frame.writeDoubleLE(optionalNumber(timestamp), 12)
+  frame.writeDoubleLE(optionalNumber(temperature), 20)
+  agent.copy(frame, FRAME_HEADER_SIZE)
+  let offset = FRAME_HEADER_SIZE + agent.length
+  for (const value of features) {
+    frame.writeFloatLE(value, offset)
+    offset += 4
+  }
+  return frame
+}
+
+function encodePolicyBatch(frames) {
+  const size = frames.reduce((total, frame) => total + 4 + frame.length, BATCH_HEADER_SIZE)
+  const batch = Buffer.alloc(size)
+  BATCH_MAGIC.copy(batch, 0)
+  batch.writeUInt16LE(WIRE_VERSION, 4)
+  batch.writeUInt32LE(frames.length, 6)
+  let offset = BATCH_HEADER_SIZE
+  for (const frame of frames) {
+    batch.writeUInt32LE(frame.length, offset)
+    frame.copy(batch, offset + 4)
+    offset += 4 + frame.length
+  }
+  return batch
+}
+
+module.exports = {
+  PACKED_CONTENT_TYPE,
+  WIRE_VERSION,
+  encodePolicyFrame,
+  encodePolicyBatch,
+}
@@ -177,6 +177,7 @@ function createBrain({ bot, goals, gemini, config, chatWindow, remember, session
   function onEnd() {
     state.setGoal('session ended')
     clearDecisionTimer()
+    decisionEngine.close()
     movement.shutdown()
   }
 
@@ -1,9 +1,15 @@
 const { createIntentLoop } = require('./intentLoop')
+const { WIRE_REJECTED_STATUSES, getSharedPolicyBatchClient } = require('../../services/policyBatchClient')
+const { stateToFeatureVector } = require('../../services/policyFeatures')
+const { createPolicyStreamClient } = require('../../services/policyStreamClient')
+const { PACKED_CONTENT_TYPE, encodePolicyFrame } = require('../../services/policyWireFormat')
 
 function createDecisionEngine({ bot, config, dynamicAgent, runAction, runDynamicAction, sessionMemory, onActionChosen, onGoalChosen, internalState, onActionOutcome = () => {} }) {
   let decisionBusy = false
   let lastDecisionAt = 0
   let consecutivePolicyPassive = 0
+  let packedWireRejected = false
+  let policyStream = null
   const actionCooldownUntil = new Map()
   const intentLoop = createIntentLoop({ bot, dynamicAgent, sessionMemory })
   const ENABLE_INTENT_LOOP = true
@@ -93,25 +99,78 @@ function createDecisionEngine({ bot, config, dynamicAgent, runAction, runDynamic
     }
   }
 
+  function usePackedWire() {
+    return !packedWireRejected && config.policyWireFormat === 'packed'
+  }
+
+  function rejectPackedWire() {
+    packedWireRejected = true
+    console.warn('[policy] server rejected packed feature frames; falling back to JSON requests')
+  }
+
+  function getPolicyStream(agentId) {
+    if (!policyStream) {
+      policyStream = createPolicyStreamClient({
+        url: String(config.policyStreamUrl || 'ws://127.0.0.1:8765/stream'),
+        agentId,
+        timeoutMs: Math.max(200, Number(config.policyTimeoutMs || 1200)),
+        maxInflight: Math.max(1, Number(config.policyStreamMaxInflight || 4)),
+      })
+      if (!policyStream.available) console.warn('[policy] no WebSocket implementation found; install `ws` to use the stream')
+    }
+    return policyStream.available ? policyStream : null
+  }
+
   async function requestPolicyDecision() {
     if (!config.policyAutonomyEnabled) return null
     const stateSnapshot = buildPolicyStateSnapshot()
     if (!stateSnapshot) return null
+    const agentId = String(bot?.username || 'bot')
+    const packed = usePackedWire()
+    const frame = packed ? encodePolicyFrame({ features: stateToFeatureVector(stateSnapshot), agentId }) : null
+
+    const stream = config.policyStreamEnabled ? getPolicyStream(agentId) : null
+    if (stream) {
+      const payload = await stream.request(packed ? frame : { state: stateSnapshot })
+      if (payload?.wire_rejected) rejectPackedWire()
+      return payload?.ok ? payload : null
+    }
+
+    if (config.policyBatchEnabled) {
+      const payload = await getSharedPolicyBatchClient(config, { packed }).request(
+        packed ? frame : { state: stateSnapshot, agent_id: agentId }
+      )
+      if (payload?.wireRejected) rejectPackedWire()
+      return payload?.ok ? payload : null
+    }
 
     const timeoutMs = Math.max(200, Number(config.policyTimeoutMs || 1200))
     const controller = new AbortController()
     const timer = setTimeout(() => controller.abort(), timeoutMs)
 
     try {
-      const response = await fetch(String(config.policyServerUrl || 'http://127.0.0.1:8765/predict'), {
+      const url = packed
+        ? String(config.policyPackedUrl || 'http://127.0.0.1:8765/predict_packed')
+        : String(config.policyServerUrl || 'http://127.0.0.1:8765/predict')
+      const response = await fetch(url, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          state: stateSnapshot,
-          agent_id: String(bot?.username || 'bot'),
-        }),
+        headers: {
+          'Content-Type': packed ? PACKED_CONTENT_TYPE : 'application/json',
+          // The server drops work it cannot finish before this client gives up.
+          'X-Policy-Timeout-Ms': String(timeoutMs),
+        },
+        body: packed
+          ? frame
+          : JSON.stringify({
+            state: stateSnapshot,
+            agent_id: agentId,
+          }),
         signal: controller.signal,
       })
+      if (packed && WIRE_REJECTED_STATUSES.has(response.status)) {
+        rejectPackedWire()
+        return null
+      }
       if (!response.ok) return null
       const payload = await response.json()
       if (!payload?.ok) return null
@@ -499,8 +558,14 @@ function createDecisionEngine({ bot, config, dynamicAgent, runAction, runDynamic
     }
   }
 
+  function close() {
+    policyStream?.close()
+    policyStream = null
+  }
+
   return {
     runDecisionStep,
+    close,
   }
 }
 